@@ -3,47 +3,399 @@
 Главный запускаемый файл. Представляет собой API endpoint, написанный на FastAPI.
 """
 
+import asyncio
+import hashlib
+import json
+import logging
+import math
 import os
-from typing import List
+import secrets
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple
 
+import httpx
 import uvicorn
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
 
-from bgtu_parser import Parser
-from models import Schedule, Teacher, TeacherSchedule
+import ical
+import metrics
+from bgtu_parser import AsyncParser
+from cache import EncodedCache, ResultCache
+from changes import ChangeFeed
+from export import iter_results
+from group_directory import GroupSearch
+from lesson_index import check_teacher, indexed_teacher_schedule, slot_mask
+from models import (GroupInfo, Meta, Now, RoomSchedule, Schedule, ScheduleBatch, Teacher,
+                    TeacherMatch, TeacherSchedule, Today)
+from prefetch import Prefetcher
+from semester import SEMESTER_WEEKS, Semester, current_semester, moscow_time
+from slots import SlotIndex
+from storage import open_store
+from teacher_search import TeacherSearch
+from timetable import DAY_NAMES, SLOTS, WEEKS, Timetable
+from upstream import CircuitOpen, UpstreamGuard
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 # pylint: disable=C0103
 # В угоду красивому коду константы останутся в snake-case
-abs_file_path = os.path.abspath(__file__)
-path, filename = os.path.split(abs_file_path)
-parser = Parser(path + '/chromedriver')
+logger = logging.getLogger(__name__)
+admin_token = os.environ.get('ADMIN_TOKEN')
+employees_refresh = int(os.environ.get('EMPLOYEES_REFRESH', 86400))
+bulk_max_groups = int(os.environ.get('BULK_MAX_GROUPS', 500))
+store_path = os.environ.get('STORE_PATH')
+store = open_store(store_path) if store_path else None
+workers = int(os.environ.get('WORKERS', 1))
+semester_start = os.environ.get('SEMESTER_START')
+semester_weeks = int(os.environ.get('SEMESTER_WEEKS', SEMESTER_WEEKS))
+semester_first_week = os.environ.get('SEMESTER_FIRST_WEEK', 'even')
+cache = ResultCache(
+    ttl=int(os.environ.get('CACHE_TTL', 43200)),
+    stale_ttl=int(os.environ.get('CACHE_STALE_TTL', 604800)),
+    maxsize=int(os.environ.get('CACHE_MAXSIZE', 4096)),
+    store=store,
+)
+# Готовые JSON-ответы по версиям расписаний
+encoded = EncodedCache(maxsize=cache.maxsize)
+# Календари .ics (около 100 КБ) отдельно и с лимитом байт, чтобы не вытесняли JSON
+calendars = EncodedCache(
+    maxsize=cache.maxsize,
+    max_bytes=int(os.environ.get('CALENDAR_CACHE_BYTES', 32 * 1024 * 1024)),
+)
+# Пары по дням для `/api/v2/now` и `/api/v2/today`
+slot_index = SlotIndex(maxsize=cache.maxsize)
+teacher_search = TeacherSearch()
+group_search = GroupSearch()
+changes = ChangeFeed(
+    maxlen=int(os.environ.get('CHANGES_MAXLEN', 10000)),
+    webhook=os.environ.get('CHANGES_WEBHOOK'),
+)
+guard = UpstreamGuard(
+    rate=float(os.environ.get('UPSTREAM_RATE', 0)),
+    burst=int(os.environ.get('UPSTREAM_BURST', 5)),
+    max_concurrency=int(os.environ.get('UPSTREAM_CONCURRENCY', 8)),
+    timeout=float(os.environ.get('UPSTREAM_TIMEOUT', 15)),
+    min_timeout=float(os.environ.get('UPSTREAM_MIN_TIMEOUT', 2)),
+    retries=int(os.environ.get('UPSTREAM_RETRIES', 2)),
+    failures=int(os.environ.get('CIRCUIT_FAILURES', 5)),
+    reset_timeout=float(os.environ.get('CIRCUIT_RESET', 30)),
+)
+parser = AsyncParser(cache=cache, store=store, changes=changes, guard=guard)
+teacher_source = os.environ.get('TEACHER_SCHEDULE_SOURCE', 'site')
+prefetch_enabled = os.environ.get('PREFETCH_ENABLED', '0') == '1'
+prefetcher = Prefetcher(
+    parser,
+    rate=float(os.environ.get('PREFETCH_RATE', 1.0)),
+    hot_interval=int(os.environ.get('PREFETCH_HOT_INTERVAL', 3600)),
+    cold_interval=int(os.environ.get('PREFETCH_COLD_INTERVAL', 43200)),
+    # Расписания преподавателей из индекса не нужно загружать с сайта
+    teachers=os.environ.get('PREFETCH_TEACHERS', '1') == '1' and teacher_source != 'index',
+    # Индекс пар нужен и для поиска свободных аудиторий
+    index=True,
+)
 description = (
     "Данное API даёт возможность получить группы и их расписание с сайта БГТУ. "
     "Страница на Github: [xhable1337/bgtu-parser](https://github.com/xhable1337/bgtu-parser)"
 )
+
+
+async def refresh_employees():
+    """Периодически переиндексирует справочник сотрудников, если он обновился в кэше."""
+    while True:
+        try:
+            await parser.get_employees()
+        except Exception:  # pylint: disable=W0703
+            logger.exception("Не удалось обновить справочник сотрудников")
+        await asyncio.sleep(employees_refresh)
+
+
+def model_json(model: BaseModel, data) -> bytes:
+    """Проверяет данные моделью и кодирует их в JSON, замеряя время сериализации.
+
+    `response_model` эндпоинта остаётся для схемы OpenAPI, а повторной
+    проверки ответа FastAPI не выполняет.
+    """
+    with metrics.SERIALIZE_SECONDS.time(model=model.__name__):
+        return model.model_validate(data).model_dump_json().encode("utf-8")
+
+
+def encoded_json(model: BaseModel, key: tuple, data: Callable[[], Any]) -> bytes:
+    """Возвращает ответ модели в JSON из кэша `encoded`, кодируя его только при промахе.
+
+    Аргументы:
+        model (BaseModel): модель ответа
+        key (tuple): ключ, однозначно определяющий содержимое ответа
+        data (Callable): функция, возвращающая данные ответа (вызывается
+            только при промахе)
+    """
+    return encoded.get_or_encode((model.__name__, *key), lambda: model_json(model, data()))
+
+
+def schedule_json(schedule: Timetable) -> bytes:
+    """Расписание группы в JSON (модель `Schedule`)."""
+    return encoded_json(
+        Schedule,
+        (schedule.owner, schedule.digest(), schedule.updated),
+        schedule.to_schedule,
+    )
+
+
+def teacher_schedule_json(schedule: Timetable) -> bytes:
+    """Расписание преподавателя в JSON (модель `TeacherSchedule`)."""
+    return encoded_json(
+        TeacherSchedule,
+        (schedule.owner, schedule.digest(), schedule.updated),
+        schedule.to_teacher_schedule,
+    )
+
+
+def plain_json(value) -> bytes:
+    """Кодирует строки и словари строк в JSON так же, как pydantic (без пробелов)."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def batch_json(schedules: Dict[str, Timetable], errors: Dict[str, str]) -> bytes:
+    """Набор расписаний в JSON (модель `ScheduleBatch`).
+
+    Тело собирается из готовых ответов отдельных групп, без повторной
+    проверки и кодирования каждого расписания.
+    """
+    parts = [b'{"schedules":{']
+    for i, (name, schedule) in enumerate(schedules.items()):
+        if i:
+            parts.append(b",")
+        parts += [plain_json(name), b":", schedule_json(schedule)]
+    parts += [b'},"errors":', plain_json(errors), b"}"]
+    return b"".join(parts)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Проверяет, есть ли `etag` в заголовке `If-None-Match`."""
+    if not if_none_match:
+        return False
+
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Для GET слабые и сильные ETag сравниваются одинаково
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def conditional_response(
+        request: Request, version: str, keys: List[tuple], render: Callable[[], bytes],
+        media_type: str = "application/json") -> Response:
+    """Отвечает 304, если у клиента актуальная версия, а иначе — телом из `render`.
+
+    ETag слабый (`W/"…"`), так как он общий у несжатого и сжатых ответов.
+    Возраст данных в кэше отдаётся в заголовке `Age`, а если данные уже
+    устарели (например, сайт недоступен), добавляется `Warning: 110`.
+
+    Аргументы:
+        request (Request): запрос клиента
+        version (str): хэш текущей версии (по содержимому, без времени разбора)
+        keys (list[tuple]): ключи кэша, из которых собран ответ
+        render (Callable): функция, возвращающая тело ответа (вызывается,
+            только если тело действительно нужно)
+        media_type (str): тип содержимого ответа
+    """
+    max_age = min((cache.max_age(key) for key in keys), default=0)
+    age = max((cache.age(key) for key in keys), default=0.0)
+    headers = {
+        "ETag": f'W/"{version}"',
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={cache.stale_ttl}",
+        "Age": str(int(age)),
+    }
+    if age >= cache.ttl:
+        headers["Warning"] = '110 - "Response is Stale"'
+
+    if etag_matches(request.headers.get("if-none-match"), f'"{version}"'):
+        # На 200 заголовок `Vary` добавляет сжатие, на 304 — нужно самим
+        return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+
+    return Response(render(), media_type=media_type, headers=headers)
+
+
+def semester(day: date = None) -> Semester:
+    """Текущий (или включающий `day`) семестр с настройками `SEMESTER_*`."""
+    return current_semester(semester_start, semester_weeks, semester_first_week, day)
+
+
+def calendar_response(
+        request: Request, schedule: Timetable, key: tuple, party: str) -> Response:
+    """Расписание в формате iCalendar на весь семестр.
+
+    Календарь собирается только при промахе кэша `calendars`: пока хэш
+    расписания и семестр те же, отдаются готовые байты (или 304).
+
+    Аргументы:
+        request (Request): запрос клиента
+        schedule (Timetable): расписание
+        key (tuple): ключ кэша результатов, из которого взято расписание
+        party (str): подпись поля `party` в описании событий
+    """
+    current = semester()
+    version = (schedule.owner, schedule.digest(), current)
+    etag = hashlib.blake2b(repr(version).encode("utf-8"), digest_size=16).hexdigest()
+
+    return conditional_response(
+        request,
+        etag,
+        [key],
+        lambda: calendars.get_or_encode(
+            ("ics", *version), lambda: ical.calendar(schedule, current, party)
+        ),
+        media_type="text/calendar; charset=utf-8",
+    )
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Запускает фоновые задачи и закрывает пул соединений при остановке."""
+    employees_task = asyncio.ensure_future(refresh_employees())
+    if prefetch_enabled:
+        prefetcher.start()
+    yield
+    prefetcher.stop()
+    employees_task.cancel()
+    await parser.aclose()
+    if store is not None:
+        store.close()
+
+
 app = FastAPI(title="API БГТУ (Unofficial)",
               docs_url='/', version="v2.0.0",
-              description=description)
+              description=description,
+              lifespan=lifespan)
+
+# Сжатие ответов: brotli (с запасным gzip), если установлен `brotli-asgi`, иначе gzip
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=500)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=500)
+
+
+@app.exception_handler(CircuitOpen)
+async def circuit_open_handler(_request: Request, exc: CircuitOpen):
+    """Сайт недоступен, а в кэше нет данных: 503 с `Retry-After`."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+@app.exception_handler(httpx.HTTPError)
+async def upstream_error_handler(_request: Request, exc: httpx.HTTPError):
+    """Сайт не ответил и после повторов, а в кэше нет данных: 502."""
+    return JSONResponse(
+        status_code=502,
+        content={"detail": f"Сайт БГТУ не ответил: {type(exc).__name__}: {exc}"},
+    )
 
 
 @app.get("/api/v2/schedule",
          response_model=Schedule,
          summary="Расписание заданной группы",
          tags=("Студенты",))
-def get_schedule(group: str = Query(
+async def get_schedule(request: Request, group: str = Query(
         default=None,
         description='Группа, для которой ведётся парсинг расписания',
         example='О-20-ИВТ-1-по-Б'
 )):
-    """Парсит и возвращает расписание для заданной группы на всё полугодие."""
-    return parser.schedule(group)
+    """Парсит и возвращает расписание для заданной группы на всё полугодие.
+
+    Поддерживает `If-None-Match`: если расписание не изменилось, ответ — 304.
+    """
+    schedule = await parser.schedule(group)
+    return conditional_response(
+        request,
+        schedule.digest(),
+        [parser.cache_key("schedule", group)],
+        lambda: schedule_json(schedule),
+    )
+
+
+@app.get("/api/v2/schedules",
+         response_model=ScheduleBatch,
+         summary="Расписания нескольких групп",
+         tags=("Студенты",))
+async def get_schedules(
+        request: Request,
+        group: List[str] = Query(
+            default=None,
+            description='Группы, для которых ведётся парсинг расписания',
+            example=['О-20-ИВТ-1-по-Б', 'О-20-ИВТ-2-по-Б']
+        ),
+        faculty: str = Query(
+            default=None,
+            description='Факультет, расписания всех групп которого нужно получить',
+            example='Факультет информационных технологий'
+        ),
+        year: str = Query(
+            default=None,
+            description='Год поступления (вместе с факультетом)',
+            example='20'
+        )
+):
+    """Параллельно парсит расписания заданных групп и (или) всех групп факультета.
+
+    Ошибки отдельных групп возвращаются в поле `errors`, не прерывая остальные.
+    """
+    groups = list(group or [])
+    if faculty:
+        groups += await parser.groups(faculty, year)
+
+    if not groups:
+        raise HTTPException(status_code=400, detail="Не заданы группы")
+
+    if len(groups) > bulk_max_groups:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Можно запросить не больше {bulk_max_groups} групп")
+
+    schedules, errors = await parser.schedules(groups)
+    versions = sorted((name, schedule.digest()) for name, schedule in schedules.items())
+    etag = hashlib.blake2b(
+        repr((versions, sorted(errors.items()))).encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+    return conditional_response(
+        request,
+        etag,
+        [parser.cache_key("schedule", name) for name in schedules],
+        lambda: batch_json(schedules, errors),
+    )
+
+
+@app.get("/api/v2/faculties",
+         response_model=List[str],
+         summary="Список факультетов",
+         tags=("Студенты",))
+async def get_faculties():
+    """Возвращает названия факультетов со страницы расписания."""
+    return await parser.faculties()
+
+
+@app.get("/api/v2/meta",
+         response_model=Meta,
+         summary="Периоды, формы обучения, факультеты и преподаватели",
+         tags=("Студенты", "Преподаватели"))
+async def get_meta():
+    """Возвращает справочные данные, разобранные с одной страницы расписания:
+    текущий и все учебные периоды, формы обучения, факультеты и преподавателей."""
+    return await parser.meta()
 
 
 @app.get("/api/v2/groups",
          response_model=List[str],
          summary="Список групп по факультету и году поступления",
          tags=("Студенты",))
-def get_groups(
+async def get_groups(
         faculty: str = Query(
             default=None,
             description='Факультет, группы которого нужно найти',
@@ -56,23 +408,88 @@ def get_groups(
         )
 ):
     """Парсит и возвращает все группы заданного года поступления на заданном факультете."""
-    return parser.groups(faculty, year)
+    return await parser.groups(faculty, year)
+
+
+@app.get("/api/v2/groups/search",
+         response_model=List[GroupInfo],
+         summary="Поиск групп по шифру и его частям",
+         tags=("Студенты",))
+async def search_groups(
+        *,
+        q: str = Query(
+            default=None,
+            description='Начало шифра группы или любой его части',
+            example='О-20-ИВ'
+        ),
+        faculty: str = Query(default=None, description='Факультет'),
+        form: str = Query(default=None, description='Форма обучения', example='О'),
+        year: str = Query(default=None, description='Год поступления', example='20'),
+        speciality: str = Query(default=None, description='Направление', example='ИВТ'),
+        number: str = Query(default=None, description='Номер группы', example='1'),
+        profile: str = Query(default=None, description='Профиль', example='по'),
+        level: str = Query(default=None, description='Уровень образования', example='Б'),
+        limit: int = Query(default=100, ge=1, le=5000, description='Максимум результатов')
+):
+    """Ищет группы всего университета по началу шифра (`О-20-ИВ`) или любой
+    его части (`ивт-1`) и по частям шифра, например все группы ИВТ 2020 года:
+    `speciality=ИВТ&year=20`.
+
+    Справочник строится по спискам групп факультетов из кэша, поэтому
+    запросы к нему не обращаются к сайту БГТУ.
+    """
+    # pylint: disable=R0913
+    try:
+        groups = await group_search.find(
+            parser, q, limit, faculty=faculty, form=form, year=year, speciality=speciality,
+            number=number, profile=profile, level=level,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    return Response(plain_json(groups), media_type="application/json")
 
 
 @app.get("/api/v2/teacher_list",
          response_model=List[str],
          summary="Список имён преподавателей",
          tags=("Преподаватели",))
-def get_teacher_list():
+async def get_teacher_list():
     """Парсит и возвращает список имён всех преподавателей."""
-    return parser.teacher_list()
+    return await parser.teacher_list()
+
+
+@app.get("/api/v2/teachers/search",
+         response_model=List[TeacherMatch],
+         summary="Поиск преподавателя",
+         tags=("Преподаватели",))
+async def search_teachers(
+        q: str = Query(
+            description='Начало имени, фамилия с инициалами или фамилия с опечаткой',
+            example='Трубаков Е.О.'
+        ),
+        limit: int = Query(
+            default=10,
+            ge=1,
+            le=100,
+            description='Максимум результатов'
+        )
+):
+    """Ищет преподавателей для автодополнения: по началу слов имени
+    (`труб`), по фамилии с инициалами (`Трубаков Е.О.`) и по фамилии
+    с опечаткой (`Трубоков`). Результаты упорядочены по оценке совпадения.
+    """
+    return Response(
+        plain_json(teacher_search.search(await parser.teacher_list(), q, limit)),
+        media_type="application/json",
+    )
 
 
 @app.get("/api/v2/teacher_info",
          response_model=Teacher,
          summary="Информация о преподавателе",
          tags=("Преподаватели",))
-def get_teacher_info(
+async def get_teacher_info(
         name: str = Query(
             default=None,
             description='Имя преподавателя',
@@ -80,44 +497,504 @@ def get_teacher_info(
         )
 ):
     """Парсит и возвращает информацию о заданном преподавателе."""
-    return parser.teacher_info(name)
+    return await parser.teacher_info(name)
+
+
+@app.get("/api/v2/department",
+         response_model=List[Teacher],
+         summary="Преподаватели кафедры",
+         tags=("Преподаватели",))
+async def get_department(
+        name: str = Query(
+            default=None,
+            description='Полное название кафедры',
+            example='Кафедра информатики и программного обеспечения'
+        )
+):
+    """Возвращает информацию обо всех преподавателях заданной кафедры."""
+    return await parser.department(name)
+
+
+@app.get("/api/v2/departments",
+         response_model=List[str],
+         summary="Список кафедр",
+         tags=("Преподаватели",))
+async def get_departments():
+    """Возвращает названия всех кафедр из справочника сотрудников."""
+    return (await parser.get_employees()).departments
+
+
+async def teacher_schedule(name: str):
+    """Расписание преподавателя из источника `TEACHER_SCHEDULE_SOURCE`."""
+    if teacher_source == 'index':
+        return await indexed_teacher_schedule(parser, name)
+    return await parser.teacher_schedule(name)
 
 
 @app.get("/api/v2/teacher",
          response_model=Teacher,
          summary="Преподаватель",
          tags=("Преподаватели",))
-def get_teacher(name: str = Query(
+async def get_teacher(name: str = Query(
         default=None,
         description='Имя преподавателя',
         example='Трубаков Евгений Олегович'
 )):
     """Парсит и возвращает преподавателя (информация и расписание)."""
-    schedule = parser.teacher_schedule(name)
+    schedule = await teacher_schedule(name)
 
     if not schedule:
         raise HTTPException(
             status_code=404, detail="У преподавателя нет расписания")
 
-    info = parser.teacher_info(name)
-    info['schedule'] = schedule
-    return info
+    info = await parser.teacher_info(name)
+    key = (schedule.owner, schedule.digest(), schedule.updated, repr(sorted(info.items())))
+    return Response(
+        encoded_json(Teacher, key, lambda: {**info, 'schedule': schedule.to_teacher_schedule()}),
+        media_type="application/json",
+    )
 
 
 @app.get("/api/v2/teacher_schedule",
          response_model=TeacherSchedule,
          summary="Расписание преподавателя",
          tags=("Преподаватели",))
-def get_teacher_schedule(
+async def get_teacher_schedule(
+        request: Request,
+        teacher: str = Query(
+            default=None,
+            description='Имя преподавателя',
+            example='Трубаков Евгений Олегович'
+        )
+):
+    """Парсит и возвращает расписание заданного преподавателя.
+
+    Поддерживает `If-None-Match`: если расписание не изменилось, ответ — 304.
+    """
+    schedule = await teacher_schedule(teacher)
+
+    if schedule is None:
+        raise HTTPException(status_code=400, detail="Не задан преподаватель")
+
+    return conditional_response(
+        request,
+        schedule.digest(),
+        [parser.cache_key("teacher_schedule", teacher)],
+        lambda: teacher_schedule_json(schedule),
+    )
+
+
+@app.get("/api/v2/schedule.ics",
+         response_class=Response,
+         summary="Расписание группы в формате iCalendar",
+         tags=("Студенты",))
+async def get_schedule_calendar(request: Request, group: str = Query(
+        default=None,
+        description='Группа, для которой ведётся парсинг расписания',
+        example='О-20-ИВТ-1-по-Б'
+)):
+    """Возвращает расписание группы как календарь с парами на каждый день семестра.
+
+    Ссылку можно добавить в календарь как подписку. Поддерживает `If-None-Match`.
+    """
+    schedule = await parser.schedule(group)
+    return calendar_response(
+        request, schedule, parser.cache_key("schedule", group), "Преподаватель"
+    )
+
+
+@app.get("/api/v2/teacher_schedule.ics",
+         response_class=Response,
+         summary="Расписание преподавателя в формате iCalendar",
+         tags=("Преподаватели",))
+async def get_teacher_schedule_calendar(
+        request: Request,
         teacher: str = Query(
             default=None,
             description='Имя преподавателя',
             example='Трубаков Евгений Олегович'
         )
 ):
-    """Парсит и возвращает расписание заданного преподавателя."""
-    return parser.teacher_schedule(teacher)
+    """Возвращает расписание преподавателя как календарь с парами на каждый день семестра.
+
+    Ссылку можно добавить в календарь как подписку. Поддерживает `If-None-Match`.
+    """
+    schedule = await teacher_schedule(teacher)
+
+    if schedule is None:
+        raise HTTPException(status_code=400, detail="Не задан преподаватель")
+
+    return calendar_response(
+        request, schedule, parser.cache_key("teacher_schedule", teacher), "Группа"
+    )
+
+
+async def export_records(faculty: str = None, teachers: bool = False) -> AsyncIterator[bytes]:
+    """Выдаёт строки NDJSON выгрузки по одной, по мере загрузки расписаний."""
+    meta = await parser.meta()
+    window = guard.max_concurrency
+    counts = {"groups": 0, "teachers": 0, "errors": 0}
+
+    def error(kind: str, name: str, exc: Exception) -> bytes:
+        counts["errors"] += 1
+        return plain_json({
+            "type": "error", "kind": kind, "name": name,
+            "error": f"{type(exc).__name__}: {exc}",
+        }) + b"\n"
+
+    for name in [faculty] if faculty else meta["faculties"]:
+        try:
+            groups = await parser.faculty_groups(name)
+        except Exception as exc:  # pylint: disable=W0703
+            yield error("faculty", name, exc)
+            continue
+
+        async for group, result in iter_results(parser.schedule, groups, window):
+            if isinstance(result, Exception):
+                yield error("group", group, result)
+                continue
+
+            counts["groups"] += 1
+            yield b"".join((
+                b'{"type":"group","name":', plain_json(group),
+                b',"faculty":', plain_json(name),
+                b',"schedule":', schedule_json(result), b"}\n",
+            ))
+
+    if teachers:
+        async for teacher, result in iter_results(teacher_schedule, meta["teachers"], window):
+            if isinstance(result, Exception):
+                yield error("teacher", teacher, result)
+                continue
+            if result is None:
+                continue
+
+            counts["teachers"] += 1
+            yield b"".join((
+                b'{"type":"teacher","name":', plain_json(teacher),
+                b',"schedule":', teacher_schedule_json(result), b"}\n",
+            ))
+
+    # По последней строке клиент понимает, что выгрузка не оборвалась
+    yield plain_json({"type": "summary", **counts}) + b"\n"
+
+
+@app.get("/api/v2/export",
+         summary="Выгрузка всех расписаний (NDJSON)",
+         tags=("Студенты", "Преподаватели"),
+         response_class=StreamingResponse,
+         responses={200: {"content": {"application/x-ndjson": {}}}})
+async def get_export(
+        faculty: str = Query(
+            default=None,
+            description='Только группы этого факультета (по умолчанию — всех)',
+            example='Факультет информационных технологий'
+        ),
+        teachers: bool = Query(
+            default=False,
+            description='Выгрузить и расписания всех преподавателей'
+        )
+):
+    """Потоково отдаёт расписания всех групп (и, по желанию, преподавателей)
+    по одному JSON-объекту на строку.
+
+    Строки: `{"type": "group", "name", "faculty", "schedule"}`,
+    `{"type": "teacher", "name", "schedule"}`, `{"type": "error", "kind", "name", "error"}`
+    и последняя — `{"type": "summary", "groups", "teachers", "errors"}`.
+    Расписания берутся из кэша или загружаются по мере выгрузки.
+    """
+    return StreamingResponse(
+        export_records(faculty, teachers), media_type="application/x-ndjson"
+    )
+
+
+@app.get("/api/v2/changes",
+         summary="Лента изменений расписаний",
+         tags=("Студенты", "Преподаватели"))
+async def get_changes(
+        since: int = Query(
+            default=0,
+            description='`cursor` из предыдущего ответа (0 — с начала ленты)',
+            example=0
+        ),
+        owner: List[str] = Query(
+            default=None,
+            description='Только изменения этих групп и (или) преподавателей',
+            example=['О-20-ИВТ-1-по-Б']
+        ),
+        limit: int = Query(
+            default=100,
+            ge=1,
+            le=1000,
+            description='Максимум событий в ответе'
+        )
+):
+    """Возвращает изменения расписаний после курсора `since`: добавленные,
+    удалённые и перенесённые пары по дням и неделям.
+
+    Для следующего запроса передайте `cursor` из ответа. `missed` означает,
+    что часть событий после `since` уже не хранится (или приложение
+    перезапускалось) и расписания стоит загрузить целиком.
+    """
+    return changes.since(since, owner, limit)
+
+
+async def day_schedule(group: str, teacher: str) -> Tuple[Timetable, str]:
+    """Расписание группы или преподавателя и ключ поля `party` в ответе."""
+    if group and not teacher:
+        return await parser.schedule(group), "teacher"
+
+    if teacher and not group:
+        schedule = await teacher_schedule(teacher)
+        if schedule:
+            return schedule, "group"
+        raise HTTPException(status_code=404, detail="У преподавателя нет расписания")
+
+    raise HTTPException(
+        status_code=400, detail="Нужно задать либо группу (group), либо преподавателя (teacher)")
+
+
+@app.get("/api/v2/now",
+         response_model=Now,
+         summary="Текущая и следующая пара",
+         tags=("Студенты", "Преподаватели"))
+async def get_now(
+        group: str = Query(
+            default=None,
+            description='Группа',
+            example='О-20-ИВТ-1-по-Б'
+        ),
+        teacher: str = Query(
+            default=None,
+            description='Имя преподавателя',
+            example='Трубаков Евгений Олегович'
+        ),
+        at: datetime = Query(
+            default=None,
+            description='Время вместо текущего (без часового пояса — московское)',
+        )
+):
+    """Возвращает пары группы или преподавателя, идущие сейчас, и ближайшие следующие.
+
+    Неделя (`even` или `odd`) определяется по семестру из настроек `SEMESTER_*`.
+    """
+    schedule, party = await day_schedule(group, teacher)
+    moment = moscow_time(at)
+    return Response(
+        plain_json(slot_index.now(schedule, party, semester(moment.date()), moment)),
+        media_type="application/json",
+    )
+
+
+@app.get("/api/v2/today",
+         response_model=Today,
+         summary="Пары на сегодня",
+         tags=("Студенты", "Преподаватели"))
+async def get_today(
+        group: str = Query(
+            default=None,
+            description='Группа',
+            example='О-20-ИВТ-1-по-Б'
+        ),
+        teacher: str = Query(
+            default=None,
+            description='Имя преподавателя',
+            example='Трубаков Евгений Олегович'
+        ),
+        at: datetime = Query(
+            default=None,
+            description='Дата вместо сегодняшней (без часового пояса — московская)',
+        )
+):
+    """Возвращает пары группы или преподавателя на сегодня.
+
+    Неделя (`even` или `odd`) определяется по семестру из настроек `SEMESTER_*`.
+    """
+    schedule, party = await day_schedule(group, teacher)
+    moment = moscow_time(at)
+    return Response(
+        plain_json(slot_index.today(schedule, party, semester(moment.date()), moment)),
+        media_type="application/json",
+    )
+
+
+def lesson_index():
+    """Возвращает индекс пар или 503, если он ещё не построен."""
+    if not parser.lessons:
+        raise HTTPException(
+            status_code=503,
+            detail="Индекс аудиторий ещё не построен (нужен PREFETCH_ENABLED=1)")
+    return parser.lessons
+
+
+@app.get("/api/v2/rooms",
+         response_model=List[str],
+         summary="Список аудиторий",
+         tags=("Аудитории",))
+async def get_rooms():
+    """Возвращает все аудитории, встречающиеся в расписаниях групп."""
+    return lesson_index().rooms
+
+
+@app.get("/api/v2/rooms/free",
+         response_model=List[str],
+         summary="Свободные аудитории",
+         tags=("Аудитории",))
+async def get_free_rooms(
+        day: str = Query(
+            default=None,
+            description='День недели (monday, tuesday, ..., saturday)',
+            example='tuesday'
+        ),
+        week: str = Query(
+            default=None,
+            description='Неделя (odd или even); если не задана — свободные на обеих',
+            example='odd'
+        ),
+        number: List[int] = Query(
+            default=None,
+            description='Номера пар; если не заданы — свободные весь день',
+            example=[3, 4]
+        )
+):
+    """Возвращает аудитории, в которых нет ни одной из заданных пар."""
+    if day not in DAY_NAMES:
+        raise HTTPException(status_code=400, detail="Неверный день недели")
+
+    if week is not None and week not in WEEKS:
+        raise HTTPException(status_code=400, detail="Неделя должна быть odd или even")
+
+    if number and not all(1 <= n <= SLOTS for n in number):
+        raise HTTPException(status_code=400, detail=f"Номер пары должен быть от 1 до {SLOTS}")
+
+    mask = slot_mask(day, (week,) if week else WEEKS, number or None)
+    return lesson_index().free_rooms(mask)
+
+
+@app.get("/api/v2/room",
+         response_model=RoomSchedule,
+         summary="Занятость аудитории",
+         tags=("Аудитории",))
+async def get_room(room: str = Query(
+        default=None,
+        description='Аудитория, как в расписании',
+        example='А-101'
+)):
+    """Возвращает пары в заданной аудитории по дням и неделям."""
+    schedule = lesson_index().room(room)
+
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Аудитория не найдена")
+
+    return schedule
+
+
+def check_admin_token(x_admin_token: str = Header(default=None)):
+    """Пропускает запрос, только если передан верный `X-Admin-Token`."""
+    if not admin_token or not x_admin_token or \
+            not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Доступ запрещён")
+
+
+@app.get("/api/v2/cache",
+         summary="Статистика кэша",
+         tags=("Администрирование",),
+         dependencies=[Depends(check_admin_token)])
+async def get_cache_stats():
+    """Возвращает размер кэша, количество попаданий, промахов и устаревших ответов,
+    а также сколько одновременных запросов к сайту было объединено в один."""
+    return {
+        **cache.stats(),
+        "singleflight": parser.flights.stats(),
+        "encoded": encoded.stats(),
+        "calendars": calendars.stats(),
+        "slots": slot_index.stats(),
+    }
+
+
+@app.get("/api/v2/upstream",
+         summary="Состояние запросов к сайту БГТУ",
+         tags=("Администрирование",),
+         dependencies=[Depends(check_admin_token)])
+async def get_upstream_stats():
+    """Возвращает состояние размыкателя цепи, текущие таймауты и количество повторов."""
+    return guard.stats()
+
+
+@app.delete("/api/v2/cache",
+            summary="Сброс кэша",
+            tags=("Администрирование",),
+            dependencies=[Depends(check_admin_token)])
+async def invalidate_cache(
+        method: str = Query(
+            default=None,
+            description='Метод парсера (schedule, teacher_schedule, groups, '
+                        'meta); если не задан, кэш очищается полностью',
+            example='schedule'
+        ),
+        key: str = Query(
+            default=None,
+            description='Первый аргумент метода (группа, преподаватель, факультет)',
+            example='О-20-ИВТ-1-по-Б'
+        )
+):
+    """Удаляет записи из кэша, чтобы следующий запрос загрузил их с сайта заново."""
+    args = (key,) if key is not None else ()
+    return {"invalidated": await cache.invalidate(method, args)}
+
+
+@app.get("/api/v2/index",
+         summary="Состояние индекса пар",
+         tags=("Администрирование",),
+         dependencies=[Depends(check_admin_token)])
+async def get_index_stats():
+    """Возвращает, сколько групп, преподавателей и аудиторий в индексе пар,
+    собранном по расписаниям групп, и когда он построен."""
+    return {"source": teacher_source, **parser.lessons.stats()}
+
+
+@app.get("/api/v2/index/check",
+         summary="Сверка расписания преподавателя из индекса с сайтом",
+         tags=("Администрирование",),
+         dependencies=[Depends(check_admin_token)])
+async def check_index(teacher: str = Query(
+        default=None,
+        description='Имя преподавателя',
+        example='Трубаков Евгений Олегович'
+)):
+    """Загружает расписание преподавателя с сайта и возвращает пары,
+    которые расходятся с расписанием, собранным из расписаний групп."""
+    if not teacher:
+        raise HTTPException(status_code=400, detail="Не задан преподаватель")
+
+    differences = await check_teacher(parser, teacher)
+    return {"teacher": teacher, "matches": not differences, "differences": differences}
+
+
+@app.get("/api/v2/prefetch",
+         summary="Состояние фонового обновления",
+         tags=("Администрирование",),
+         dependencies=[Depends(check_admin_token)])
+async def get_prefetch_status():
+    """Возвращает ход фонового обновления расписаний и отставание от графика."""
+    return {"enabled": prefetch_enabled, **prefetcher.status()}
+
+
+@app.get("/metrics",
+         response_class=PlainTextResponse,
+         summary="Метрики Prometheus",
+         tags=("Администрирование",))
+async def get_metrics():
+    """Возвращает метрики в текстовом формате Prometheus: время и объём ответов
+    сайта БГТУ, ошибки и таймауты, время разбора и сериализации, попадания в кэш."""
+    return PlainTextResponse(metrics.REGISTRY.render(),
+                             media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8443)
+    if workers > 1 and (store is None or not store.shared):
+        logger.warning("У воркеров не будет общего кэша: задайте STORE_PATH")
+    elif workers > 1:
+        logger.warning("У каждого воркера своя лента /api/v2/changes: задайте CHANGES_WEBHOOK")
+    # Воркеры импортируют приложение сами, поэтому им передаётся строка импорта
+    uvicorn.run("app:app" if workers > 1 else app, host="0.0.0.0", port=8443, workers=workers)
@@ -0,0 +1,254 @@
+"""bench_parser.py
+
+Офлайн-бенчмарк парсера на сохранённых ответах сайта БГТУ.
+
+Запросы к сайту подменяются чтением файлов из `benchmarks/fixtures`,
+поэтому замеряется только разбор HTML. Для каждого случая считаются
+время одного вызова, пропускная способность и память (пик за вызов
+и размер результата), а итог сохраняется в `benchmarks/results/<метка>.json`.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_parser.py
+    python benchmarks/bench_parser.py --label v2.2.0 --compare benchmarks/results/v2.1.2.json
+    python benchmarks/bench_parser.py --record  # обновить фикстуры ответами сайта
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+RESULTS = Path(__file__).resolve().parent / "results"
+
+sys.path.insert(0, str(ROOT))
+
+# pylint: disable=C0413,W0212
+# Модули парсера импортируются после добавления корня репозитория в путь,
+# а бенчмарку нужны внутренние методы парсера
+from bgtu_parser import Parser
+from revalidation import Revalidator
+from schedule_table import BACKENDS
+
+GROUP = "О-20-ИВТ-1-по-Б"
+TEACHER = "Трубаков Евгений Олегович"
+FACULTY = "Факультет информационных технологий"
+
+LESSON_TIMES = [
+    "08:00 - 09:35",
+    "09:45 - 11:20",
+    "11:30 - 13:05",
+    "13:20 - 16:40",
+    "15:05 - 16:40",
+    "16:50 - 18:25",
+    "18:40 - 20:25",
+    "20:25 - 22:00",
+    # Время с ошибками, которое разбирается по часу начала
+    "13:25 - 15:00",
+    "18:45 - 20:20",
+]
+
+
+class FixtureParser(Parser):
+    """Парсер, который вместо сайта читает сохранённые ответы."""
+
+    class Page:
+        """Минимальная замена `requests.Response`."""
+
+        # pylint: disable=R0903
+        # Парсеру нужны только поля ответа
+
+        status_code = 200
+        headers = {}
+
+        def __init__(self, content: bytes) -> None:
+            self.content = content
+            self.text = content.decode("utf-8")
+
+    def __init__(self, html_backend: str = None) -> None:
+        super().__init__(html_backend=html_backend)
+        self.pages = {path.name: path.read_bytes() for path in FIXTURES.glob("*.html")}
+        # Ответы не меняются, а замерять нужно именно разбор
+        self.validators = Revalidator(maxsize=0)
+
+    @staticmethod
+    def fixture_name(url: str, params: dict = None) -> str:
+        """Возвращает имя файла фикстуры для запроса к сайту."""
+        params = params or {}
+
+        if "employees" in url:
+            return "employees.html"
+
+        if url.endswith("schedule.ajax.php"):
+            if params.get("namedata") == "group":
+                return "groups.html"
+            if params.get("form") == "teacher":
+                return "schedule_teacher.html"
+            return "schedule_group.html"
+
+        return "schedule_index.html"
+
+    def _get(self, url: str, params: dict = None, headers: dict = None):
+        return self.Page(self.pages[self.fixture_name(url, params)])
+
+
+def record() -> None:
+    """Перезаписывает фикстуры живыми ответами сайта БГТУ."""
+    parser = Parser()
+    period = parser.period
+    requests_ = [
+        (parser.url, {"form": "teacher"}),
+        (parser.url + "/schedule.ajax.php", parser._schedule_params(GROUP, period)),
+        (
+            parser.url + "/schedule.ajax.php",
+            parser._teacher_schedule_params(TEACHER, period),
+        ),
+        (parser.url + "/schedule.ajax.php", parser._groups_params(FACULTY, period)),
+        (f"{parser.base_url}/sveden/employees/", None),
+    ]
+
+    for url, params in requests_:
+        name = FixtureParser.fixture_name(url, params)
+        page = parser._get(url, params)
+        page.raise_for_status()
+        (FIXTURES / name).write_bytes(page.content)
+        print(f"{name}: {len(page.content)} байт")
+
+
+def measure(func, number: int, repeat: int = 5) -> dict:
+    """Замеряет время и память одного вызова `func`."""
+    func()
+
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return {
+        "time_ms": round(best * 1000, 4),
+        "ops_per_sec": round(1 / best, 1),
+        "peak_kib": round(peak / 1024, 1),
+        "retained_kib": round(retained / 1024, 1),
+    }
+
+
+def cases() -> dict:
+    """Возвращает замеряемые вызовы и количество повторов для каждого."""
+    parsers = {backend: FixtureParser(backend) for backend in BACKENDS}
+    default = FixtureParser()
+    default.period  # pylint: disable=W0104
+
+    def teacher_info_cold():
+        default._get_employees.cache_clear()
+        return default.teacher_info(TEACHER)
+
+    def meta():
+        default.meta.cache_clear()
+        return default.meta()
+
+    def lesson_numbers():
+        return [default.get_lesson_number(time) for time in LESSON_TIMES]
+
+    result = {}
+    for backend, parser in parsers.items():
+        parser.period  # pylint: disable=W0104
+        result[f"schedule[{backend}]"] = (lambda p=parser: p.schedule(GROUP), 200)
+        result[f"teacher_schedule[{backend}]"] = (
+            lambda p=parser: p.teacher_schedule(TEACHER),
+            200,
+        )
+
+    result["teacher_info[cold]"] = (teacher_info_cold, 3)
+    result["teacher_info[warm]"] = (lambda: default.teacher_info(TEACHER), 20000)
+    result["groups"] = (lambda: default.groups(FACULTY, "20"), 500)
+    result["meta"] = (meta, 50)
+    result["get_lesson_number"] = (lesson_numbers, 20000)
+    return result
+
+
+def git_label() -> str:
+    """Возвращает короткий хэш текущего коммита или `local`."""
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "describe", "--always", "--dirty"],
+                cwd=ROOT,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "local"
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Печатает изменение времени относительно сохранённого результата."""
+    print(f"\nСравнение с {baseline['label']}:")
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        change = (current["time_ms"] / previous["time_ms"] - 1) * 100
+        print(f"  {name:32} {previous['time_ms']:>10.4f} -> {current['time_ms']:>10.4f} мс"
+              f" ({change:+.1f}%)")
+
+
+def main() -> None:
+    """Точка входа."""
+    arguments = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    arguments.add_argument("--label", help="метка результата (по умолчанию — git describe)")
+    arguments.add_argument("--compare", help="файл результата для сравнения")
+    arguments.add_argument("--only", help="замерять только случаи, содержащие строку")
+    arguments.add_argument("--record", action="store_true",
+                           help="обновить фикстуры ответами сайта и выйти")
+    args = arguments.parse_args()
+
+    if args.record:
+        record()
+        return
+
+    results = {}
+    for name, (func, number) in cases().items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = measure(func, number)
+        stats = results[name]
+        print(f"{name:32} {stats['time_ms']:>10.4f} мс {stats['ops_per_sec']:>12.1f} оп/с"
+              f" пик {stats['peak_kib']:>9.1f} КиБ")
+
+    label = args.label or git_label()
+    RESULTS.mkdir(exist_ok=True)
+    output = RESULTS / f"{label}.json"
+    output.write_text(
+        json.dumps(
+            {
+                "label": label,
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            },
+            ensure_ascii=False,
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    print(f"\nРезультат сохранён в {output.relative_to(ROOT)}")
+
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
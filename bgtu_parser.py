@@ -3,60 +3,191 @@
 Этот модуль представляет собой парсер веб-сайта БГТУ.
 """
 
-from copy import deepcopy
+import asyncio
 from datetime import datetime
+from time import monotonic
+from typing import Any, Callable, Optional, Tuple
 
+import httpx
 import requests
 from bs4 import BeautifulSoup, Tag
 from cachetools.func import ttl_cache
 from rss_parser import Parser as RSSParser
 
+import metrics
+from cache import ResultCache, SingleFlight, cached, coalesced
+from changes import ChangeFeed
+from employees import EmployeeIndex
+from group_directory import normalize_year
+from lesson_index import LessonIndex
+from revalidation import Revalidator, Validated, body_digest
+from schedule_table import iter_lessons
+from storage import Store
+from timetable import LESSON_TIMES, Entry, Timetable
+from upstream import UpstreamGuard
 
-class Parser:
-    """Объект парсера сайта БГТУ."""
+try:
+    import h2  # pylint: disable=W0611
 
-    def __init__(
-        self, chromedriver_path: str = "chromedriver.exe", headless: bool = True
-    ) -> None:
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Таймаут запросов к сайту БГТУ, в секундах (у асинхронного парсера — наибольший)
+UPSTREAM_TIMEOUT = 15
+
+# Время жизни кэша периода, в секундах (7 дней)
+PERIOD_TTL = 604800
+
+# Время жизни справочных данных синхронного парсера, в секундах (12 часов)
+META_TTL = 43200
+
+# Время жизни справочника сотрудников, в секундах (1 день)
+EMPLOYEES_TTL = 86400
+
+
+class _ParserBase:
+    """Общая часть синхронного и асинхронного парсеров.
+
+    Отвечает только за разбор HTML, загрузка страниц остаётся за наследниками.
+    """
+
+    # pylint: disable=R0903
+    # Публичные методы добавляют наследники
+
+    def __init__(self, html_backend: str = None) -> None:
         self.url = "https://www.tu-bryansk.ru/education/schedule"
         self.base_url = "https://www.tu-bryansk.ru"
+        self.nophoto = f"{self.base_url}/local/templates/bstu/img/nophoto.svg"
+        self.html_backend = html_backend
+        self.changes: Optional[ChangeFeed] = None
+        self.validators = Revalidator()
 
     @staticmethod
     def _get_initials(name: str):
-        l_n, f_n, p_n = name.split(" ")
-        return f"{l_n} {f_n[0]}. {p_n[0]}."
+        # ? Не у всех сотрудников есть отчество, а у кого-то ФИО из 4+ слов
+        l_n, *other = name.split()
+        return " ".join([l_n] + [f"{part[0]}." for part in other])
 
-    def teacher_list(self) -> list:
-        """Парсинг списка преподавателей.
+    @staticmethod
+    def _normalize_year(year: str):
+        return normalize_year(year)
+
+    def _reuse(self, kind: tuple, key: tuple, page) -> Tuple[Optional[Validated], str]:
+        """Проверяет, совпадает ли ответ с прежним (304 или то же тело).
 
         Возвращает:
-            list[str]: список преподавателей
+            tuple[Validated | None, str]: прежний ответ (если его можно
+                использовать без разбора) и хэш тела нового ответа
         """
-        params = {"form": "teacher"}
-        page = requests.get(self.url, params, timeout=15)
-        soup = BeautifulSoup(page.text, "html.parser")
-        combobox = soup.find("select", {"id": "teacher"})
-        options = combobox.find_all("option")
-        options = [option.text.replace("_", " ") for option in options][1:]
-        return options
+        digest = body_digest(page.content)
+        entry = self.validators.reuse(key, page.status_code, page.headers, digest)
 
-    # Кэш на 7 дней
-    @ttl_cache(ttl=604800)
-    def _get_period(self) -> str:
-        page = requests.get(self.url, timeout=15)
-        soup = BeautifulSoup(page.text, "html.parser")
-        options = soup.select("select#period option")
-        period = str(options[0]["value"])
+        if entry is not None:
+            reason = "not_modified" if page.status_code == 304 else "identical"
+            metrics.PARSE_SKIPPED.inc(method=kind[0], reason=reason)
 
-        if period.endswith("2"):
-            #! Если период заканчивается на 2, это расписание сессии
-            period = str(options[1]["value"])
+        return entry, digest
 
-        return period
+    def _remember(self, kind: tuple, key: tuple, page, digest: str, result: Any) -> None:
+        """Запоминает разобранный ответ и публикует изменения расписания."""
+        previous = self.validators.get(key)
+        self.validators.remember(key, page.status_code, page.headers, digest, result)
 
-    @property
-    def period(self) -> str:
-        return self._get_period()
+        if self.changes is None or not isinstance(result, Timetable):
+            return
+
+        old = previous.result if previous is not None else self._previous(kind)
+        if old is not None and old.digest() != result.digest():
+            self.changes.publish(kind[0], old, result)
+
+    def _previous(self, kind: tuple) -> Optional[Timetable]:
+        """Прежняя версия расписания, если ответа с ним в этом запуске ещё не было."""
+        # pylint: disable=W0613
+        return None
+
+    @staticmethod
+    def _endpoint(url: str, params: dict = None) -> str:
+        """Возвращает тип страницы сайта для метрик."""
+        params = params or {}
+
+        if url.endswith("schedule.ajax.php"):
+            if params.get("namedata") == "group":
+                return "groups"
+            if params.get("form") == "teacher":
+                return "teacher_schedule"
+            return "schedule"
+
+        if "employees" in url:
+            return "employees"
+
+        if url.endswith("rss/reviews"):
+            return "news"
+
+        return "index"
+
+    def _schedule_params(self, group: str, period: str) -> dict:
+        return {
+            "namedata": "schedule",
+            "group": group,
+            "period": period,
+            "form": "очная",
+        }
+
+    def _teacher_schedule_params(self, teacher: str, period: str) -> dict:
+        return {
+            "namedata": "schedule",
+            "teacher": teacher.replace(" ", "_"),
+            "period": period,
+            "form": "teacher",
+        }
+
+    def _groups_params(self, faculty: str, period: str) -> dict:
+        return {
+            "namedata": "group",
+            "period": period,
+            "form": "очная",
+            "faculty": faculty,
+        }
+
+    @staticmethod
+    def _options(soup: BeautifulSoup, select: str) -> list:
+        # Первый пункт списков-фильтров — подсказка без значения
+        return [
+            option.text for option in soup.select(f"select#{select} option")
+            if option.get("value")
+        ]
+
+    def _parse_meta(self, html: str) -> dict:
+        """Разбирает все списки страницы расписания за один проход.
+
+        Возвращает:
+            dict: периоды, формы обучения, факультеты и преподаватели
+                в формате модели `Meta`
+        """
+        soup = BeautifulSoup(html, "html.parser")
+        periods = [
+            {
+                "value": str(option["value"]),
+                "name": option.text.strip(),
+                #! Если период заканчивается на 2, это расписание сессии
+                "session": str(option["value"]).endswith("2"),
+            }
+            for option in soup.select("select#period option")
+        ]
+
+        period = periods[0]["value"]
+        if periods[0]["session"]:
+            period = periods[1]["value"]
+
+        return {
+            "period": period,
+            "periods": periods,
+            "forms": self._options(soup, "form"),
+            "faculties": self._options(soup, "faculty"),
+            "teachers": [name.replace("_", " ") for name in self._options(soup, "teacher")],
+            "last_updated": datetime.now(),
+        }
 
     def get_lesson_number(self, lesson_time: str, index: bool = True) -> int:
         """Определяет номер пары по её времени.
@@ -68,20 +199,8 @@ class Parser:
         Возвращает:
             int: номер/индекс пары
         """
-        lesson_times = {
-            "08:00 - 09:35": 1,
-            "09:45 - 11:20": 2,
-            "11:30 - 13:05": 3,
-            "13:20 - 14:55": 4,
-            "13:20 - 16:40": 4,
-            "15:05 - 16:40": 5,
-            "16:50 - 18:25": 6,
-            "18:40 - 20:15": 7,
-            "18:40 - 20:25": 7,
-            "20:25 - 22:00": 8,
-        }
         lesson_times_start = {
-            time.split(" - ")[0]: number for time, number in lesson_times.items()
+            time.split(" - ")[0]: number for time, number in LESSON_TIMES.items()
         }
         lesson_hours_start = {
             time.split(":")[0]: number for time, number in lesson_times_start.items()
@@ -102,261 +221,293 @@ class Parser:
 
         return lesson_number
 
-    def teacher_schedule(self, teacher: str) -> dict:
-        """Парсинг расписания преподавателя.
+    @metrics.PARSE_SECONDS.time(method="teacher_schedule")
+    def _parse_teacher_schedule(self, html: str, teacher: str) -> Timetable:
+        lessons = iter_lessons(html, self.get_lesson_number, self.html_backend)
+
+        def entries():
+            for day, week_type, index, subject, group_text, room in lessons:
+                #! Группа
+                group = ", ".join(
+                    [group.strip() for group in group_text.split(".")][:-1]
+                )
+                yield day, week_type, index, Entry(subject, room, group)
+
+        # В расписании преподавателя в каждом слоте остаётся последняя пара
+        return Timetable.build(teacher, entries(), replace=True)
+
+    @metrics.PARSE_SECONDS.time(method="employees")
+    def _parse_employees(self, html: str) -> list:
+        soup = BeautifulSoup(html, "html.parser")
+        cards = []
+
+        teacher_link: Tag
+        for teacher_link in soup.find_all("a"):
+            if not teacher_link.string:
+                continue
 
-        Аргументы:
-            teacher (str): полное ФИО преподавателя
+            teacher_card = teacher_link
+            for _ in range(4):
+                teacher_card = teacher_card.parent if teacher_card else None
 
-        Возвращает:
-            dict: словарь с расписанием преподавателя
-        """
-        # pylint: disable=R0914,R0915
-        # Большое кол-во локальных переменных и if-else обусловлено
-        # сложным форматом расписания на сайте
-        if not teacher:
-            return None
+            if not teacher_card:
+                continue
 
-        days = {
-            "Понедельник": "monday",
-            "Вторник": "tuesday",
-            "Среда": "wednesday",
-            "Четверг": "thursday",
-            "Пятница": "friday",
-            "Суббота": "saturday",
-        }
+            faculty_field = teacher_card.select_one("div.department-parent.field")
+            department_field = teacher_card.select_one("div.department.field")
 
-        lesson_times = {
-            "08:00 - 09:35": 1,
-            "09:45 - 11:20": 2,
-            "11:30 - 13:05": 3,
-            "13:20 - 14:55": 4,
-            "13:20 - 16:40": 4,
-            "15:05 - 16:40": 5,
-            "16:50 - 18:25": 6,
-            "18:40 - 20:15": 7,
-            "18:40 - 20:25": 7,
-            "20:25 - 22:00": 8,
-        }
+            # ? Карточка без факультета и кафедры — это не преподаватель
+            if not (faculty_field and department_field):
+                continue
 
-        lesson_time_start = {
-            "08:00": 1,
-            "09:45": 2,
-            "11:30": 3,
-            "13:20": 4,
-            "15:05": 5,
-            "16:50": 6,
-            "18:40": 7,
-            "20:25": 8,
-        }
+            phone_field = teacher_card.select_one("div.phone.field")
+            email_field = teacher_card.select_one("div.email.field")
+            img_field = teacher_card.get("data-photo", None)
+
+            cards.append(
+                {
+                    "name": str(teacher_link.string),
+                    "faculty": faculty_field.select_one(".val").text,
+                    "department": department_field.select_one(".val").text,
+                    "phone": phone_field.select_one(".val").text
+                    if phone_field
+                    else None,
+                    "email": email_field.select_one(".val").text
+                    if email_field
+                    else None,
+                    "img_src": str(self.base_url + str(img_field))
+                    if img_field
+                    else self.nophoto,
+                }
+            )
 
-        teacher_weekday_model_ = {
-            "even": [
-                {"number": i, "subject": "-", "room": "-", "group": "-"}
-                for i in range(1, 9)
-            ],
-            "odd": [
-                {"number": i, "subject": "-", "room": "-", "group": "-"}
-                for i in range(1, 9)
-            ],
-        }
+        return cards
 
-        schedule = {
-            "last_updated": datetime.now(),
-            "monday": deepcopy(teacher_weekday_model_),
-            "tuesday": deepcopy(teacher_weekday_model_),
-            "wednesday": deepcopy(teacher_weekday_model_),
-            "thursday": deepcopy(teacher_weekday_model_),
-            "friday": deepcopy(teacher_weekday_model_),
-            "saturday": deepcopy(teacher_weekday_model_),
+    def _teacher_info(self, employees: EmployeeIndex, name: str) -> dict:
+        teacher = {
+            "name": name,
+            "initials": self._get_initials(name),
+            "faculty": None,
+            "department": None,
+            "phone": None,
+            "email": None,
+            "img_src": self.nophoto,
+            "schedule": {},
         }
 
-        params = {
-            "namedata": "schedule",
-            "teacher": teacher.replace(" ", "_"),
-            "period": self.period,
-            "form": "teacher",
-        }
-        page = requests.get(self.url + "/schedule.ajax.php", params, timeout=15)
-        soup = BeautifulSoup(page.text, "html.parser")
-        rows = soup.find_all("tr")
+        card = employees.get(name)
 
-        row: Tag
+        # ? Если не найдено имя на странице
+        if card:
+            teacher.update(card)
 
-        # Тип недели
-        week_type = "both"
+        return teacher
 
-        # Время пары
-        lesson_time = ""
+    def _parse_all_groups(self, html: str) -> list:
+        soup = BeautifulSoup(html, "html.parser")
+        return [group.text for group in soup.find_all("option") if group.get("value")]
 
-        for row in rows:
-            #! День недели
-            if row.select_one(".daeweek"):
-                day = days[row.text]
-                continue
+    def _parse_groups(self, html: str, year: str) -> list:
+        soup = BeautifulSoup(html, "html.parser")
 
-            #! Время
-            time_cell = row.select_one(".schtime")
+        groups: list[Tag] = soup.find_all("option")
+        group_list = [
+            group.text
+            for group in groups
+            if group.get("value") and (not year or year in group["value"].split("-"))
+        ]
 
-            if not time_cell:
-                # ? Времени нет => вторая пара в разделе
-                week_type = "even"
+        return group_list
 
-            elif time_cell.has_attr("rowspan"):
-                # ? Есть rowspan => первая пара в разделе
-                lesson_time = time_cell.text.lstrip()
-                index = self.get_lesson_number(lesson_time) - 1
-                week_type = "odd"
+    @metrics.PARSE_SECONDS.time(method="schedule")
+    def _parse_schedule(self, html: str, group: str) -> Timetable:
+        lessons = iter_lessons(html, self.get_lesson_number, self.html_backend)
 
-            else:
-                # ? Есть время, нет rowspan => обычная пара
-                lesson_time = time_cell.text.lstrip()
-                index = self.get_lesson_number(lesson_time) - 1
-                week_type = "both"
+        def entries():
+            for day, week_type, index, subject, teacher_text, room in lessons:
+                #! Преподаватель
+                teacher = ", ".join(
+                    [teacher.strip() for teacher in teacher_text.split("\n")]
+                )
+                yield day, week_type, index, Entry(subject, room, teacher)
 
-            #! Предмет
-            subject_cell = row.select_one(".schname")
+        return Timetable.build(group, entries())
 
-            if not subject_cell.text:
-                # ? Пары нет (окно)
-                continue
+    @staticmethod
+    def _parse_news(xml: bytes):
+        parser = RSSParser(xml=xml)
+        feed = parser.parse()
+        return feed
 
-            subject_name = subject_cell.contents[0].text.strip("/\\ ")
-            subject_type = subject_cell.contents[2].text.strip("/\\ ")
 
-            if "практическое" in subject_type.lower():
-                subject = f"[ПЗ] {subject_name}"
+class Parser(_ParserBase):
+    """Объект парсера сайта БГТУ."""
 
-            elif "лекция" in subject_type.lower():
-                subject = f"[Л] {subject_name}"
+    def __init__(
+        self,
+        chromedriver_path: str = "chromedriver.exe",
+        headless: bool = True,
+        html_backend: str = None,
+    ) -> None:
+        super().__init__(html_backend)
+        # Одна сессия на весь парсер: соединения с сайтом переиспользуются
+        self.session = requests.Session()
 
-            elif "лабораторное" in subject_type.lower():
-                subject = f"[ЛАБ] {subject_name}"
+    def _get(self, url: str, params: dict = None, headers: dict = None) -> requests.Response:
+        endpoint = self._endpoint(url, params)
 
-            else:
-                subject = f"[{subject_type[:5].upper()}] {subject_name}"
+        with metrics.track_upstream(endpoint, (requests.Timeout,)):
+            page = self.session.get(
+                url, params=params, headers=headers, timeout=UPSTREAM_TIMEOUT
+            )
 
-            #! Группа
-            group_cell = row.select_one(".schteacher")
+        metrics.record_upstream_response(endpoint, page.status_code, len(page.content))
+        return page
 
-            group = ", ".join(
-                [group.strip() for group in group_cell.text.split(".")][:-1]
-            )
+    def _fetch(self, kind: tuple, url: str, params: dict, parse: Callable) -> Any:
+        """Загружает страницу условным запросом и разбирает её, если она изменилась.
 
-            #! Аудитория
-            room_cell = row.select_one(".schclass")
-            room = room_cell.text
-
-            #! Добавление данных в результирующий словарь
-            if week_type == "both":
-                schedule[day]["odd"][index]["number"] = index + 1
-                schedule[day]["odd"][index]["subject"] = subject
-                schedule[day]["odd"][index]["room"] = room
-                schedule[day]["odd"][index]["group"] = group
-
-                schedule[day]["even"][index]["number"] = index + 1
-                schedule[day]["even"][index]["subject"] = subject
-                schedule[day]["even"][index]["room"] = room
-                schedule[day]["even"][index]["group"] = group
-            else:
-                schedule[day][week_type][index]["number"] = index + 1
-                schedule[day][week_type][index]["subject"] = subject
-                schedule[day][week_type][index]["room"] = room
-                schedule[day][week_type][index]["group"] = group
+        Аргументы:
+            kind (tuple): что извлекается из страницы (`("schedule", group)`)
+            url (str): адрес страницы
+            params (dict | None): параметры запроса
+            parse (Callable): функция разбора ответа
 
-        return schedule
+        Возвращает:
+            Any: результат разбора (прежний, если страница не изменилась)
+        """
+        key = self.validators.key(kind, url, params)
+        page = self._get(url, params, self.validators.headers(key))
+        entry, digest = self._reuse(kind, key, page)
 
-    def teacher_info(self, name: str) -> dict:
-        """Парсинг информации о преподавателе по полному ФИО.
+        if entry is not None:
+            return entry.result
 
-        Аргументы:
-            name (str): имя преподавателя
+        if page.status_code == 304:
+            # Прежний ответ уже вытеснен — загружаем страницу целиком
+            page = self._get(url, params)
+            digest = body_digest(page.content)
+
+        result = parse(page)
+        self._remember(kind, key, page, digest, result)
+        return result
+
+    # Кэш на 12 часов
+    @ttl_cache(ttl=META_TTL)
+    def meta(self) -> dict:
+        """Парсинг справочных данных со страницы расписания одним запросом.
 
         Возвращает:
-            dict: словарь с информацией о преподавателе
+            dict: текущий и все учебные периоды, формы обучения, факультеты
+                и преподаватели
         """
-        teacher = {
-            "name": name,
-            "initials": self._get_initials(name),
-            "faculty": None,
-            "department": None,
-            "phone": None,
-            "email": None,
-            "img_src": None,
-            "schedule": {},
-        }
+        return self._fetch(
+            ("meta",), self.url, {"form": "teacher"}, lambda page: self._parse_meta(page.text)
+        )
 
-        url = f"{self.base_url}/sveden/employees/"
-        page = requests.get(url, timeout=15)
-        soup = BeautifulSoup(page.text, "html.parser")
-        teacher_link = soup.find("a", string=name)
-        nophoto = "https://www.tu-bryansk.ru/local/templates/bstu/img/nophoto.svg"
+    def teacher_list(self) -> list:
+        """Парсинг списка преподавателей.
 
-        # ? Если не найдено имя на странице
-        if not teacher_link:
-            teacher["img_src"] = (
-                "https://www.tu-bryansk.ru/local/templates/bstu/img/nophoto.svg"
-            )
-            return teacher
+        Возвращает:
+            list[str]: список преподавателей
+        """
+        return self.meta()["teachers"]
 
-        teacher_card = teacher_link.parent.parent.parent.parent
+    def faculties(self) -> list:
+        """Парсинг списка факультетов со страницы расписания.
 
-        faculty_field = teacher_card.select_one("div.department-parent.field")
-        department_field = teacher_card.select_one("div.department.field")
-        phone_field = teacher_card.select_one("div.phone.field")
-        email_field = teacher_card.select_one("div.email.field")
-        img_field = teacher_card.get("data-photo", None)
+        Возвращает:
+            list[str]: список факультетов
+        """
+        return self.meta()["faculties"]
 
-        if faculty_field and department_field:
-            #! Факультет
-            teacher["faculty"] = faculty_field.select_one(".val").text
+    # Кэш на 7 дней
+    @ttl_cache(ttl=PERIOD_TTL)
+    def _get_period(self) -> str:
+        return self.meta()["period"]
 
-            #! Кафедра
-            teacher["department"] = department_field.select_one(".val").text
+    @property
+    def period(self) -> str:
+        return self._get_period()
 
-            #! Телефон
-            if phone_field:
-                teacher["phone"] = phone_field.select_one(".val").text
+    # Кэш на 1 день
+    @ttl_cache(ttl=EMPLOYEES_TTL)
+    def _get_employees(self) -> EmployeeIndex:
+        cards = self._fetch(
+            ("employees",),
+            f"{self.base_url}/sveden/employees/",
+            None,
+            lambda page: self._parse_employees(page.text),
+        )
+        return EmployeeIndex(cards)
 
-            #! E-mail
-            if email_field:
-                teacher["email"] = email_field.select_one(".val").text
+    def teacher_schedule(self, teacher: str) -> dict:
+        """Парсинг расписания преподавателя.
 
-            #! Фото
-            if img_field:
-                teacher["img_src"] = str(self.base_url + str(img_field))
-            else:
-                teacher["img_src"] = nophoto
+        Аргументы:
+            teacher (str): полное ФИО преподавателя
 
-        return teacher
+        Возвращает:
+            dict: словарь с расписанием преподавателя
+        """
+        if not teacher:
+            return None
+
+        params = self._teacher_schedule_params(teacher, self.period)
+        schedule = self._fetch(
+            ("teacher_schedule", teacher),
+            self.url + "/schedule.ajax.php",
+            params,
+            lambda page: self._parse_teacher_schedule(page.text, teacher),
+        )
+        return schedule.to_teacher_schedule()
+
+    def teacher_info(self, name: str) -> dict:
+        """Парсинг информации о преподавателе по полному ФИО.
+
+        Аргументы:
+            name (str): имя преподавателя
+
+        Возвращает:
+            dict: словарь с информацией о преподавателе
+        """
+        return self._teacher_info(self._get_employees(), name)
+
+    def department(self, department: str) -> list:
+        """Возвращает всех преподавателей кафедры из справочника сотрудников.
+
+        Аргументы:
+            department (str): полное название кафедры
+
+        Возвращает:
+            list[dict]: список словарей с информацией о преподавателях
+        """
+        employees = self._get_employees()
+        return [
+            self._teacher_info(employees, card["name"])
+            for card in employees.department(department)
+        ]
 
     def groups(
         self, faculty: str = "Факультет информационных технологий", year: str = None
     ):
-        if year:
-            year = str(year)
-            if len(year) > 2:
-                year = year[2:]
-            if not year.isdigit():
-                raise ValueError("Incorrect year string")
-
-        params = {
-            "namedata": "group",
-            "period": self.period,
-            "form": "очная",
-            "faculty": faculty,
-        }
-        page = requests.get(self.url + "/schedule.ajax.php", params, timeout=15)
-        soup = BeautifulSoup(page.text, "html.parser")
+        """Парсинг списка групп факультета по году поступления.
 
-        groups: list[Tag] = soup.find_all("option")
-        group_list = [
-            group.text
-            for group in groups
-            if year and year in group.attrs.get("value", "").split("-")
-        ]
+        Аргументы:
+            faculty (str): полное название факультета
+            year (str): год поступления (`20` или `2020`)
 
-        return group_list
+        Возвращает:
+            list[str]: список групп
+        """
+        year = self._normalize_year(year)
+        params = self._groups_params(faculty, self.period)
+        return self._fetch(
+            ("groups", year),
+            self.url + "/schedule.ajax.php",
+            params,
+            lambda page: self._parse_groups(page.text, year),
+        )
 
     def teacher(self, name: str) -> dict:
         """Возвращает преподавателя с расписанием по полному ФИО.
@@ -385,144 +536,416 @@ class Parser:
         Возвращает:
             dict: словарь с расписанием группы
         """
-        # pylint: disable=R0914,R0915
-        # Большое кол-во локальных переменных и if-else обусловлено
-        # сложным форматом расписания на сайте
-        teacher = ""
-        days = {
-            "Понедельник": "monday",
-            "Вторник": "tuesday",
-            "Среда": "wednesday",
-            "Четверг": "thursday",
-            "Пятница": "friday",
-            "Суббота": "saturday",
-        }
+        params = self._schedule_params(group, self.period)
+        schedule = self._fetch(
+            ("schedule", group),
+            self.url + "/schedule.ajax.php",
+            params,
+            lambda page: self._parse_schedule(page.text, group),
+        )
+        return schedule.to_schedule()
 
-        lesson_times = {
-            "08:00 - 09:35": 1,
-            "09:45 - 11:20": 2,
-            "11:30 - 13:05": 3,
-            "13:20 - 14:55": 4,
-            "13:20 - 16:40": 4,
-            "15:05 - 16:40": 5,
-            "16:50 - 18:25": 6,
-            "18:40 - 20:15": 7,
-            "18:40 - 20:25": 7,
-            "20:25 - 22:00": 8,
-        }
+    def _news(self):
+        # REVIEW: надо полностью перенести метод получения новостей сюда
+        return self._fetch(
+            ("news",),
+            self.base_url + "/info/press.rss/reviews",
+            None,
+            lambda page: self._parse_news(page.content),
+        )
+
+
+class AsyncParser(_ParserBase):
+    """Асинхронный объект парсера сайта БГТУ.
+
+    Все запросы идут через один `httpx.AsyncClient` с пулом keep-alive
+    соединений (и HTTP/2, если установлен пакет `h2`), поэтому TLS-рукопожатие
+    с сайтом выполняется один раз на соединение, а не на каждый запрос.
+
+    Аргументы:
+        max_connections (int): максимум одновременных соединений с сайтом
+        max_keepalive (int): максимум простаивающих соединений в пуле
+        max_concurrency (int): максимум одновременных запросов к сайту
+            (если защита `guard` не задана)
+        cache (ResultCache | None): кэш результатов (без него каждый вызов идёт на сайт)
+        store (Store | None): постоянное хранилище периода и справочника
+            сотрудников, переживающее перезапуск приложения
+        html_backend (str | None): бэкенд разбора таблиц расписания
+        changes (ChangeFeed | None): лента изменений расписаний
+            (по умолчанию — новая, без вебхука)
+        guard (UpstreamGuard | None): ограничения, повторы и размыкатель цепи
+            для запросов к сайту (по умолчанию — только `max_concurrency`
+            одновременных запросов и повторы)
+    """
+
+    # pylint: disable=R0902
+    # Кэш, защита сайта, индексы и ленты изменений — разные части состояния парсера
 
-        weekday_model_ = {
-            "even": [],
-            "odd": [],
-        }
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        max_concurrency: int = 8,
+        *,
+        cache: ResultCache = None,
+        store: Store = None,
+        html_backend: str = None,
+        changes: ChangeFeed = None,
+        guard: UpstreamGuard = None,
+    ) -> None:
+        # pylint: disable=R0913
+        super().__init__(html_backend)
+        self.cache = cache
+        self.store = store
+        self.changes = changes if changes is not None else ChangeFeed()
+        if cache is not None:
+            # Расписания хранятся сеткой `Timetable`, а в JSON — списками
+            cache.loaders.update(
+                schedule=Timetable.from_json, teacher_schedule=Timetable.from_json
+            )
+        self.guard = guard if guard is not None else UpstreamGuard(
+            max_concurrency=max_concurrency, timeout=UPSTREAM_TIMEOUT
+        )
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=UPSTREAM_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+            ),
+        )
+        # Последний полученный учебный период (`None`, пока он не загружен)
+        self.period: Optional[str] = None
+        self._period_expires = 0.0
+        self.employees = EmployeeIndex()
+        self.lessons = LessonIndex()
+        self.flights = SingleFlight()
+
+    async def aclose(self) -> None:
+        """Закрывает пул соединений."""
+        await self.client.aclose()
+        await self.changes.aclose()
+
+    def _previous(self, kind: tuple) -> Optional[Timetable]:
+        # После перезапуска прежняя версия может быть в кэше (из хранилища)
+        entry = self.cache.get(kind) if self.cache is not None else None
+        return entry.value if entry is not None else None
+
+    async def _get(
+        self, url: str, params: dict = None, headers: dict = None
+    ) -> httpx.Response:
+        endpoint = self._endpoint(url, params)
+
+        async def send(timeout: float) -> httpx.Response:
+            with metrics.track_upstream(endpoint, (httpx.TimeoutException,)):
+                page = await self.client.get(
+                    url, params=params, headers=headers, timeout=timeout
+                )
+
+            metrics.record_upstream_response(endpoint, page.status_code, len(page.content))
+            return page
+
+        return await self.guard.request(endpoint, send)
+
+    async def _fetch(
+        self, kind: tuple, url: str, params: dict, parse: Callable, executor: bool = False
+    ) -> Any:
+        """Загружает страницу условным запросом и разбирает её, если она изменилась.
 
-        schedule = {
-            "group": group,
-            "last_updated": str(datetime.now()),
-            "monday": deepcopy(weekday_model_),
-            "tuesday": deepcopy(weekday_model_),
-            "wednesday": deepcopy(weekday_model_),
-            "thursday": deepcopy(weekday_model_),
-            "friday": deepcopy(weekday_model_),
-            "saturday": deepcopy(weekday_model_),
-        }
+        Аргументы:
+            kind (tuple): что извлекается из страницы (`("schedule", group)`)
+            url (str): адрес страницы
+            params (dict | None): параметры запроса
+            parse (Callable): функция разбора ответа
+            executor (bool): разбирать ли ответ в отдельном потоке
 
-        params = {
-            "namedata": "schedule",
-            "group": group,
-            "period": self.period,
-            "form": "очная",
-        }
-        page = requests.get(self.url + "/schedule.ajax.php", params, timeout=15)
-        soup = BeautifulSoup(page.text, "html.parser")
-        rows = soup.find_all("tr")
+        Возвращает:
+            Any: результат разбора (прежний, если страница не изменилась)
+        """
+        key = self.validators.key(kind, url, params)
+        page = await self._get(url, params, self.validators.headers(key))
+        entry, digest = self._reuse(kind, key, page)
 
-        row: Tag
+        if entry is not None:
+            return entry.result
 
-        # Тип недели
-        week_type = "both"
+        if page.status_code == 304:
+            # Прежний ответ уже вытеснен — загружаем страницу целиком
+            page = await self._get(url, params)
+            digest = body_digest(page.content)
 
-        # Время пары
-        lesson_time = ""
+        if executor:
+            result = await asyncio.get_running_loop().run_in_executor(None, parse, page)
+        else:
+            result = parse(page)
 
-        for row in rows:
-            #! День недели
-            if row.select_one(".daeweek"):
-                day = days[row.text]
-                continue
+        self._remember(kind, key, page, digest, result)
+        return result
 
-            #! Время
-            time_cell = row.select_one(".schtime")
+    @cached
+    @coalesced
+    async def meta(self) -> dict:
+        """Парсинг справочных данных со страницы расписания одним запросом.
 
-            if not time_cell:
-                # ? Времени нет => вторая пара в разделе
-                week_type = "even"
+        Периоды, формы обучения, факультеты и преподаватели кэшируются
+        и обновляются вместе; текущий период обновляется вместе с ними.
 
-            elif time_cell.has_attr("rowspan"):
-                # ? Есть rowspan => первая пара в разделе
-                lesson_time = time_cell.text.lstrip()
-                index = self.get_lesson_number(lesson_time) - 1
-                week_type = "odd"
+        Возвращает:
+            dict: данные в формате модели `Meta`
+        """
+        return await self._fetch(
+            ("meta",), self.url, {"form": "teacher"}, lambda page: self._parse_meta(page.text)
+        )
 
-            else:
-                # ? Есть время, нет rowspan => обычная пара
-                lesson_time = time_cell.text.lstrip()
-                index = self.get_lesson_number(lesson_time) - 1
-                week_type = "both"
+    async def teacher_list(self) -> list:
+        """Парсинг списка преподавателей.
 
-            #! Предмет
-            subject_cell = row.select_one(".schname")
+        Возвращает:
+            list[str]: список преподавателей
+        """
+        return (await self.meta())["teachers"]
 
-            if not subject_cell.text:
-                # ? Пары нет (окно)
-                continue
+    async def faculties(self) -> list:
+        """Парсинг списка факультетов со страницы расписания.
 
-            subject_name = subject_cell.contents[0].text.strip("/\\ ")
-            subject_type = subject_cell.contents[2].text.strip("/\\ ")
+        Возвращает:
+            list[str]: список факультетов
+        """
+        return (await self.meta())["faculties"]
 
-            if "практическое" in subject_type.lower():
-                subject = f"[ПЗ] {subject_name}"
+    async def get_period(self) -> str:
+        """Возвращает текущий учебный период.
 
-            elif "лекция" in subject_type.lower():
-                subject = f"[Л] {subject_name}"
+        Период берётся из справочных данных (`meta`) и кэшируется вместе с
+        ними, поэтому с общим хранилищем его загружает один процесс. Без кэша
+        результатов период запоминается на 7 дней.
+        """
+        if (self.cache is None and self.period is not None
+                and monotonic() < self._period_expires):
+            return self.period
 
-            elif "лабораторное" in subject_type.lower():
-                subject = f"[ЛАБ] {subject_name}"
+        self.period = (await self.meta())["period"]
+        self._period_expires = monotonic() + PERIOD_TTL
+        return self.period
 
-            else:
-                subject = f"[{subject_type[:5].upper()}] {subject_name}"
+    async def get_employees(self) -> EmployeeIndex:
+        """Возвращает справочник сотрудников.
+
+        Карточки справочника кэшируются, как и другие результаты парсера
+        (с общим хранилищем их загружает с сайта один процесс), а индекс
+        перестраивается, только когда карточки обновились. Без кэша
+        результатов справочник загружается один раз.
+        """
+        if self.cache is None and self.employees.updated is not None:
+            return self.employees
+
+        cards = await self._employee_cards()
+        if cards is not self.employees.cards:
+            self.employees = EmployeeIndex(cards)
+
+        return self.employees
+
+    @cached
+    @coalesced
+    async def _employee_cards(self) -> list:
+        # Страница большая, поэтому разбор выполняется в отдельном потоке,
+        # чтобы не блокировать цикл событий
+        return await self._fetch(
+            ("employees",),
+            f"{self.base_url}/sveden/employees/",
+            None,
+            lambda page: self._parse_employees(page.text),
+            executor=True,
+        )
+
+    @cached
+    @coalesced
+    async def teacher_schedule(self, teacher: str) -> dict:
+        """Парсинг расписания преподавателя.
 
-            #! Преподаватель
-            teacher_cell = row.select_one(".schteacher")
+        Аргументы:
+            teacher (str): полное ФИО преподавателя
 
-            teacher = ", ".join(
-                [teacher.strip() for teacher in teacher_cell.text.split("\n")]
-            )
+        Возвращает:
+            Timetable: расписание преподавателя (словарь API даёт
+                `Timetable.to_teacher_schedule()`)
+        """
+        if not teacher:
+            return None
 
-            #! Аудитория
-            room_cell = row.select_one(".schclass")
-            room = room_cell.text
+        params = self._teacher_schedule_params(teacher, await self.get_period())
+        return await self._fetch(
+            ("teacher_schedule", teacher),
+            self.url + "/schedule.ajax.php",
+            params,
+            lambda page: self._parse_teacher_schedule(page.text, teacher),
+        )
 
-            #! Добавление данных в результирующий словарь
-            lesson = {
-                "number": index + 1,
-                "subject": subject,
-                "room": room,
-                "teacher": teacher,
-            }
+    async def teacher_info(self, name: str) -> dict:
+        """Парсинг информации о преподавателе по полному ФИО.
+
+        Аргументы:
+            name (str): имя преподавателя
+
+        Возвращает:
+            dict: словарь с информацией о преподавателе
+        """
+        return self._teacher_info(await self.get_employees(), name)
+
+    async def department(self, department: str) -> list:
+        """Возвращает всех преподавателей кафедры из справочника сотрудников.
+
+        Аргументы:
+            department (str): полное название кафедры
+
+        Возвращает:
+            list[dict]: список словарей с информацией о преподавателях
+        """
+        employees = await self.get_employees()
+        return [
+            self._teacher_info(employees, card["name"])
+            for card in employees.department(department)
+        ]
+
+    @cached
+    @coalesced
+    async def groups(
+        self, faculty: str = "Факультет информационных технологий", year: str = None
+    ):
+        """Парсинг списка групп факультета по году поступления.
+
+        Аргументы:
+            faculty (str): полное название факультета
+            year (str): год поступления (`20` или `2020`)
+
+        Возвращает:
+            list[str]: список групп
+        """
+        year = self._normalize_year(year)
+        # Список групп факультета один на все годы и уже может быть в кэше
+        return [
+            group for group in await self.faculty_groups(faculty)
+            if not year or year in group.split("-")
+        ]
+
+    async def teacher(self, name: str) -> dict:
+        """Возвращает преподавателя с расписанием по полному ФИО.
+
+        Аргументы:
+            name (str): полное ФИО преподавателя
+
+        Возвращает:
+            dict: словарь с полной информацией о преподавателе
+        """
+        schedule = await self.teacher_schedule(name)
+
+        if not schedule:
+            return None
+
+        info = await self.teacher_info(name)
+        info["schedule"] = schedule.to_teacher_schedule()
+        return info
 
-            if week_type == "both":
-                schedule[day]["odd"].append(lesson)
-                schedule[day]["even"].append(lesson)
+    @cached
+    @coalesced
+    async def schedule(self, group: str):
+        """Парсит расписание заданной группы.
+
+        Аргументы:
+            group (str): полное название группы
+
+        Возвращает:
+            Timetable: расписание группы (словарь API даёт `Timetable.to_schedule()`)
+        """
+        params = self._schedule_params(group, await self.get_period())
+        return await self._fetch(
+            ("schedule", group),
+            self.url + "/schedule.ajax.php",
+            params,
+            lambda page: self._parse_schedule(page.text, group),
+        )
+
+    @cached
+    @coalesced
+    async def faculty_groups(self, faculty: str) -> list:
+        """Парсинг всех групп факультета, независимо от года поступления.
+
+        Аргументы:
+            faculty (str): полное название факультета
+
+        Возвращает:
+            list[str]: список групп
+        """
+        params = self._groups_params(faculty, await self.get_period())
+        return await self._fetch(
+            ("faculty_groups",),
+            self.url + "/schedule.ajax.php",
+            params,
+            lambda page: self._parse_all_groups(page.text),
+        )
+
+    def cache_key(self, method: str, *args) -> tuple:
+        """Возвращает ключ кэша для вызова кэшируемого метода.
+
+        Аргументы:
+            method (str): имя метода (`schedule`, `teacher_schedule`, ...)
+            args: аргументы метода
+
+        Возвращает:
+            tuple: ключ записи в `self.cache`
+        """
+        return getattr(type(self), method).cache_key(self, *args)
+
+    async def refresh(self, method: str, *args):
+        """Загружает результат кэшируемого метода в обход кэша и сохраняет его.
+
+        Аргументы:
+            method (str): имя метода (`schedule`, `teacher_schedule`, ...)
+            args: аргументы метода
+
+        Возвращает:
+            Any: свежий результат метода
+        """
+        value = await getattr(type(self), method).__wrapped__(self, *args)
+
+        if self.cache is not None:
+            await self.cache.set(self.cache_key(method, *args), value)
+
+        return value
+
+    async def schedules(self, groups: list) -> tuple:
+        """Параллельно парсит расписания нескольких групп.
+
+        Одновременных запросов к сайту не больше, чем позволяет `guard`, а ошибка
+        одной группы не мешает получить расписания остальных.
+
+        Аргументы:
+            groups (list[str]): полные названия групп
+
+        Возвращает:
+            tuple[dict, dict]: расписания (`Timetable`) и тексты ошибок
+                по названиям групп
+        """
+        groups = list(dict.fromkeys(groups))
+        results = await asyncio.gather(
+            *(self.schedule(group) for group in groups), return_exceptions=True
+        )
+
+        schedules, errors = {}, {}
+        for group, result in zip(groups, results):
+            if isinstance(result, Exception):
+                errors[group] = f"{type(result).__name__}: {result}"
+            elif isinstance(result, BaseException):
+                raise result
             else:
-                schedule[day][week_type].append(lesson)
+                schedules[group] = result
 
-        return schedule
+        return schedules, errors
 
-    def _news(self):
-        # REVIEW: надо полностью перенести метод получения новостей сюда
-        url = self.base_url + "/info/press.rss/reviews"
-        xml = requests.get(url, timeout=15)
-        parser = RSSParser(xml=xml.content)
-        feed = parser.parse()
-        return feed
+    async def _news(self):
+        return await self._fetch(
+            ("news",),
+            self.base_url + "/info/press.rss/reviews",
+            None,
+            lambda page: self._parse_news(page.content),
+        )
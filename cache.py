@@ -0,0 +1,520 @@
+"""cache.py
+
+Кэш результатов парсера: TTL, ограничение размера (LRU) и отдача устаревших
+данных с фоновым обновлением (stale-while-revalidate), объединение
+одновременных одинаковых запросов к сайту (single-flight) и кэш готовых
+JSON-ответов.
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import uuid
+from collections import OrderedDict
+from time import monotonic, time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import metrics
+from storage import Store
+
+logger = logging.getLogger(__name__)
+
+# Как часто процесс, ожидающий значение от другого процесса, проверяет
+# общее хранилище, в секундах
+LEASE_POLL = 0.2
+
+# Как часто время последнего запроса ключа сохраняется в общее хранилище,
+# в секундах
+ACCESS_PERIOD = 300
+
+
+class CacheEntry:
+    """Запись кэша: значение, момент его получения и последнего запроса.
+
+    `updated` — время записи значения (`time()`), как оно сохранено в
+    хранилище: по нему видно, обновил ли значение другой процесс.
+    `published` — когда момент запроса последний раз сохранён в общее хранилище.
+    """
+
+    # pylint: disable=R0903
+    # Запись только хранит данные
+
+    __slots__ = ("value", "created", "accessed", "updated", "published")
+
+    def __init__(
+        self, value: Any, created: float, accessed: float = None, updated: float = None
+    ) -> None:
+        self.value = value
+        self.created = created
+        self.accessed = accessed
+        self.updated = updated
+        self.published: Optional[float] = None
+
+
+class ResultCache:
+    """Кэш результатов методов парсера.
+
+    Свежие записи (моложе `ttl`) отдаются сразу. Устаревшие, но не старше
+    `ttl + stale_ttl`, тоже отдаются сразу, а в фоне запускается их обновление.
+    Всё, что старше, загружается заново, а если загрузить не удалось (сайт
+    недоступен), отдаётся последнее полученное значение. При превышении
+    `maxsize` вытесняются давно не запрашивавшиеся записи.
+
+    Если задано постоянное хранилище, все новые значения записываются и в
+    него, а при промахе кэш сначала ищет значение там: после перезапуска
+    запись отдаётся сразу и, если она устарела, обновляется в фоне.
+    Значения, которые не восстанавливаются из JSON как есть, преобразуются
+    функциями из `loaders` по имени метода (первому элементу ключа).
+
+    Если хранилище общее для нескольких процессов (`store.shared`),
+    устаревшая запись сначала ищется в нём — её мог обновить другой
+    процесс, — а загружает значение с сайта только процесс, захвативший
+    блокировку ключа; остальные ждут, пока значение появится в хранилище
+    (не дольше `lease` секунд).
+
+    Аргументы:
+        ttl (float): время свежести записи, в секундах
+        stale_ttl (float): сколько ещё секунд можно отдавать устаревшую запись
+        maxsize (int): максимальное количество записей
+        store (Store | None): постоянное хранилище значений
+        lease (float): на сколько секунд захватывается блокировка загрузки
+    """
+
+    # pylint: disable=R0902,R0913
+    # Настроек и счётчиков у кэша действительно много
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float = 0,
+        maxsize: int = 1024,
+        store: Store = None,
+        lease: float = 60,
+    ) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.store = store
+        self.lease = lease
+        self.owner = uuid.uuid4().hex
+        self.loaders: Dict[str, Callable[[Any], Any]] = {}
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._refreshing = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.fallback = 0
+        self.loaded = 0
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """Возвращает запись по ключу без учёта её возраста."""
+        return self._entries.get(key)
+
+    def max_age(self, key: Hashable) -> int:
+        """Возвращает, сколько секунд запись ещё будет свежей (`ttl`, если её нет)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return int(self.ttl)
+
+        return max(int(self.ttl - (monotonic() - entry.created)), 0)
+
+    def age(self, key: Hashable) -> float:
+        """Возвращает возраст записи в секундах (0, если её нет)."""
+        entry = self._entries.get(key)
+        return monotonic() - entry.created if entry is not None else 0.0
+
+    async def set(self, key: Hashable, value: Any) -> None:
+        """Сохраняет значение (и в хранилище) и вытесняет лишние записи.
+
+        Момент последнего запроса записи при этом сохраняется: обновление
+        значения не считается обращением к нему.
+        """
+        updated = time()
+        self._put(key, value, monotonic(), updated)
+
+        if self.store is not None:
+            await self.store.set(key, value, updated)
+
+    def _put(self, key: Hashable, value: Any, created: float, updated: float) -> CacheEntry:
+        previous = self._entries.get(key)
+        accessed = previous.accessed if previous is not None else None
+        entry = self._entries[key] = CacheEntry(value, created, accessed, updated)
+        if previous is not None:
+            entry.published = previous.published
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+        return entry
+
+    async def _load(self, key: Hashable, since: float = None) -> Optional[CacheEntry]:
+        """Загружает запись из хранилища (только обновлённую после `since`, если задано)."""
+        stored = await self.store.get(key)
+        if stored is None:
+            return None
+
+        # Слишком старое значение тоже загружается: оно будет отдано,
+        # если обновить его с сайта не получится
+        value, updated = stored
+        if since is not None and updated <= since:
+            return None
+        age = max(time() - updated, 0.0)
+
+        loader = self.loaders.get(key[0])
+        if loader is not None:
+            value = loader(value)
+
+        self.loaded += 1
+        return self._put(key, value, monotonic() - age, updated)
+
+    async def last_access(self, key: Hashable) -> Optional[float]:
+        """Возвращает, сколько секунд назад ключ запрашивали.
+
+        С общим хранилищем учитываются запросы во всех процессах (с точностью
+        до `ACCESS_PERIOD` секунд).
+
+        Возвращает:
+            float | None: секунды с последнего запроса или `None`, если ключ
+            не запрашивали
+        """
+        entry = self._entries.get(key)
+        ago = None
+        if entry is not None and entry.accessed is not None:
+            ago = monotonic() - entry.accessed
+
+        if self.store is not None and self.store.shared:
+            stored = await self.store.get(("accessed", *key))
+            if stored is not None:
+                shared_ago = max(time() - stored[1], 0.0)
+                ago = shared_ago if ago is None else min(ago, shared_ago)
+
+        return ago
+
+    async def _publish_access(self, key: Hashable, entry: CacheEntry) -> None:
+        """Сохраняет момент запроса ключа в общее хранилище (не чаще `ACCESS_PERIOD`)."""
+        if self.store is None or not self.store.shared:
+            return
+        if entry.published is not None and entry.accessed - entry.published < ACCESS_PERIOD:
+            return
+
+        entry.published = entry.accessed
+        now = time()
+        await self.store.set(("accessed", *key), now, now)
+
+    async def invalidate(self, method: str = None, args: tuple = ()) -> int:
+        """Удаляет записи из кэша.
+
+        Аргументы:
+            method (str): имя метода парсера (если не задано, кэш очищается целиком)
+            args (tuple): начальные аргументы метода, по которым фильтруются записи
+
+        Возвращает:
+            int: количество удалённых записей
+        """
+        if method is None:
+            count = len(self._entries)
+            self._entries.clear()
+            if self.store is not None:
+                await self.store.delete()
+            return count
+
+        prefix = (method, *args)
+        keys = [key for key in self._entries if key[: len(prefix)] == prefix]
+        for key in keys:
+            del self._entries[key]
+
+        if self.store is not None:
+            await self.store.delete(prefix)
+
+        return len(keys)
+
+    def stats(self) -> dict:
+        """Возвращает статистику кэша."""
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "fallback": self.fallback,
+            "loaded": self.loaded,
+            "shared": self.shared,
+            "refreshing": len(self._refreshing),
+            "store": type(self.store).__name__ if self.store is not None else None,
+        }
+
+    async def get_or_fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Возвращает значение из кэша или загружает его через `fetch`.
+
+        Аргументы:
+            key (Hashable): ключ записи
+            fetch (Callable): корутинная функция загрузки значения
+
+        Возвращает:
+            Any: значение из кэша или свежезагруженное
+        """
+        entry = self._entries.get(key)
+        if self.store is not None:
+            if entry is None:
+                entry = await self._load(key)
+            elif self.store.shared and monotonic() - entry.created >= self.ttl:
+                # Запись мог уже обновить другой процесс; то же значение
+                # (с тем же временем записи) заново не преобразуется
+                entry = await self._load(key, entry.updated) or entry
+
+        now = monotonic()
+
+        if entry is not None:
+            entry.accessed = now
+            await self._publish_access(key, entry)
+            age = now - entry.created
+
+            if age < self.ttl:
+                self.hits += 1
+                metrics.CACHE_REQUESTS.inc(method=key[0], result="hit")
+                self._entries.move_to_end(key)
+                return entry.value
+
+            if age < self.ttl + self.stale_ttl:
+                self.stale += 1
+                metrics.CACHE_REQUESTS.inc(method=key[0], result="stale")
+                self._entries.move_to_end(key)
+                self._refresh(key, fetch)
+                return entry.value
+
+        try:
+            value = await self._fetch(key, fetch)
+        except Exception as exc:  # pylint: disable=W0703
+            if entry is None:
+                self.misses += 1
+                metrics.CACHE_REQUESTS.inc(method=key[0], result="miss")
+                raise
+
+            self.fallback += 1
+            metrics.CACHE_REQUESTS.inc(method=key[0], result="fallback")
+            logger.warning("Отдаётся устаревшая запись кэша %r: %r", key, exc)
+            return entry.value
+
+        self.misses += 1
+        metrics.CACHE_REQUESTS.inc(method=key[0], result="miss")
+        if key in self._entries:
+            self._entries[key].accessed = now
+            await self._publish_access(key, self._entries[key])
+        return value
+
+    async def _fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Any]], wait: bool = True
+    ) -> Any:
+        """Загружает значение через `fetch` и сохраняет его.
+
+        С общим хранилищем загружает только процесс, захвативший блокировку
+        ключа. Остальные при `wait` ждут значение в хранилище, а если оно не
+        появилось за `lease` секунд, загружают его сами; без `wait` сразу
+        возвращают `None`.
+        """
+        if self.store is None or not self.store.shared:
+            value = await fetch()
+            await self.set(key, value)
+            return value
+
+        name = ("fetch", *key)
+        started = time()
+        deadline = monotonic() + self.lease
+
+        while not await self.store.lock(name, self.owner, self.lease):
+            if not wait:
+                return None
+
+            await asyncio.sleep(LEASE_POLL)
+            entry = await self._load(key, started)
+            if entry is not None:
+                self.shared += 1
+                metrics.CACHE_REQUESTS.inc(method=key[0], result="shared")
+                return entry.value
+
+            if monotonic() >= deadline:
+                # Процесс с блокировкой, видимо, завис — загружаем сами
+                break
+
+        try:
+            value = await fetch()
+            await self.set(key, value)
+            return value
+        finally:
+            await self.store.unlock(name, self.owner)
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                # Если запись уже обновляет другой процесс, новое значение
+                # подхватится из хранилища при следующем запросе
+                await self._fetch(key, fetch, wait=False)
+            except Exception:  # pylint: disable=W0703
+                # Устаревшая запись остаётся в кэше до следующей попытки
+                logger.exception("Не удалось обновить запись кэша %r", key)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.ensure_future(refresh())
+
+
+def cached(func: Callable) -> Callable:
+    """Кэширует результат асинхронного метода парсера в `self.cache`.
+
+    Ключ кэша — имя метода и его аргументы с учётом значений по умолчанию.
+    Если у парсера нет кэша (`self.cache is None`), метод вызывается напрямую.
+
+    У обёртки есть атрибуты `cache_key(self, *args, **kwargs)` для построения
+    ключа и `__wrapped__` с исходным методом — они нужны для принудительного
+    обновления записи в обход кэша.
+    """
+    signature = inspect.signature(func)
+
+    def cache_key(self, *args, **kwargs) -> tuple:
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        return (func.__name__, *list(bound.arguments.values())[1:])
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        if self.cache is None:
+            return await func(self, *args, **kwargs)
+
+        key = cache_key(self, *args, **kwargs)
+        return await self.cache.get_or_fetch(key, lambda: func(self, *args, **kwargs))
+
+    wrapper.cache_key = cache_key
+    return wrapper
+
+
+class SingleFlight:
+    """Объединяет одновременные вызовы с одинаковым ключом в один.
+
+    Пока выполняется первый вызов, остальные с тем же ключом не запускают
+    свою загрузку, а ждут его результат (или его исключение).
+    """
+
+    def __init__(self) -> None:
+        self._flights = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполняет `fetch` или присоединяется к уже идущему вызову с ключом `key`."""
+        self.calls += 1
+        flight = self._flights.get(key)
+
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            flight = asyncio.ensure_future(fetch())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+
+        # Отмена одного из ожидающих не должна отменять загрузку для остальных
+        return await asyncio.shield(flight)
+
+    def stats(self) -> dict:
+        """Возвращает количество вызовов, объединённых и идущих сейчас."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+        }
+
+
+def coalesced(func: Callable) -> Callable:
+    """Объединяет одновременные вызовы асинхронного метода парсера.
+
+    Ключ — имя метода, аргументы и текущий учебный период (`self.period`),
+    а объединяет вызовы `self.flights` (`SingleFlight`). Объединённые вызовы
+    считаются в метрике `bgtu_coalesced_requests_total`.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())), self.period)
+        if key in self.flights:
+            metrics.COALESCED_REQUESTS.inc(method=func.__name__)
+        return await self.flights.do(key, lambda: func(self, *args, **kwargs))
+
+    return wrapper
+
+
+class EncodedCache:
+    """Кэш ответов API, уже закодированных в JSON.
+
+    Ключ должен однозначно определять содержимое ответа (например, хэш
+    расписания и время его разбора), поэтому записи не устаревают, а только
+    вытесняются давно не запрашивавшиеся (LRU).
+
+    Аргументы:
+        maxsize (int): максимальное количество записей
+        max_bytes (int | None): максимальный суммарный размер записей в байтах
+            (`None` — без ограничения)
+    """
+
+    def __init__(self, maxsize: int = 1024, max_bytes: int = None) -> None:
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_encode(self, key: Hashable, encode: Callable[[], bytes]) -> bytes:
+        """Возвращает закодированный ответ по ключу или кодирует его вызовом `encode`."""
+        body = self._entries.get(key)
+        if body is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return body
+
+        self.misses += 1
+        body = encode()
+
+        # Ответ больше всего кэша не сохраняется, чтобы не вытеснить остальные
+        if self.max_bytes is not None and len(body) > self.max_bytes:
+            return body
+
+        self._entries[key] = body
+        self._bytes += len(body)
+
+        while len(self._entries) > self.maxsize or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+        return body
+
+    def stats(self) -> dict:
+        """Возвращает размер кэша (в записях и байтах), попадания и промахи."""
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
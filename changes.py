@@ -0,0 +1,209 @@
+"""changes.py
+
+Лента изменений расписаний.
+
+Когда очередная загрузка расписания даёт другое содержимое, парсер
+вычисляет разницу (добавленные, удалённые и перенесённые пары по дням и
+неделям) и публикует её в `ChangeFeed`. Клиенты читают ленту по курсору,
+а при заданном вебхуке каждое событие ещё и отправляется POST-запросом.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Deque, Iterable, List, Optional
+
+import httpx
+
+from timetable import DAY_NAMES, Timetable
+
+logger = logging.getLogger(__name__)
+
+# Таймаут отправки события на вебхук, в секундах
+WEBHOOK_TIMEOUT = 10
+
+
+def _lesson(number: int, entry) -> dict:
+    return {"number": number, **entry._asdict()}
+
+
+def diff(old: Timetable, new: Timetable) -> dict:
+    """Вычисляет разницу двух версий расписания.
+
+    Если в тот же день и на той же неделе исчезла и появилась пара с тем же
+    предметом и преподавателем (группой), она считается перенесённой
+    (`moved`), когда у неё другой номер, и изменённой (`changed`), когда
+    номер тот же, а аудитория другая.
+
+    Аргументы:
+        old (Timetable): прежнее расписание
+        new (Timetable): новое расписание
+
+    Возвращает:
+        dict: `{day: {week: {"added", "removed", "moved", "changed"}}}` только
+            для дней и недель, в которых что-то изменилось
+    """
+    changes = {}
+
+    for day in DAY_NAMES:
+        for week in ("even", "odd"):
+            before = list(old.lessons(day, week))
+            after = list(new.lessons(day, week))
+            removed = [lesson for lesson in before if lesson not in after]
+            added = [lesson for lesson in after if lesson not in before]
+
+            moved, changed = [], []
+            for lesson in list(removed):
+                number, entry = lesson
+                for target in added:
+                    if (target[1].subject, target[1].party) != (entry.subject, entry.party):
+                        continue
+
+                    if target[0] == number:
+                        changed.append({"old": _lesson(*lesson), "new": _lesson(*target)})
+                    else:
+                        moved.append({"from": number, "to": target[0], **target[1]._asdict()})
+                    removed.remove(lesson)
+                    added.remove(target)
+                    break
+
+            if added or removed or moved or changed:
+                changes.setdefault(day, {})[week] = {
+                    "added": [_lesson(*lesson) for lesson in added],
+                    "removed": [_lesson(*lesson) for lesson in removed],
+                    "moved": moved,
+                    "changed": changed,
+                }
+
+    return changes
+
+
+class ChangeFeed:
+    """Лента событий об изменении расписаний с курсором.
+
+    У каждого события возрастающий `id`; клиент запоминает последний
+    полученный и запрашивает события после него. Хранятся последние
+    `maxlen` событий.
+
+    Аргументы:
+        maxlen (int): сколько последних событий хранить
+        webhook (str | None): адрес, на который отправляется каждое событие
+    """
+
+    def __init__(self, maxlen: int = 10000, webhook: str = None) -> None:
+        self.webhook = webhook
+        self.events: Deque[dict] = deque(maxlen=maxlen)
+        self.cursor = 0
+        self.delivered = 0
+        self.failed = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks = set()
+
+    def publish(self, kind: str, old: Timetable, new: Timetable) -> Optional[dict]:
+        """Публикует разницу двух версий расписания, если она есть.
+
+        Аргументы:
+            kind (str): метод парсера (`schedule` или `teacher_schedule`)
+            old (Timetable): прежнее расписание
+            new (Timetable): новое расписание
+
+        Возвращает:
+            dict | None: опубликованное событие или `None`, если пары не изменились
+        """
+        changes = diff(old, new)
+        if not changes:
+            return None
+
+        self.cursor += 1
+        event = {
+            "id": self.cursor,
+            "time": datetime.now(),
+            "kind": kind,
+            "owner": new.owner,
+            "digest": new.digest(),
+            "changes": changes,
+        }
+        self.events.append(event)
+
+        if self.webhook:
+            self._send(event)
+
+        return event
+
+    def since(self, cursor: int = 0, owners: Iterable[str] = None, limit: int = 100) -> dict:
+        """Возвращает события после курсора.
+
+        Аргументы:
+            cursor (int): `id` последнего полученного события
+            owners (Iterable[str] | None): только события этих групп и преподавателей
+            limit (int): максимум событий в ответе
+
+        Возвращает:
+            dict: события, курсор для следующего запроса и признак `missed`,
+                если часть событий после `cursor` уже вытеснена из ленты
+        """
+        owners = set(owners) if owners else None
+        events: List[dict] = []
+        oldest = self.events[0]["id"] if self.events else self.cursor + 1
+        missed = cursor < oldest - 1
+
+        if cursor > self.cursor:
+            # Курсор из прошлого запуска приложения: лента началась заново
+            cursor, missed = 0, True
+
+        for event in self.events:
+            if event["id"] <= cursor or (owners and event["owner"] not in owners):
+                continue
+            events.append(event)
+            if len(events) >= limit:
+                break
+
+        return {
+            "cursor": events[-1]["id"] if len(events) >= limit else self.cursor,
+            "missed": missed,
+            "events": events,
+        }
+
+    def _send(self, event: dict) -> None:
+        # Отправка не должна задерживать разбор расписания
+        try:
+            task = asyncio.get_running_loop().create_task(self._post(event))
+        except RuntimeError:
+            # Синхронный парсер работает без цикла событий
+            return
+
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _post(self, event: dict) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT)
+
+        try:
+            response = await self._client.post(
+                self.webhook,
+                content=json.dumps(event, ensure_ascii=False, default=str).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+            )
+            response.raise_for_status()
+            self.delivered += 1
+        except httpx.HTTPError as exc:
+            self.failed += 1
+            logger.warning("Не удалось отправить событие %s на вебхук: %r", event["id"], exc)
+
+    async def aclose(self) -> None:
+        """Закрывает клиент вебхука."""
+        if self._client is not None:
+            await self._client.aclose()
+
+    def stats(self) -> dict:
+        """Возвращает размер ленты и статистику отправки на вебхук."""
+        return {
+            "cursor": self.cursor,
+            "events": len(self.events),
+            "webhook": bool(self.webhook),
+            "delivered": self.delivered,
+            "failed": self.failed,
+        }
@@ -0,0 +1,58 @@
+"""employees.py
+
+Индекс справочника сотрудников БГТУ (страница `/sveden/employees/`).
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class EmployeeIndex:
+    """Разобранный справочник сотрудников.
+
+    Строится один раз из всех карточек страницы, после чего поиск
+    преподавателя по ФИО и выборка кафедры — это обращения к словарям.
+
+    Аргументы:
+        cards (list[dict]): карточки сотрудников (см. `_ParserBase._parse_employees`)
+        updated (datetime | None): когда карточки были загружены (по умолчанию — сейчас)
+    """
+
+    def __init__(self, cards: List[dict] = None, updated: datetime = None) -> None:
+        self.by_name: Dict[str, dict] = {}
+        self.by_department: Dict[str, List[str]] = {}
+        self.cards = cards
+        self.updated: Optional[datetime] = None
+
+        if cards is not None:
+            for card in cards:
+                # Как и `soup.find`, берём первую карточку с таким ФИО
+                if card["name"] in self.by_name:
+                    continue
+                self.by_name[card["name"]] = card
+                self.by_department.setdefault(card["department"], []).append(
+                    card["name"]
+                )
+            self.updated = updated or datetime.now()
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.by_name
+
+    @property
+    def departments(self) -> List[str]:
+        """Список кафедр в порядке их появления на странице."""
+        return list(self.by_department)
+
+    def get(self, name: str) -> Optional[dict]:
+        """Возвращает копию карточки сотрудника или `None`, если его нет."""
+        card = self.by_name.get(name)
+        return dict(card) if card is not None else None
+
+    def department(self, department: str) -> List[dict]:
+        """Возвращает копии карточек всех сотрудников кафедры."""
+        return [
+            dict(self.by_name[name]) for name in self.by_department.get(department, [])
+        ]
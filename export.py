@@ -0,0 +1,48 @@
+"""export.py
+
+Выгрузка результатов парсера для большого числа групп или преподавателей
+без накопления всех результатов в памяти.
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Iterable, Tuple
+
+
+async def iter_results(
+    fetch: Callable[[str], Awaitable[Any]], names: Iterable[str], window: int = 8
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Выдаёт результаты `fetch` для каждого имени по мере загрузки.
+
+    Порядок имён сохраняется, а вперёд загружается не больше `window`
+    результатов, так что память не растёт с количеством имён. Ошибка
+    одного имени выдаётся вместо результата и не прерывает остальные.
+
+    Аргументы:
+        fetch (Callable): корутинная функция, например `AsyncParser.schedule`
+        names (Iterable[str]): группы или преподаватели
+        window (int): сколько результатов загружать одновременно
+
+    Возвращает:
+        AsyncIterator[tuple[str, Any]]: имя и результат (или исключение)
+    """
+    pending: Deque[Tuple[str, asyncio.Future]] = deque()
+
+    async def settled(name: str, task: asyncio.Future) -> Tuple[str, Any]:
+        try:
+            return name, await task
+        except Exception as exc:  # pylint: disable=W0703
+            return name, exc
+
+    try:
+        for name in names:
+            pending.append((name, asyncio.ensure_future(fetch(name))))
+            if len(pending) >= window:
+                yield await settled(*pending.popleft())
+
+        while pending:
+            yield await settled(*pending.popleft())
+    finally:
+        # Клиент отключился — незачем загружать оставшееся
+        for _, task in pending:
+            task.cancel()
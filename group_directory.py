@@ -0,0 +1,206 @@
+"""group_directory.py
+
+Справочник групп всего университета.
+
+Шифр группы состоит из частей через дефис: `О-20-ИВТ-1-по-Б` — форма
+обучения (`О`), год поступления (`20`), направление (`ИВТ`), номер группы
+(`1`), профиль (`по`) и уровень образования (`Б`). Справочник строится
+один раз по спискам групп факультетов и хранит индекс по каждой части
+шифра и отсортированный список окончаний шифров для поиска по началу
+шифра или любой его части.
+
+`GroupSearch` строит справочник по спискам групп из кэша парсера и
+перестраивает его, только когда списки изменились.
+"""
+
+import asyncio
+from bisect import bisect_left
+from typing import AbstractSet, Dict, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+# Части шифра (и факультет), по которым можно искать группы
+FIELDS = ("faculty", "form", "year", "speciality", "number", "profile", "level")
+
+
+class GroupCode(NamedTuple):
+    """Разобранный шифр группы.
+
+    #### Поля
+
+    - `code` (str): шифр целиком (`О-20-ИВТ-1-по-Б`)
+    - `form` (str | None): форма обучения (`О`)
+    - `year` (str | None): год поступления (`20`)
+    - `speciality` (str | None): направление (`ИВТ`)
+    - `number` (str | None): номер группы (`1`)
+    - `profile` (str | None): профиль (`по`)
+    - `level` (str | None): уровень образования (`Б`, `М`)
+
+    Части, которых нет в шифре (или шифр не разобран), — `None`.
+    """
+
+    code: str
+    form: Optional[str] = None
+    year: Optional[str] = None
+    speciality: Optional[str] = None
+    number: Optional[str] = None
+    profile: Optional[str] = None
+    level: Optional[str] = None
+
+
+def normalize_year(year: str) -> str:
+    """Приводит год поступления к двум цифрам (`2020` -> `20`).
+
+    Исключения:
+        ValueError: год — не число
+    """
+    if year:
+        year = str(year)
+        if len(year) > 2:
+            year = year[2:]
+        if not year.isdigit():
+            raise ValueError("Incorrect year string")
+
+    return year
+
+
+def parse_group(code: str) -> GroupCode:
+    """Разбирает шифр группы на части.
+
+    Шифр, в котором вторая часть — не год, не разбирается: у него
+    заполнено только поле `code`.
+    """
+    parts = code.split("-")
+    if len(parts) < 3 or not parts[1].isdigit():
+        return GroupCode(code)
+
+    return GroupCode(
+        code,
+        form=parts[0],
+        year=parts[1],
+        speciality=parts[2],
+        number=parts[3] if len(parts) > 3 else None,
+        profile="-".join(parts[4:-1]) or None,
+        level=parts[-1] if len(parts) > 4 else None,
+    )
+
+
+class GroupDirectory:
+    """Справочник групп с индексами по частям шифра.
+
+    Аргументы:
+        faculties (Mapping[str, Sequence[str]]): группы по факультетам;
+            не копируется, по нему проверяется, нужно ли перестроить справочник
+    """
+
+    def __init__(self, faculties: Mapping[str, Sequence[str]] = None) -> None:
+        self.source = faculties if faculties is not None else {}
+        self.groups: Dict[str, dict] = {}
+        self._indexes: Dict[str, Dict[str, Set[str]]] = {field: {} for field in FIELDS}
+        self._suffixes: List[Tuple[str, str]] = []
+
+        for faculty, groups in self.source.items():
+            for code in groups:
+                if code in self.groups:
+                    continue
+
+                group = self.groups[code] = parse_group(code)._asdict()
+                group["faculty"] = faculty
+
+                for field in FIELDS:
+                    if group[field] is not None:
+                        self._indexes[field].setdefault(group[field].lower(), set()).add(code)
+
+                # Окончания шифра с начала каждой части: `20-ивт-1-по-б`, `ивт-1-по-б`, ...
+                lowered = code.lower().split("-")
+                for i in range(len(lowered)):
+                    self._suffixes.append(("-".join(lowered[i:]), code))
+
+        self._suffixes.sort()
+        self.groups = dict(sorted(self.groups.items()))
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def _with_prefix(self, prefix: str) -> Set[str]:
+        """Шифры, у которых с `prefix` начинается шифр или одна из его частей."""
+        prefix = prefix.lower()
+        found = set()
+        position = bisect_left(self._suffixes, (prefix,))
+
+        while position < len(self._suffixes) and self._suffixes[position][0].startswith(prefix):
+            found.add(self._suffixes[position][1])
+            position += 1
+
+        return found
+
+    def find(self, query: str = None, limit: int = None, **parts: Optional[str]) -> List[dict]:
+        """Ищет группы по началу шифра и (или) по его частям.
+
+        Аргументы:
+            query (str | None): начало шифра или любой его части
+                (`О-20-ИВ`, `ивт-1`)
+            limit (int | None): максимум результатов
+            parts: значения частей шифра и факультета (`faculty`, `form`,
+                `year`, `speciality`, `number`, `profile`, `level`),
+                без учёта регистра; `None` — любое значение
+
+        Возвращает:
+            list[dict]: группы (шифр, факультет и части шифра) по алфавиту
+        """
+        unknown = set(parts) - set(FIELDS)
+        if unknown:
+            raise TypeError(f"Неизвестные части шифра: {', '.join(sorted(unknown))}")
+
+        found: List[AbstractSet[str]] = [
+            self._indexes[field].get(value.lower(), set())
+            for field, value in parts.items() if value is not None
+        ]
+        if query:
+            found.append(self._with_prefix(query))
+
+        if not found:
+            return list(self.groups.values())[:limit]
+
+        found.sort(key=len)
+        codes = found[0].intersection(*found[1:])
+        return [self.groups[code] for code in sorted(codes)[:limit]]
+
+
+class GroupSearch:
+    """Справочник групп, который обновляется вместе со списками групп в кэше парсера."""
+
+    def __init__(self) -> None:
+        self.current = GroupDirectory()
+
+    async def directory(self, parser) -> GroupDirectory:
+        """Возвращает справочник групп всех факультетов.
+
+        Списки групп факультетов берутся через кэш (`faculty_groups`),
+        поэтому при прогретом кэше запросов к сайту нет, а справочник
+        перестраивается, только когда списки изменились.
+
+        Аргументы:
+            parser (AsyncParser): парсер
+        """
+        faculties = await parser.faculties()
+        groups = await asyncio.gather(*(parser.faculty_groups(faculty) for faculty in faculties))
+        source = dict(zip(faculties, groups))
+
+        if source != self.current.source:
+            self.current = GroupDirectory(source)
+        return self.current
+
+    async def find(self, parser, query: str = None, limit: int = None, **parts) -> List[dict]:
+        """Ищет группы всех факультетов (см. `GroupDirectory.find`).
+
+        Аргументы:
+            parser (AsyncParser): парсер
+            query (str | None): начало шифра или любой его части (`О-20-ИВ`, `ивт-1`)
+            limit (int | None): максимум результатов
+            parts: части шифра и факультет; год — `20` или `2020`
+
+        Возвращает:
+            list[dict]: группы в формате модели `GroupInfo` по алфавиту
+        """
+        if parts.get("year"):
+            parts["year"] = normalize_year(parts["year"])
+        return (await self.directory(parser)).find(query, limit, **parts)
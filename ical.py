@@ -0,0 +1,144 @@
+"""ical.py
+
+Расписание в формате iCalendar (RFC 5545) для подписки в календаре.
+
+Сетка расписания разворачивается в события с датами на весь семестр:
+каждая пара становится событием в каждый учебный день, на неделе которого
+она стоит. Время пар берётся из `timetable.SLOT_TIMES`, часовой пояс —
+московский.
+"""
+
+import hashlib
+from datetime import date, timezone
+from typing import Dict, List, Tuple
+
+from semester import Semester
+from timetable import SLOT_TIMES, Timetable
+
+PRODID = "-//xhable1337//bgtu-parser//RU"
+TZID = "Europe/Moscow"
+
+# Описание часового пояса: в Москве нет перехода на летнее время
+VTIMEZONE = (
+    "BEGIN:VTIMEZONE",
+    f"TZID:{TZID}",
+    "BEGIN:STANDARD",
+    "DTSTART:19700101T000000",
+    "TZOFFSETFROM:+0300",
+    "TZOFFSETTO:+0300",
+    "TZNAME:MSK",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+)
+
+# Наибольшая длина строки в октетах без перевода строки
+LINE_LENGTH = 75
+
+
+def escape(text: str) -> str:
+    """Экранирует текстовое значение свойства."""
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> bytes:
+    """Кодирует строку в UTF-8 и переносит её по 75 октетов.
+
+    Продолжение начинается с пробела; многобайтовые символы не разрываются.
+    """
+    data = line.encode("utf-8")
+    parts = []
+    limit = LINE_LENGTH
+
+    while len(data) > limit:
+        cut = limit
+        while data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(data[:cut])
+        data = data[cut:]
+        # Пробел в начале продолжения тоже занимает октет
+        limit = LINE_LENGTH - 1
+
+    parts.append(data)
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def _time(day: date, clock: str) -> str:
+    return f"{day:%Y%m%d}T{clock.replace(':', '')}00"
+
+
+def _bodies(schedule: Timetable, day: str, week: str, stamp: str,
+            party: str) -> List[Tuple[int, int, bytes]]:
+    """Кодирует неизменную часть событий пар дня на заданной неделе.
+
+    Возвращает:
+        list[tuple[int, int, bytes]]: номер пары, её порядковый номер в слоте
+            (их бывает несколько) и свойства события после `DTEND`
+    """
+    bodies: List[Tuple[int, int, bytes]] = []
+
+    for number, entry in schedule.lessons(day, week):
+        i = sum(1 for other, _, _ in bodies if other == number)
+        bodies.append((number, i, b"".join(fold(line) for line in (
+            f"DTSTAMP:{stamp}",
+            f"SUMMARY:{escape(entry.subject)}",
+            f"LOCATION:{escape(entry.room)}",
+            f"DESCRIPTION:{escape(f'{party}: {entry.party}')}",
+            "END:VEVENT",
+        ))))
+
+    return bodies
+
+
+def calendar(schedule: Timetable, semester: Semester, party: str) -> bytes:
+    """Собирает календарь с парами расписания на весь семестр.
+
+    Аргументы:
+        schedule (Timetable): расписание группы или преподавателя
+        semester (Semester): семестр, на даты которого разворачивается сетка
+        party (str): подпись поля `party` в описании события
+            (`Преподаватель` или `Группа`)
+
+    Возвращает:
+        bytes: файл `.ics`
+    """
+    stamp = schedule.updated.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    owner = hashlib.blake2b(schedule.owner.encode("utf-8"), digest_size=8).hexdigest()
+
+    lines = [
+        fold(line) for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:{PRODID}",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:{escape(schedule.owner)}",
+            f"X-WR-TIMEZONE:{TZID}",
+            *VTIMEZONE,
+        )
+    ]
+
+    # Одна и та же пара повторяется каждые две недели, поэтому неизменная
+    # часть события кодируется один раз на ячейку сетки
+    bodies: Dict[Tuple[str, str], List[Tuple[int, int, bytes]]] = {}
+
+    for day, day_name, week in semester.days():
+        cell = bodies.get((day_name, week))
+        if cell is None:
+            cell = bodies[(day_name, week)] = _bodies(schedule, day_name, week, stamp, party)
+
+        for number, i, body in cell:
+            lines += [
+                b"BEGIN:VEVENT\r\n",
+                fold(f"UID:{day:%Y%m%d}-{number}-{i}-{owner}@bgtu-parser"),
+                fold(f"DTSTART;TZID={TZID}:{_time(day, SLOT_TIMES[number][0])}"),
+                fold(f"DTEND;TZID={TZID}:{_time(day, SLOT_TIMES[number][1])}"),
+                body,
+            ]
+
+    lines.append(b"END:VCALENDAR\r\n")
+    return b"".join(lines)
@@ -0,0 +1,315 @@
+"""lesson_index.py
+
+Обратные индексы пар по преподавателям и аудиториям, построенные по
+расписаниям всех групп.
+
+Каждая пара преподавателя уже есть в расписаниях его групп, поэтому после
+обхода всех групп расписание преподавателя собирается без запроса к сайту.
+Расписание с сайта можно сверить с собранным функцией `compare`.
+
+Ключ преподавателя — фамилия с инициалами, поэтому однофамильцы с
+одинаковыми инициалами в расписаниях групп неразличимы. Такие ключи
+находятся по списку преподавателей, и для них индекс расписание не
+собирает (его нужно загружать с сайта).
+
+Занятость каждой аудитории хранится 96-битной маской (бит на ячейку сетки
+`Timetable`), так что поиск свободных аудиторий — побитовые операции.
+
+Индекс строит по расписаниям из кэша парсера функция `index_groups` и
+хранит в `AsyncParser.lessons`.
+"""
+
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from timetable import (
+    CELLS, DAY_INDEX, DAY_NAMES, SLOTS, WEEK_INDEX, WEEKS, Entry, Timetable, cell_index,
+    content_hash
+)
+
+_SPLIT_RE = re.compile(r"[\s.]+")
+
+# Пары в ячейках сетки: номер ячейки -> [(группа, пара), ...]
+Cells = Dict[int, List[Tuple[str, Entry]]]
+
+
+def teacher_key(name: str) -> str:
+    """Приводит имя преподавателя к виду «Фамилия ИО».
+
+    В расписаниях групп преподаватели записаны с инициалами
+    (`Трубаков Е.О.`), а в списке преподавателей — полностью
+    (`Трубаков Евгений Олегович`); оба варианта дают `Трубаков ЕО`.
+    """
+    last_name, *other = [part for part in _SPLIT_RE.split(name.strip()) if part]
+    return f"{last_name} {''.join(part[0] for part in other[:2])}"
+
+
+def slot_mask(day: str, weeks: Iterable[str] = WEEKS, numbers: Iterable[int] = None) -> int:
+    """Возвращает маску ячеек сетки для дня, недель и номеров пар.
+
+    Аргументы:
+        day (str): день недели (`monday`, ..., `saturday`)
+        weeks (Iterable[str]): недели (`odd`, `even`)
+        numbers (Iterable[int] | None): номера пар с 1 (по умолчанию все)
+
+    Возвращает:
+        int: маска, в которой выставлены биты заданных ячеек
+    """
+    numbers = range(1, SLOTS + 1) if numbers is None else numbers
+    mask = 0
+    for week in weeks:
+        for number in numbers:
+            mask |= 1 << cell_index(DAY_INDEX[day], WEEK_INDEX[week], number - 1)
+    return mask
+
+
+class LessonIndex:
+    """Индексы пар по преподавателям и аудиториям.
+
+    Аргументы:
+        schedules (Mapping[str, Timetable] | None): расписания групп по названиям
+        teachers (Iterable[str]): полные имена преподавателей
+            (`AsyncParser.teacher_list`) для поиска однофамильцев
+    """
+
+    def __init__(self, schedules: Mapping[str, Timetable] = None,
+                 teachers: Iterable[str] = ()) -> None:
+        self.by_teacher: Dict[str, Cells] = {}
+        self.by_room: Dict[str, Cells] = {}
+        self.occupancy: Dict[str, int] = {}
+        self.ambiguous: Set[str] = set()
+        self.groups = 0
+        self.updated: Optional[datetime] = None
+
+        if schedules is None:
+            return
+
+        by_teacher = defaultdict(lambda: defaultdict(list))
+        by_room = defaultdict(lambda: defaultdict(list))
+
+        for group, schedule in schedules.items():
+            for cell, entries in enumerate(schedule.cells):
+                for entry in entries:
+                    for teacher in entry.party.split(", "):
+                        if teacher.strip():
+                            by_teacher[teacher_key(teacher)][cell].append((group, entry))
+                    if entry.room.strip():
+                        by_room[entry.room.strip()][cell].append((group, entry))
+
+        self.by_teacher = {key: dict(cells) for key, cells in by_teacher.items()}
+        self.by_room = {key: dict(cells) for key, cells in by_room.items()}
+        self.occupancy = {
+            room: sum(1 << cell for cell in cells) for room, cells in self.by_room.items()
+        }
+        self.groups = len(schedules)
+        self.updated = datetime.now()
+
+        # Ключи, под которые подходят несколько преподавателей из списка
+        names: Dict[str, Set[str]] = defaultdict(set)
+        for name in teachers:
+            if name.strip():
+                names[teacher_key(name)].add(name.strip())
+        self.ambiguous = {key for key, found in names.items() if len(found) > 1}
+
+    def __len__(self) -> int:
+        return self.groups
+
+    @property
+    def rooms(self) -> List[str]:
+        """Все аудитории, встречающиеся в расписаниях, по алфавиту."""
+        return sorted(self.by_room)
+
+    def teacher(self, name: str) -> Optional[Timetable]:
+        """Собирает расписание преподавателя из расписаний групп.
+
+        Если пару ведут у нескольких групп сразу (поток), группы
+        перечисляются через запятую, как на сайте.
+
+        Аргументы:
+            name (str): имя преподавателя (полностью или с инициалами)
+
+        Возвращает:
+            Timetable | None: расписание или `None`, если преподавателя нет
+                в индексе или у него есть однофамилец с теми же инициалами
+        """
+        key = teacher_key(name)
+        cells = self.by_teacher.get(key)
+        if cells is None or key in self.ambiguous:
+            return None
+
+        grid = [()] * CELLS
+        for cell, lessons in cells.items():
+            groups = ", ".join(dict.fromkeys(group for group, _ in lessons))
+            _, entry = lessons[0]
+            grid[cell] = (Entry(entry.subject, entry.room, groups),)
+
+        grid = tuple(grid)
+        return Timetable(name, self.updated, grid, content_hash(name, grid))
+
+    def free_rooms(self, mask: int) -> List[str]:
+        """Возвращает аудитории, свободные во всех ячейках маски `mask`.
+
+        Учитываются только аудитории, встречающиеся в расписаниях групп.
+        """
+        return sorted(room for room, busy in self.occupancy.items() if not busy & mask)
+
+    def room(self, room: str) -> Optional[dict]:
+        """Возвращает занятость аудитории в формате модели `RoomSchedule`.
+
+        Пары потока (один предмет у нескольких групп) объединяются,
+        группы перечисляются через запятую.
+
+        Аргументы:
+            room (str): аудитория, как в расписании (`А-101`)
+
+        Возвращает:
+            dict | None: занятость или `None`, если аудитории нет в индексе
+        """
+        cells = self.by_room.get(room)
+        if cells is None:
+            return None
+
+        schedule = {
+            "room": room,
+            "last_updated": self.updated,
+            "occupancy": f"{self.occupancy[room]:024x}",
+        }
+
+        for day in DAY_NAMES:
+            schedule[day] = {}
+            for week in ("even", "odd"):
+                lessons = []
+                for slot in range(SLOTS):
+                    cell = cell_index(DAY_INDEX[day], WEEK_INDEX[week], slot)
+                    streams = {}
+                    for group, entry in cells.get(cell, ()):
+                        streams.setdefault((entry.subject, entry.party), []).append(group)
+                    lessons.extend(
+                        {
+                            "number": slot + 1,
+                            "subject": subject,
+                            "group": ", ".join(dict.fromkeys(groups)),
+                            "teacher": teacher,
+                        }
+                        for (subject, teacher), groups in streams.items()
+                    )
+                schedule[day][week] = lessons
+
+        return schedule
+
+    def stats(self) -> dict:
+        """Возвращает размер индекса."""
+        return {
+            "groups": self.groups,
+            "teachers": len(self.by_teacher),
+            "ambiguous": len(self.ambiguous),
+            "rooms": len(self.by_room),
+            "updated": self.updated,
+        }
+
+
+def compare(indexed: Optional[Timetable], direct: Timetable) -> List[dict]:
+    """Сверяет расписание преподавателя из индекса с расписанием с сайта.
+
+    Аргументы:
+        indexed (Timetable | None): расписание, собранное `LessonIndex.teacher`
+        direct (Timetable): расписание со страницы преподавателя
+
+    Возвращает:
+        list[dict]: расхождения по парам (пустой список, если их нет)
+    """
+    differences = []
+    indexed_cells = indexed.cells if indexed is not None else ((),) * CELLS
+
+    for cell, (ours, theirs) in enumerate(zip(indexed_cells, direct.cells)):
+        ours = ours[-1] if ours else None
+        theirs = theirs[-1] if theirs else None
+
+        if _same(ours, theirs):
+            continue
+
+        day, rest = divmod(cell, len(WEEKS) * SLOTS)
+        week, slot = divmod(rest, SLOTS)
+        differences.append(
+            {
+                "day": DAY_NAMES[day],
+                "week": WEEKS[week],
+                "number": slot + 1,
+                "index": ours._asdict() if ours is not None else None,
+                "site": theirs._asdict() if theirs is not None else None,
+            }
+        )
+
+    return differences
+
+
+def _same(ours: Optional[Entry], theirs: Optional[Entry]) -> bool:
+    if ours is None or theirs is None:
+        return ours is theirs
+
+    # Порядок групп потока на сайте может отличаться
+    return (
+        ours.subject == theirs.subject
+        and ours.room == theirs.room
+        and set(ours.party.split(", ")) == set(theirs.party.split(", "))
+    )
+
+
+async def index_groups(parser) -> LessonIndex:
+    """Строит индекс пар по расписаниям всех групп всех факультетов.
+
+    Расписания берутся через кэш, поэтому после прогрева запросов
+    к сайту почти нет. Группы, расписание которых получить не удалось,
+    в индекс не попадают. По списку преподавателей отмечаются
+    однофамильцы с одинаковыми инициалами.
+
+    Аргументы:
+        parser (AsyncParser): парсер; индекс сохраняется в `parser.lessons`
+
+    Возвращает:
+        LessonIndex: новый индекс
+    """
+    groups = []
+    for faculty in await parser.faculties():
+        groups += await parser.faculty_groups(faculty)
+
+    schedules, _ = await parser.schedules(groups)
+    parser.lessons = LessonIndex(schedules, await parser.teacher_list())
+    return parser.lessons
+
+
+async def indexed_teacher_schedule(parser, teacher: str) -> Timetable:
+    """Расписание преподавателя из индекса `parser.lessons`.
+
+    Запроса к сайту нет, если преподаватель есть в индексе; иначе
+    (пока индекс не построен или если у преподавателя есть однофамилец
+    с теми же инициалами) расписание загружается с сайта.
+
+    Аргументы:
+        parser (AsyncParser): парсер с индексом пар
+        teacher (str): полное ФИО преподавателя
+
+    Возвращает:
+        Timetable: расписание преподавателя
+    """
+    schedule = parser.lessons.teacher(teacher) if teacher else None
+
+    if schedule is None:
+        schedule = await parser.teacher_schedule(teacher)
+
+    return schedule
+
+
+async def check_teacher(parser, teacher: str) -> List[dict]:
+    """Сверяет расписание преподавателя из индекса с его страницей на сайте.
+
+    Аргументы:
+        parser (AsyncParser): парсер с индексом пар
+        teacher (str): полное ФИО преподавателя
+
+    Возвращает:
+        list[dict]: расхождения по парам (см. `compare`)
+    """
+    return compare(parser.lessons.teacher(teacher), await parser.teacher_schedule(teacher))
@@ -0,0 +1,230 @@
+"""metrics.py
+
+Метрики приложения в текстовом формате Prometheus: время и объём ответов
+сайта БГТУ, время разбора HTML и сериализации моделей, попадания в кэш.
+
+Метрики глобальные для процесса и отдаются эндпоинтом `/metrics`.
+"""
+
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator, List, Sequence, Tuple, Type
+
+# Границы корзин гистограмм по умолчанию, в секундах
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание и значения по наборам меток."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Метрика {self.name} ожидает метки {self.labelnames}, а не {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        """Выдаёт строки со значениями метрики."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Возвращает метрику в текстовом формате Prometheus."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Увеличивает счётчик с заданными метками."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self._values.items()):
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Гистограмма: количество наблюдений по корзинам, их сумма и число."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        """Добавляет наблюдение с заданными метками."""
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Замеряет время выполнения блока или функции (как декоратор)."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total) in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(
+                    self.labelnames, key, f'le="{_format_value(bound)}"'
+                )
+                yield f"{self.name}_bucket{labels} {count}"
+
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {counts[-1]}"
+
+
+class Registry:
+    """Набор метрик, отдаваемых вместе."""
+
+    def __init__(self) -> None:
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Добавляет метрику в набор и возвращает её."""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+UPSTREAM_SECONDS = REGISTRY.register(Histogram(
+    "bgtu_upstream_request_seconds",
+    "Время запроса к сайту БГТУ по типу страницы",
+    ("endpoint",),
+))
+UPSTREAM_BYTES = REGISTRY.register(Counter(
+    "bgtu_upstream_response_bytes_total",
+    "Объём загруженных с сайта БГТУ страниц, в байтах",
+    ("endpoint",),
+))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "bgtu_upstream_errors_total",
+    "Ошибки запросов к сайту БГТУ (timeout, connection, status)",
+    ("endpoint", "reason"),
+))
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    "bgtu_upstream_retries_total",
+    "Повторы неудавшихся запросов к сайту БГТУ",
+    ("endpoint",),
+))
+UPSTREAM_REJECTED = REGISTRY.register(Counter(
+    "bgtu_upstream_rejected_total",
+    "Запросы к сайту БГТУ, не отправленные из-за разомкнутой цепи",
+    ("endpoint",),
+))
+PARSE_SECONDS = REGISTRY.register(Histogram(
+    "bgtu_parse_seconds",
+    "Время разбора страницы сайта БГТУ",
+    ("method",),
+))
+PARSE_SKIPPED = REGISTRY.register(Counter(
+    "bgtu_parse_skipped_total",
+    "Разборы, пропущенные из-за неизменившегося ответа сайта (not_modified, identical)",
+    ("method", "reason"),
+))
+SERIALIZE_SECONDS = REGISTRY.register(Histogram(
+    "bgtu_serialize_seconds",
+    "Время проверки и сериализации ответа моделью pydantic",
+    ("model",),
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "bgtu_cache_requests_total",
+    "Обращения к кэшу результатов (hit, stale, miss, fallback, shared)",
+    ("method", "result"),
+))
+COALESCED_REQUESTS = REGISTRY.register(Counter(
+    "bgtu_coalesced_requests_total",
+    "Вызовы, присоединившиеся к уже идущей загрузке того же результата",
+    ("method",),
+))
+
+
+@contextmanager
+def track_upstream(endpoint: str, timeout_errors: Tuple[Type[Exception], ...] = ()):
+    """Замеряет запрос к сайту и считает ошибки.
+
+    Аргументы:
+        endpoint (str): тип страницы (`schedule`, `groups`, `employees`, ...)
+        timeout_errors (tuple): классы исключений, означающих таймаут
+    """
+    start = perf_counter()
+    try:
+        yield
+    except timeout_errors:
+        UPSTREAM_ERRORS.inc(endpoint=endpoint, reason="timeout")
+        raise
+    except Exception:
+        UPSTREAM_ERRORS.inc(endpoint=endpoint, reason="connection")
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(perf_counter() - start, endpoint=endpoint)
+
+
+def record_upstream_response(endpoint: str, status_code: int, size: int) -> None:
+    """Учитывает объём ответа сайта и ответы с кодом ошибки."""
+    UPSTREAM_BYTES.inc(size, endpoint=endpoint)
+    if status_code >= 400:
+        UPSTREAM_ERRORS.inc(endpoint=endpoint, reason="status")
@@ -1,6 +1,6 @@
 """models.py"""
-from datetime import datetime
-from typing import List, Union
+from datetime import date, datetime
+from typing import Dict, List, Optional, Union
 
 from pydantic import BaseModel
 
@@ -61,6 +61,42 @@ class Schedule(BaseModel):
     friday: Weekday
     saturday: Weekday
 
+
+class ScheduleBatch(BaseModel):
+    """Модель набора расписаний нескольких групп.
+
+    #### Поля модели
+
+    - `schedules` (Dict[str, Schedule]): расписания по названиям групп
+    - `errors` (Dict[str, str]): ошибки по названиям групп
+    """
+    schedules: Dict[str, Schedule]
+    errors: Dict[str, str]
+
+
+class GroupInfo(BaseModel):
+    """Модель группы из справочника групп.
+
+    #### Поля модели
+
+    - `code` (str): шифр группы (`О-20-ИВТ-1-по-Б`)
+    - `form` (str | None): форма обучения (`О`)
+    - `year` (str | None): год поступления (`20`)
+    - `speciality` (str | None): направление (`ИВТ`)
+    - `number` (str | None): номер группы (`1`)
+    - `profile` (str | None): профиль (`по`)
+    - `level` (str | None): уровень образования (`Б`, `М`)
+    - `faculty` (str): факультет
+    """
+    code: str
+    form: Optional[str]
+    year: Optional[str]
+    speciality: Optional[str]
+    number: Optional[str]
+    profile: Optional[str]
+    level: Optional[str]
+    faculty: str
+
 #! Модели для представления расписания преподавателей
 
 
@@ -136,3 +172,180 @@ class Teacher(BaseModel):
     email: Union[str, None]
     img_src: str
     schedule: dict
+
+
+class TeacherMatch(BaseModel):
+    """Модель результата поиска преподавателя.
+
+    #### Поля модели
+
+    - `name` (str): полное ФИО
+    - `score` (float): оценка совпадения от 0 до 1 (1 — точное совпадение)
+    """
+    name: str
+    score: float
+
+#! Модели для представления занятости аудиторий
+
+
+class RoomLesson(BaseModel):
+    """Модель пары в аудитории.
+
+    #### Поля модели
+
+    - `number` (int): номер пары
+    - `subject` (str): предмет
+    - `group` (str): группа (-ы)
+    - `teacher` (str): преподаватель (-ли)
+    """
+    number: int
+    subject: str
+    group: str
+    teacher: str
+
+
+class RoomWeekday(BaseModel):
+    """Модель дня недели аудитории.
+
+    #### Поля модели
+
+    - `even` (List[RoomLesson]): нечётная неделя
+    - `odd` (List[RoomLesson]): чётная неделя
+    """
+    even: List[RoomLesson]
+    odd: List[RoomLesson]
+
+
+class RoomSchedule(BaseModel):
+    """Модель занятости аудитории.
+
+    #### Поля модели
+
+    - `room` (str): аудитория
+    - `last_updated` (datetime): дата и время построения индекса
+    - `occupancy` (str): 96-битная маска занятости в шестнадцатеричном виде
+      (бит `(день * 2 + неделя) * 8 + пара`, неделя 0 — `odd`)
+    - `monday` (RoomWeekday): занятость в понедельник
+    - `tuesday` (RoomWeekday): занятость во вторник
+    - `wednesday` (RoomWeekday): занятость в среду
+    - `thursday` (RoomWeekday): занятость в четверг
+    - `friday` (RoomWeekday): занятость в пятницу
+    - `saturday` (RoomWeekday): занятость в субботу
+    """
+    room: str
+    last_updated: datetime
+    occupancy: str
+    monday: RoomWeekday
+    tuesday: RoomWeekday
+    wednesday: RoomWeekday
+    thursday: RoomWeekday
+    friday: RoomWeekday
+    saturday: RoomWeekday
+
+
+#! Справочные данные страницы расписания
+
+
+class Period(BaseModel):
+    """Модель учебного периода.
+
+    #### Поля модели
+
+    - `value` (str): код периода (`2023-1`)
+    - `name` (str): название (`Весенний семестр`)
+    - `session` (bool): это расписание сессии
+    """
+    value: str
+    name: str
+    session: bool
+
+
+class Meta(BaseModel):
+    """Модель справочных данных со страницы расписания.
+
+    #### Поля модели
+
+    - `period` (str): текущий период расписания занятий (не сессии)
+    - `periods` (List[Period]): все доступные периоды
+    - `forms` (List[str]): формы обучения
+    - `faculties` (List[str]): факультеты
+    - `teachers` (List[str]): преподаватели
+    - `last_updated` (datetime): дата и время разбора
+    """
+    period: str
+    periods: List[Period]
+    forms: List[str]
+    faculties: List[str]
+    teachers: List[str]
+    last_updated: datetime
+
+
+#! Пары на сегодня и текущая пара
+
+
+class DayLesson(BaseModel):
+    """Модель пары с временем начала и конца.
+
+    #### Поля модели
+
+    - `number` (int): номер пары
+    - `start` (str): время начала (`08:00`)
+    - `end` (str): время конца (`09:35`)
+    - `subject` (str): предмет
+    - `room` (str): аудитория
+    - `teacher` (str | None): преподаватель (-ли), в расписании группы
+    - `group` (str | None): группа (-ы), в расписании преподавателя
+    """
+    number: int
+    start: str
+    end: str
+    subject: str
+    room: str
+    teacher: Optional[str] = None
+    group: Optional[str] = None
+
+
+class Today(BaseModel):
+    """Модель пар на день.
+
+    #### Поля модели
+
+    - `owner` (str): группа или преподаватель
+    - `date` (date): дата
+    - `day` (str | None): день недели (`None` в воскресенье)
+    - `week` (str | None): неделя расписания, `even` или `odd`
+      (`None` вне семестра)
+    - `lessons` (List[DayLesson]): пары по порядку
+    """
+    owner: str
+    date: date
+    day: Optional[str]
+    week: Optional[str]
+    lessons: List[DayLesson]
+
+
+class Now(BaseModel):
+    """Модель текущей и следующей пары.
+
+    #### Поля модели
+
+    - `owner` (str): группа или преподаватель
+    - `date` (date): дата
+    - `time` (str): время (`10:30`)
+    - `day` (str | None): день недели (`None` в воскресенье)
+    - `week` (str | None): неделя расписания, `even` или `odd`
+      (`None` вне семестра)
+    - `current` (List[DayLesson]): идущие сейчас пары (обычно одна или ни одной)
+    - `next` (List[DayLesson]): ближайшие следующие пары
+    - `next_date` (date | None): дата следующих пар (`None`, если их нет
+      в ближайшие две недели семестра)
+    """
+    owner: str
+    date: date
+    time: str
+    day: Optional[str]
+    week: Optional[str]
+    current: List[DayLesson]
+    next: List[DayLesson]
+    # Поле `date` выше не связывает имя в классе, тип берётся из модуля
+    next_date: Optional[date]  # pylint: disable=E0601
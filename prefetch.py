@@ -0,0 +1,248 @@
+"""prefetch.py
+
+Фоновый прогрев кэша: периодическое обновление расписаний всех групп
+и преподавателей, чтобы запросы пользователей не ждали сайт БГТУ.
+"""
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime
+from time import monotonic
+from typing import List, Optional, Set, Tuple
+
+from bgtu_parser import AsyncParser
+from lesson_index import index_groups
+
+logger = logging.getLogger(__name__)
+
+# На сколько секунд планировщик захватывает блокировку в общем хранилище
+PREFETCH_LEASE = 60
+
+
+class Prefetcher:
+    """Планировщик фонового обновления расписаний.
+
+    Сначала находит все факультеты, группы и преподавателей, затем по кругу
+    обновляет их расписания не чаще `rate` запросов в секунду. Расписания,
+    которые запрашивали за последние `hot_window` секунд, обновляются раз в
+    `hot_interval` секунд, остальные — раз в `cold_interval`.
+
+    Если у кэша парсера общее хранилище, работает только один планировщик
+    из всех процессов — тот, кто держит блокировку `("prefetch",)`; он
+    продлевает её на каждом шаге, а остальные ждут, пока она освободится.
+    Пока ждут, они раз в `hot_interval` секунд строят свой индекс пар из
+    расписаний в общем хранилище, чтобы поиск аудиторий работал в любом процессе.
+
+    Аргументы:
+        parser (AsyncParser): парсер с кэшем результатов
+        rate (float): максимум обновлений в секунду (0 — без ограничения,
+            запросы к сайту ограничивает только `parser.guard`)
+        hot_interval (float): период обновления часто запрашиваемых расписаний
+        cold_interval (float): период обновления остальных расписаний
+        hot_window (float): насколько недавний запрос делает расписание «горячим»
+        discover_interval (float): период повторного поиска групп и преподавателей
+        teachers (bool): обновлять ли расписания преподавателей
+        index (bool): перестраивать ли индекс пар (`lesson_index.index_groups`)
+            после каждого круга обновления
+    """
+
+    # pylint: disable=R0902,R0913
+    # Настроек у планировщика действительно много
+
+    def __init__(
+        self,
+        parser: AsyncParser,
+        *,
+        rate: float = 1.0,
+        hot_interval: float = 3600,
+        cold_interval: float = 43200,
+        hot_window: float = 86400,
+        discover_interval: float = 86400,
+        teachers: bool = True,
+        index: bool = False,
+    ) -> None:
+        self.parser = parser
+        self.rate = rate
+        self.hot_interval = hot_interval
+        self.cold_interval = cold_interval
+        self.hot_window = hot_window
+        self.discover_interval = discover_interval
+        self.teachers = teachers
+        self.index = index
+
+        self._queue: List[Tuple[float, str, str]] = []
+        self._known: Set[Tuple[str, str]] = set()
+        self._cycle_done: Set[Tuple[str, str]] = set()
+        self._next_discovery = 0.0
+        self._next_index = 0.0
+        self._task: Optional[asyncio.Future] = None
+        self.leader = False
+
+        self.cycle = 0
+        self.refreshed = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_discovery: Optional[datetime] = None
+
+    def start(self) -> None:
+        """Запускает планировщик в фоне."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+
+    def stop(self) -> None:
+        """Останавливает планировщик."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def discover(self) -> None:
+        """Находит все группы и преподавателей и добавляет новые в очередь.
+
+        Пропавшие с сайта группы и преподаватели больше не обновляются:
+        их записи убираются из очереди, когда до них доходит очередь.
+        """
+        now = monotonic()
+        items = set()
+
+        # Факультеты и преподаватели — с одной страницы сайта
+        meta = await self.parser.refresh("meta")
+
+        for faculty in meta["faculties"]:
+            for group in await self.parser.refresh("faculty_groups", faculty):
+                items.add(("schedule", group))
+
+        if self.teachers:
+            for teacher in meta["teachers"]:
+                items.add(("teacher_schedule", teacher))
+
+        for item in items - self._known:
+            heapq.heappush(self._queue, (now, *item))
+        self._known = items
+        self._cycle_done &= items
+
+        self.last_discovery = datetime.now()
+        self._next_discovery = now + self.discover_interval
+
+    async def run(self) -> None:
+        """Основной цикл: поиск новых расписаний и обновление очередных."""
+        while True:
+            self.leader = await self._lead()
+            if not self.leader:
+                if self.index and monotonic() >= self._next_index:
+                    # Расписания обновляет лидер, индекс нужен и этому процессу
+                    await self._index()
+                await asyncio.sleep(PREFETCH_LEASE / 2)
+                continue
+
+            retry_after = self.parser.guard.breaker.retry_after()
+            if retry_after > 0:
+                # Сайт недоступен: не тратим очередь на заведомые отказы
+                await asyncio.sleep(retry_after)
+                continue
+
+            if monotonic() >= self._next_discovery:
+                try:
+                    await self.discover()
+                except Exception as exc:  # pylint: disable=W0703
+                    logger.exception("Не удалось найти группы и преподавателей")
+                    self._fail(exc)
+                    self._next_discovery = monotonic() + self.cold_interval / 12
+
+            if not self._queue:
+                await asyncio.sleep(max(self._next_discovery - monotonic(), 1))
+                continue
+
+            due, method, name = self._queue[0]
+            wait = min(due, self._next_discovery) - monotonic()
+            if wait > 0:
+                # Просыпаемся и раньше, чтобы не упустить блокировку
+                await asyncio.sleep(min(wait, PREFETCH_LEASE / 2))
+                continue
+
+            heapq.heappop(self._queue)
+            if (method, name) not in self._known:
+                continue
+
+            await self._refresh(method, name)
+            if self.rate > 0:
+                await asyncio.sleep(1 / self.rate)
+
+    async def _refresh(self, method: str, name: str) -> None:
+        try:
+            await self.parser.refresh(method, name)
+            self.refreshed += 1
+        except Exception as exc:  # pylint: disable=W0703
+            logger.warning("Не удалось обновить %s(%r): %r", method, name, exc)
+            self._fail(exc)
+
+        due = monotonic() + await self._interval(method, name)
+        heapq.heappush(self._queue, (due, method, name))
+
+        self._cycle_done.add((method, name))
+        if len(self._cycle_done) >= len(self._known):
+            self.cycle += 1
+            self._cycle_done.clear()
+            if self.index:
+                await self._index()
+
+    async def _index(self) -> None:
+        self._next_index = monotonic() + self.hot_interval
+        try:
+            await index_groups(self.parser)
+        except Exception as exc:  # pylint: disable=W0703
+            logger.exception("Не удалось построить индекс пар")
+            self._fail(exc)
+
+    async def _interval(self, method: str, name: str) -> float:
+        if self.parser.cache is not None:
+            # С общим хранилищем учитываются и запросы к другим процессам
+            key = self.parser.cache_key(method, name)
+            ago = await self.parser.cache.last_access(key)
+            if ago is not None and ago < self.hot_window:
+                return self.hot_interval
+
+        return self.cold_interval
+
+    async def _lead(self) -> bool:
+        cache = self.parser.cache
+        if cache is None or cache.store is None or not cache.store.shared:
+            return True
+
+        return await cache.store.lock(("prefetch",), cache.owner, PREFETCH_LEASE)
+
+    def _fail(self, exc: Exception) -> None:
+        self.errors += 1
+        self.last_error = f"{type(exc).__name__}: {exc}"
+
+    def status(self) -> dict:
+        """Возвращает состояние планировщика.
+
+        Возвращает:
+            dict: ход текущего круга обновления, отставание от графика и ошибки
+        """
+        now = monotonic()
+        overdue = [
+            now - due
+            for due, method, name in self._queue
+            if due < now and (method, name) in self._known
+        ]
+
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "leader": self.leader,
+            "groups": sum(1 for method, _ in self._known if method == "schedule"),
+            "teachers": sum(
+                1 for method, _ in self._known if method == "teacher_schedule"
+            ),
+            "cycle": self.cycle,
+            "cycle_done": len(self._cycle_done),
+            "cycle_total": len(self._known),
+            "queued_overdue": len(overdue),
+            "lag": max(overdue, default=0.0),
+            "refreshed": self.refreshed,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_discovery": self.last_discovery,
+            "rate": self.rate,
+        }
@@ -0,0 +1,136 @@
+"""revalidation.py
+
+Условные запросы к сайту БГТУ.
+
+Для каждого запроса запоминаются валидаторы ответа (`ETag`,
+`Last-Modified`) и хэш тела вместе с результатом разбора. Повторный запрос
+отправляется с `If-None-Match` / `If-Modified-Since`, и если сайт ответил
+`304 Not Modified` или прислал то же самое тело, прежний результат
+используется без повторного разбора.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Hashable, Mapping, Optional
+
+
+def body_digest(content: bytes) -> str:
+    """Возвращает хэш тела ответа."""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class Validated:
+    """Валидаторы ответа и результат его разбора."""
+
+    # pylint: disable=R0903
+    # Запись только хранит данные
+
+    __slots__ = ("etag", "last_modified", "digest", "result")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], digest: str,
+                 result: Any) -> None:
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.result = result
+
+
+class Revalidator:
+    """Валидаторы и результаты разбора последних ответов по ключам запросов.
+
+    Аргументы:
+        maxsize (int): сколько запросов помнить (давно не повторявшиеся вытесняются)
+    """
+
+    def __init__(self, maxsize: int = 8192) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Validated]" = OrderedDict()
+        self.not_modified = 0
+        self.identical = 0
+        self.parsed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(kind: Hashable, url: str, params: dict = None) -> tuple:
+        """Возвращает ключ запроса.
+
+        Аргументы:
+            kind (Hashable): что извлекается из ответа (один ответ может
+                разбираться по-разному, например период и список факультетов)
+            url (str): адрес страницы
+            params (dict | None): параметры запроса
+        """
+        return (kind, url, tuple(sorted((params or {}).items())))
+
+    def get(self, key: Hashable) -> Optional[Validated]:
+        """Возвращает запомненный ответ по ключу запроса."""
+        return self._entries.get(key)
+
+    def headers(self, key: Hashable) -> dict:
+        """Возвращает заголовки условного запроса (пустые, если ответа ещё не было)."""
+        entry = self._entries.get(key)
+        headers = {}
+
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        return headers
+
+    def reuse(self, key: Hashable, status_code: int, headers: Mapping[str, str],
+              digest: str) -> Optional[Validated]:
+        """Возвращает прежний ответ, если новый ответ с ним совпадает.
+
+        Аргументы:
+            key (Hashable): ключ запроса
+            status_code (int): код ответа
+            headers (Mapping[str, str]): заголовки ответа
+            digest (str): хэш тела ответа (`body_digest`)
+
+        Возвращает:
+            Validated | None: прежний ответ или `None`, если ответ нужно разобрать
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if status_code == 304:
+            self.not_modified += 1
+        elif status_code == 200 and digest == entry.digest:
+            self.identical += 1
+        else:
+            return None
+
+        # Сервер мог обновить валидаторы, не меняя содержимого
+        entry.etag = headers.get("ETag") or entry.etag
+        entry.last_modified = headers.get("Last-Modified") or entry.last_modified
+        self._entries.move_to_end(key)
+        return entry
+
+    def remember(self, key: Hashable, status_code: int, headers: Mapping[str, str],
+                 digest: str, result: Any) -> None:
+        """Запоминает успешный ответ и результат его разбора."""
+        self.parsed += 1
+        if status_code != 200:
+            return
+
+        self._entries[key] = Validated(
+            headers.get("ETag"), headers.get("Last-Modified"), digest, result
+        )
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Возвращает количество ответов: без изменений (304), с тем же телом и разобранных."""
+        return {
+            "size": len(self._entries),
+            "not_modified": self.not_modified,
+            "identical": self.identical,
+            "parsed": self.parsed,
+        }
@@ -0,0 +1,353 @@
+"""schedule_table.py
+
+Разбор таблицы расписания (ответ `schedule.ajax.php`) за один проход.
+
+Каждая строка таблицы обходится один раз и превращается в кортеж `Row`,
+после чего общий для групп и преподавателей автомат `iter_lessons`
+раскладывает строки по дням, неделям и номерам пар.
+
+Для разбора HTML используется самый быстрый из доступных бэкендов:
+`selectolax`, `lxml` или `html.parser` из стандартной библиотеки.
+Бэкенд можно выбрать явно переменной окружения `HTML_BACKEND`.
+"""
+
+import os
+import re
+from html.parser import HTMLParser
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+DAYS = {
+    "Понедельник": "monday",
+    "Вторник": "tuesday",
+    "Среда": "wednesday",
+    "Четверг": "thursday",
+    "Пятница": "friday",
+    "Суббота": "saturday",
+}
+
+# Классы ячеек, которые нужны из каждой строки таблицы
+CELL_CLASSES = frozenset(("daeweek", "schtime", "schname", "schteacher", "schclass"))
+
+# Элементы без закрывающего тега (для бэкенда на `html.parser`)
+VOID_ELEMENTS = frozenset(
+    ("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta")
+    + ("param", "source", "track", "wbr")
+)
+
+_TABLE_RE = re.compile(r"<table", re.IGNORECASE)
+
+
+class Row(NamedTuple):
+    """Строка таблицы расписания.
+
+    #### Поля
+
+    - `day` (str | None): текст строки, если это заголовок дня недели
+    - `time` (str | None): текст ячейки `.schtime`
+    - `rowspan` (bool): есть ли у ячейки времени атрибут `rowspan`
+    - `subject` (list[str] | None): тексты дочерних узлов ячейки `.schname`
+    - `teacher` (str): текст ячейки `.schteacher`
+    - `room` (str): текст ячейки `.schclass`
+    """
+
+    day: Optional[str]
+    time: Optional[str]
+    rowspan: bool
+    subject: Optional[List[str]]
+    teacher: str
+    room: str
+
+
+def _wrap_table(html: str) -> str:
+    # HTML5-парсеры выбрасывают <tr> вне <table>
+    if _TABLE_RE.search(html):
+        return html
+    return f"<table>{html}</table>"
+
+
+def _make_row(cells: dict, row_text: Callable, text: Callable, children: Callable,
+              rowspan: Callable) -> Row:
+    if "daeweek" in cells:
+        return Row(row_text(), None, False, None, "", "")
+
+    time_cell = cells.get("schtime")
+    subject_cell = cells.get("schname")
+    teacher_cell = cells.get("schteacher")
+    room_cell = cells.get("schclass")
+
+    return Row(
+        None,
+        text(time_cell) if time_cell is not None else None,
+        time_cell is not None and rowspan(time_cell),
+        children(subject_cell) if subject_cell is not None else None,
+        text(teacher_cell) if teacher_cell is not None else "",
+        text(room_cell) if room_cell is not None else "",
+    )
+
+
+def _rows_selectolax(html: str) -> Iterator[Row]:
+    def text(node):
+        return node.text(deep=True)
+
+    def children(node):
+        return [child.text(deep=True) for child in node.iter(include_text=True)]
+
+    def rowspan(node):
+        return "rowspan" in node.attributes
+
+    for tr in LexborHTMLParser(_wrap_table(html)).css("tr"):
+        cells = {}
+        for node in islice(tr.traverse(), 1, None):
+            for cls in (node.attributes.get("class") or "").split():
+                if cls in CELL_CLASSES and cls not in cells:
+                    cells[cls] = node
+
+        yield _make_row(cells, tr.text, text, children, rowspan)
+
+
+def _rows_lxml(html: str) -> Iterator[Row]:
+    def text(node):
+        return node.text_content()
+
+    def children(node):
+        parts = [node.text] if node.text else []
+        for child in node:
+            parts.append(child.text_content())
+            if child.tail:
+                parts.append(child.tail)
+        return parts
+
+    def rowspan(node):
+        return "rowspan" in node.attrib
+
+    for tr in lxml_html.fromstring(_wrap_table(html)).iter("tr"):
+        cells = {}
+        for node in tr.iterdescendants():
+            for cls in (node.get("class") or "").split():
+                if cls in CELL_CLASSES and cls not in cells:
+                    cells[cls] = node
+
+        yield _make_row(cells, tr.text_content, text, children, rowspan)
+
+
+class _Cell:
+    """Ячейка, собираемая бэкендом `html.parser`."""
+
+    # pylint: disable=R0903
+    # Ячейка только копит текст, разбирает её `_RowCollector`
+
+    __slots__ = ("depth", "attrs", "text", "parts", "in_text")
+
+    def __init__(self, depth: int, attrs: dict) -> None:
+        self.depth = depth
+        self.attrs = attrs
+        self.text = []
+        self.parts = []
+        self.in_text = False
+
+
+class _RowCollector(HTMLParser):
+    """Потоковый сборщик строк таблицы на `html.parser`.
+
+    Не строит дерево: по событиям парсера копит текст строки и нужных
+    ячеек, а для `.schname` — тексты её прямых потомков.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.rows: List[Row] = []
+        self._depth = 0
+        self._row: Optional[List[str]] = None
+        self._row_depth = 0
+        self._cells: Dict[str, _Cell] = {}
+        self._open: List[_Cell] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._flush()
+            self._row = []
+            self._row_depth = self._depth
+            self._cells = {}
+
+        elif self._row is not None:
+            attrs = dict(attrs)
+            for cell in self._open:
+                if self._depth == cell.depth + 1:
+                    # Новый прямой потомок ячейки — новый элемент `contents`
+                    cell.parts.append("")
+                    cell.in_text = False
+
+            for cls in (attrs.get("class") or "").split():
+                if cls in CELL_CLASSES and cls not in self._cells:
+                    cell = _Cell(self._depth, attrs)
+                    self._cells[cls] = cell
+                    self._open.append(cell)
+
+        if tag not in VOID_ELEMENTS:
+            self._depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self._depth -= 1
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+
+        self._depth -= 1
+        self._open = [cell for cell in self._open if cell.depth < self._depth]
+
+        if tag == "tr" and self._row is not None and self._depth <= self._row_depth:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._row is None:
+            return
+
+        self._row.append(data)
+        for cell in self._open:
+            cell.text.append(data)
+            if self._depth == cell.depth + 1:
+                # Текст прямо внутри ячейки; соседние куски склеиваются
+                if cell.in_text:
+                    cell.parts[-1] += data
+                else:
+                    cell.parts.append(data)
+                    cell.in_text = True
+            else:
+                cell.parts[-1] += data
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _flush(self):
+        if self._row is None:
+            return
+
+        row = self._row
+        self.rows.append(
+            _make_row(
+                self._cells,
+                lambda: "".join(row),
+                lambda cell: "".join(cell.text),
+                lambda cell: cell.parts,
+                lambda cell: "rowspan" in cell.attrs,
+            )
+        )
+        self._row = None
+        self._cells = {}
+        self._open = []
+
+
+def _rows_html_parser(html: str) -> Iterator[Row]:
+    collector = _RowCollector()
+    collector.feed(html)
+    collector.close()
+    return iter(collector.rows)
+
+
+BACKENDS: Dict[str, Callable[[str], Iterator[Row]]] = {}
+if LexborHTMLParser is not None:
+    BACKENDS["selectolax"] = _rows_selectolax
+if lxml_html is not None:
+    BACKENDS["lxml"] = _rows_lxml
+BACKENDS["html.parser"] = _rows_html_parser
+
+DEFAULT_BACKEND = os.environ.get("HTML_BACKEND") or next(iter(BACKENDS))
+
+
+def iter_rows(html: str, backend: str = None) -> Iterator[Row]:
+    """Разбирает таблицу расписания на строки.
+
+    Аргументы:
+        html (str): HTML-код ответа `schedule.ajax.php`
+        backend (str): бэкенд разбора (`selectolax`, `lxml`, `html.parser`)
+
+    Возвращает:
+        Iterator[Row]: строки таблицы по порядку
+    """
+    return BACKENDS[backend or DEFAULT_BACKEND](html)
+
+
+def format_subject(name: str, subject_type: str) -> str:
+    """Собирает название предмета с сокращённым типом занятия."""
+    if "практическое" in subject_type.lower():
+        return f"[ПЗ] {name}"
+
+    if "лекция" in subject_type.lower():
+        return f"[Л] {name}"
+
+    if "лабораторное" in subject_type.lower():
+        return f"[ЛАБ] {name}"
+
+    return f"[{subject_type[:5].upper()}] {name}"
+
+
+def iter_lessons(
+    html: str, get_lesson_number: Callable[[str], int], backend: str = None
+) -> Iterator[Tuple[str, str, int, str, str, str]]:
+    """Проходит по таблице расписания и выдаёт пары.
+
+    Аргументы:
+        html (str): HTML-код ответа `schedule.ajax.php`
+        get_lesson_number (Callable): функция определения номера пары по времени
+        backend (str): бэкенд разбора HTML
+
+    Возвращает:
+        Iterator[tuple]: кортежи `(day, week_type, index, subject, teacher, room)`,
+            где `week_type` — `odd`, `even` или `both`, а `teacher` — сырой текст
+            ячейки `.schteacher` (преподаватели или группы)
+    """
+    # Тип недели
+    week_type = "both"
+
+    day = index = None
+
+    for row in iter_rows(html, backend):
+        #! День недели
+        if row.day is not None:
+            day = DAYS[row.day]
+            continue
+
+        # ? Строка без ячейки предмета не относится к расписанию
+        if row.subject is None:
+            continue
+
+        #! Время
+        if row.time is None:
+            # ? Времени нет => вторая пара в разделе
+            week_type = "even"
+
+        elif row.rowspan:
+            # ? Есть rowspan => первая пара в разделе
+            index = get_lesson_number(row.time.lstrip()) - 1
+            week_type = "odd"
+
+        else:
+            # ? Есть время, нет rowspan => обычная пара
+            index = get_lesson_number(row.time.lstrip()) - 1
+            week_type = "both"
+
+        #! Предмет
+        if not "".join(row.subject):
+            # ? Пары нет (окно)
+            continue
+
+        subject = format_subject(
+            row.subject[0].strip("/\\ "), row.subject[2].strip("/\\ ")
+        )
+
+        yield day, week_type, index, subject, row.teacher, row.room
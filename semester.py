@@ -0,0 +1,131 @@
+"""semester.py
+
+Календарь учебного семестра.
+
+На сайте БГТУ у пар нет дат: расписание задано на две недели (`even` и
+`odd`), которые чередуются весь семестр. Семестр задаётся понедельником
+первой недели, количеством недель и тем, какой из двух недель расписания
+он начинается; по нему определяется неделя расписания для любой даты.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from timetable import DAY_NAMES, WEEKS
+
+# Время в расписании — московское (без перехода на летнее время)
+MSK = timezone(timedelta(hours=3), "MSK")
+
+# Продолжительность семестра по умолчанию, в неделях
+SEMESTER_WEEKS = 18
+
+
+class Semester(NamedTuple):
+    """Учебный семестр.
+
+    #### Поля
+
+    - `start` (date): понедельник первой недели
+    - `weeks` (int): количество недель
+    - `first_week` (str): неделя расписания (`even` или `odd`), с которой
+      начинается семестр
+    """
+
+    start: date
+    weeks: int = SEMESTER_WEEKS
+    first_week: str = "even"
+
+    @property
+    def end(self) -> date:
+        """Первый день после семестра."""
+        return self.start + timedelta(weeks=self.weeks)
+
+    def week(self, day: date) -> Optional[str]:
+        """Возвращает неделю расписания (`even` или `odd`) для даты.
+
+        Возвращает:
+            str | None: неделя или `None`, если дата не входит в семестр
+        """
+        number = (day - self.start).days // 7
+        if not 0 <= number < self.weeks:
+            return None
+
+        if number % 2 == 0:
+            return self.first_week
+        return WEEKS[1 - WEEKS.index(self.first_week)]
+
+    def days(self) -> Iterator[Tuple[date, str, str]]:
+        """Выдаёт учебные дни семестра (с понедельника по субботу).
+
+        Возвращает:
+            Iterator[tuple[date, str, str]]: дата, день недели (`monday`, ...)
+                и неделя расписания
+        """
+        for offset in range(self.weeks * 7):
+            day = self.start + timedelta(days=offset)
+            if day.weekday() < len(DAY_NAMES):
+                yield day, DAY_NAMES[day.weekday()], self.week(day)
+
+
+def today() -> date:
+    """Возвращает сегодняшнюю дату по московскому времени."""
+    return datetime.now(MSK).date()
+
+
+def moscow_time(at: datetime = None) -> datetime:
+    """Возвращает заданное (по умолчанию текущее) время по Москве.
+
+    Время без часового пояса считается московским.
+    """
+    if at is None:
+        return datetime.now(MSK)
+    if at.tzinfo is None:
+        return at.replace(tzinfo=MSK)
+    return at.astimezone(MSK)
+
+
+def default_start(day: date) -> date:
+    """Определяет начало семестра, в который попадает дата.
+
+    Осенний семестр начинается 1 сентября (январь относится к нему),
+    весенний — во второй понедельник февраля.
+
+    Возвращает:
+        date: понедельник первой недели семестра
+    """
+    if day.month >= 8:
+        first = date(day.year, 9, 1)
+    elif day.month == 1:
+        first = date(day.year - 1, 9, 1)
+    else:
+        february = date(day.year, 2, 1)
+        first = february + timedelta(days=(7 - february.weekday()) % 7 + 7)
+
+    return first - timedelta(days=first.weekday())
+
+
+def current_semester(
+    start: str = None,
+    weeks: int = SEMESTER_WEEKS,
+    first_week: str = "even",
+    day: date = None,
+) -> Semester:
+    """Возвращает текущий семестр.
+
+    Аргументы:
+        start (str | None): дата начала семестра (`YYYY-MM-DD`); если не
+            задана, определяется по дате (см. `default_start`)
+        weeks (int): количество недель
+        first_week (str): неделя расписания, с которой начинается семестр
+        day (date | None): дата вместо сегодняшней
+
+    Возвращает:
+        Semester: семестр
+    """
+    if start:
+        first = date.fromisoformat(start)
+        first -= timedelta(days=first.weekday())
+    else:
+        first = default_start(day or today())
+
+    return Semester(first, weeks, first_week)
@@ -0,0 +1,182 @@
+"""slots.py
+
+Индекс пар по дням для ответов «что сейчас» и «что сегодня».
+
+Для каждой версии расписания один раз раскладываются пары каждого дня
+каждой недели — с временем начала и конца в минутах и уже в виде словарей
+ответа. Запрос текущей или сегодняшней пары затем сводится к выбору дня
+и просмотру нескольких пар.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, Optional, Tuple
+
+from semester import Semester
+from timetable import DAY_NAMES, SLOT_TIMES, WEEKS, Timetable
+
+# Пара в индексе: минуты начала и конца от полуночи и словарь ответа
+Slot = Tuple[int, int, dict]
+
+# На сколько дней вперёд искать следующую пару (весь цикл из двух недель)
+LOOKAHEAD_DAYS = 14
+
+
+def minutes(clock: str) -> int:
+    """Переводит время `ЧЧ:ММ` в минуты от полуночи."""
+    hours, mins = clock.split(":")
+    return int(hours) * 60 + int(mins)
+
+
+def build(schedule: Timetable, party: str) -> Dict[Tuple[str, str], Tuple[Slot, ...]]:
+    """Раскладывает пары расписания по дням и неделям.
+
+    Аргументы:
+        schedule (Timetable): расписание
+        party (str): ключ поля `party` в ответе (`teacher` или `group`)
+
+    Возвращает:
+        dict: `{(day, week): ((start, end, lesson), ...)}`
+    """
+    days = {}
+
+    for day in DAY_NAMES:
+        for week in WEEKS:
+            slots = []
+            for number, entry in schedule.lessons(day, week):
+                start, end = SLOT_TIMES[number]
+                slots.append((minutes(start), minutes(end), {
+                    "number": number,
+                    "start": start,
+                    "end": end,
+                    "subject": entry.subject,
+                    "room": entry.room,
+                    party: entry.party,
+                }))
+            days[(day, week)] = tuple(slots)
+
+    return days
+
+
+class SlotIndex:
+    """Пары расписаний по дням для последних запрошенных версий расписаний.
+
+    Ключ — хэш расписания, поэтому записи не устаревают, а только
+    вытесняются давно не запрашивавшиеся (LRU).
+
+    Аргументы:
+        maxsize (int): сколько расписаний помнить
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Dict[Tuple[str, str], Tuple[Slot, ...]]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _days(self, schedule: Timetable, party: str) -> Dict[Tuple[str, str], Tuple[Slot, ...]]:
+        key = (party, schedule.owner, schedule.digest())
+        days = self._entries.get(key)
+
+        if days is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return days
+
+        self.misses += 1
+        days = self._entries[key] = build(schedule, party)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+        return days
+
+    @staticmethod
+    def _day(semester: Semester, moment: datetime) -> Tuple[Optional[str], Optional[str]]:
+        if moment.weekday() >= len(DAY_NAMES):
+            return None, semester.week(moment.date())
+        return DAY_NAMES[moment.weekday()], semester.week(moment.date())
+
+    def today(self, schedule: Timetable, party: str, semester: Semester,
+              moment: datetime) -> dict:
+        """Возвращает пары на день в формате модели `Today`.
+
+        Аргументы:
+            schedule (Timetable): расписание
+            party (str): ключ поля `party` в ответе (`teacher` или `group`)
+            semester (Semester): текущий семестр
+            moment (datetime): дата и время по московскому времени
+        """
+        day, week = self._day(semester, moment)
+        slots = self._days(schedule, party).get((day, week), ()) if day and week else ()
+
+        return {
+            "owner": schedule.owner,
+            "date": moment.date().isoformat(),
+            "day": day,
+            "week": week,
+            "lessons": [lesson for _, _, lesson in slots],
+        }
+
+    def now(self, schedule: Timetable, party: str, semester: Semester,
+            moment: datetime) -> dict:
+        """Возвращает текущие и ближайшие следующие пары в формате модели `Now`.
+
+        Следующие пары ищутся сначала в тот же день, а затем в следующие
+        учебные дни семестра (не дальше двух недель).
+
+        Аргументы:
+            schedule (Timetable): расписание
+            party (str): ключ поля `party` в ответе (`teacher` или `group`)
+            semester (Semester): текущий семестр
+            moment (datetime): дата и время по московскому времени
+        """
+        days = self._days(schedule, party)
+        day, week = self._day(semester, moment)
+        clock = moment.hour * 60 + moment.minute
+
+        today = days.get((day, week), ()) if day and week else ()
+        current = [lesson for start, end, lesson in today if start <= clock < end]
+
+        upcoming, next_date = self._next(days, semester, moment)
+
+        return {
+            "owner": schedule.owner,
+            "date": moment.date().isoformat(),
+            "time": f"{moment:%H:%M}",
+            "day": day,
+            "week": week,
+            "current": current,
+            "next": upcoming,
+            "next_date": next_date,
+        }
+
+    def _next(self, days: Dict[Tuple[str, str], Tuple[Slot, ...]], semester: Semester,
+              moment: datetime) -> Tuple[list, Optional[str]]:
+        clock = moment.hour * 60 + moment.minute
+
+        for offset in range(LOOKAHEAD_DAYS):
+            day, week = self._day(semester, moment + timedelta(days=offset))
+            if not day or not week:
+                continue
+
+            slots = [
+                (start, lesson) for start, _, lesson in days[(day, week)]
+                if offset or start > clock
+            ]
+            if slots:
+                # Все пары, начинающиеся одновременно (например, у подгрупп)
+                first = min(start for start, _ in slots)
+                upcoming = [lesson for start, lesson in slots if start == first]
+                return upcoming, (moment + timedelta(days=offset)).date().isoformat()
+
+        return [], None
+
+    def stats(self) -> dict:
+        """Возвращает размер индекса, попадания и промахи."""
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,418 @@
+"""storage.py
+
+Хранилища результатов парсера.
+
+Нужны, чтобы после перезапуска приложение сразу отдавало расписания,
+не дожидаясь сайта БГТУ, а обновляло их уже в фоне, и чтобы несколько
+процессов (воркеров uvicorn или серверов) пользовались одними данными
+и не загружали одно и то же с сайта каждый сам.
+
+- `MemoryStore` — в памяти процесса;
+- `ScheduleStore` — файл SQLite, общий для процессов на одном сервере;
+- `RedisStore` — Redis, общий для нескольких серверов (нужен пакет `redis`).
+
+Методы хранилищ — корутины: запросы к SQLite и Redis блокирующие, поэтому
+они выполняются в пуле потоков и не останавливают цикл событий, пока база
+занята или Redis отвечает медленно.
+"""
+
+import asyncio
+import functools
+import json
+import sqlite3
+import threading
+from time import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class Store:
+    """Хранилище «ключ — значение» с отметкой времени обновления.
+
+    Ключи — кортежи ключей кэша (`("schedule", "О-20-ИВТ-1-по-Б")`),
+    значения сериализуются в JSON.
+
+    Кроме записей хранилище выдаёт блокировки с истечением (`lock`): ими
+    процессы договариваются, кто загружает значение с сайта.
+
+    `get`, `set`, `delete`, `lock` и `unlock` — корутины.
+
+    Атрибуты:
+        shared (bool): видят ли записи и блокировки другие процессы
+    """
+
+    shared = False
+
+    async def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Возвращает значение и время его обновления (unix time) или `None`."""
+        raise NotImplementedError
+
+    async def set(self, key: Hashable, value: Any, updated: float = None) -> None:
+        """Сохраняет значение с отметкой времени (по умолчанию — текущей)."""
+        raise NotImplementedError
+
+    async def delete(self, prefix: Hashable = ()) -> int:
+        """Удаляет все записи, ключ которых начинается с `prefix`.
+
+        Возвращает:
+            int: количество удалённых записей
+        """
+        raise NotImplementedError
+
+    async def lock(self, name: Hashable, owner: str, ttl: float) -> bool:
+        """Захватывает блокировку на `ttl` секунд.
+
+        Блокировку, которой уже владеет `owner`, захват продлевает.
+
+        Аргументы:
+            name (Hashable): имя блокировки
+            owner (str): идентификатор процесса
+            ttl (float): через сколько секунд блокировка истекает сама
+
+        Возвращает:
+            bool: удалось ли захватить блокировку
+        """
+        raise NotImplementedError
+
+    async def unlock(self, name: Hashable, owner: str) -> None:
+        """Снимает блокировку, если ею владеет `owner`."""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Освобождает ресурсы хранилища."""
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(list(key), ensure_ascii=False)
+
+
+class BlockingStore(Store):
+    """Хранилище с блокирующим доступом (SQLite, клиент Redis).
+
+    Наследники реализуют блокирующие `_read`, `_write`, `_remove`,
+    `_acquire` и `_release`, а методы `Store` выполняют их в пуле потоков.
+    """
+
+    async def _run(self, func, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+
+    async def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        return await self._run(self._read, key)
+
+    async def set(self, key: Hashable, value: Any, updated: float = None) -> None:
+        await self._run(self._write, key, value, updated)
+
+    async def delete(self, prefix: Hashable = ()) -> int:
+        return await self._run(self._remove, prefix)
+
+    async def lock(self, name: Hashable, owner: str, ttl: float) -> bool:
+        return await self._run(self._acquire, name, owner, ttl)
+
+    async def unlock(self, name: Hashable, owner: str) -> None:
+        await self._run(self._release, name, owner)
+
+    def _read(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        raise NotImplementedError
+
+    def _write(self, key: Hashable, value: Any, updated: float = None) -> None:
+        raise NotImplementedError
+
+    def _remove(self, prefix: Hashable = ()) -> int:
+        raise NotImplementedError
+
+    def _acquire(self, name: Hashable, owner: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    def _release(self, name: Hashable, owner: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryStore(Store):
+    """Хранилище в памяти процесса.
+
+    Значения всё равно сериализуются в JSON, так что восстанавливаются
+    так же, как из общих хранилищ.
+    """
+
+    def __init__(self) -> None:
+        self._results: Dict[str, Tuple[str, float]] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        row = self._results.get(self._key(key))
+        if row is None:
+            return None
+
+        return json.loads(row[0]), row[1]
+
+    async def set(self, key: Hashable, value: Any, updated: float = None) -> None:
+        self._results[self._key(key)] = (
+            json.dumps(value, ensure_ascii=False, default=str),
+            updated if updated is not None else time(),
+        )
+
+    async def delete(self, prefix: Hashable = ()) -> int:
+        with self._lock:
+            if not prefix:
+                count = len(self._results)
+                self._results.clear()
+                return count
+
+            start = self._key(prefix)[:-1]
+            keys = [key for key in self._results if key.startswith(start)]
+            for key in keys:
+                del self._results[key]
+
+        return len(keys)
+
+    async def lock(self, name: Hashable, owner: str, ttl: float) -> bool:
+        name = self._key(name)
+        now = time()
+
+        with self._lock:
+            holder = self._locks.get(name)
+            if holder is not None and holder[0] != owner and holder[1] > now:
+                return False
+            self._locks[name] = (owner, now + ttl)
+
+        return True
+
+    async def unlock(self, name: Hashable, owner: str) -> None:
+        name = self._key(name)
+
+        with self._lock:
+            holder = self._locks.get(name)
+            if holder is not None and holder[0] == owner:
+                del self._locks[name]
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+class ScheduleStore(BlockingStore):
+    """Хранилище в одном файле SQLite.
+
+    Файл можно открыть из нескольких процессов на одном сервере (например,
+    из воркеров uvicorn): записи и блокировки у них будут общими.
+
+    Аргументы:
+        path (str): путь к файлу базы данных
+    """
+
+    shared = True
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " updated REAL NOT NULL"
+            ")"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS locks ("
+            " name TEXT PRIMARY KEY,"
+            " owner TEXT NOT NULL,"
+            " expires REAL NOT NULL"
+            ")"
+        )
+        self._db.commit()
+
+    def _read(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, updated FROM results WHERE key = ?", (self._key(key),)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return json.loads(row[0]), row[1]
+
+    def _write(self, key: Hashable, value: Any, updated: float = None) -> None:
+        data = json.dumps(value, ensure_ascii=False, default=str)
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, updated) VALUES (?, ?, ?)",
+                (self._key(key), data, updated if updated is not None else time()),
+            )
+            self._db.commit()
+
+    def _remove(self, prefix: Hashable = ()) -> int:
+        with self._lock:
+            if not prefix:
+                cursor = self._db.execute("DELETE FROM results")
+            else:
+                # `["schedule", "G"` без закрывающей скобки — префикс всех
+                # ключей с такими первыми элементами, и только их
+                key = self._key(prefix)[:-1]
+                cursor = self._db.execute(
+                    "DELETE FROM results WHERE substr(key, 1, ?) = ?", (len(key), key)
+                )
+            self._db.commit()
+
+        return cursor.rowcount
+
+    def _acquire(self, name: Hashable, owner: str, ttl: float) -> bool:
+        name = self._key(name)
+        now = time()
+
+        with self._lock:
+            # Истёкшую или свою блокировку удаляем, а вставка удастся,
+            # только если чужой действующей блокировки нет
+            self._db.execute(
+                "DELETE FROM locks WHERE name = ? AND (expires <= ? OR owner = ?)",
+                (name, now, owner),
+            )
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO locks (name, owner, expires) VALUES (?, ?, ?)",
+                (name, owner, now + ttl),
+            )
+            self._db.commit()
+
+        return cursor.rowcount == 1
+
+    def _release(self, name: Hashable, owner: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM locks WHERE name = ? AND owner = ?", (self._key(name), owner)
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self) -> None:
+        """Закрывает соединение с базой данных."""
+        with self._lock:
+            self._db.close()
+
+
+# Снимает блокировку, только если ею всё ещё владеет тот же процесс
+_UNLOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisStore(BlockingStore):
+    """Хранилище в Redis, общее для процессов на разных серверах.
+
+    Запись хранится строкой JSON `[value, updated]` под ключом
+    `<prefix>results:<ключ кэша в JSON>`, блокировка — под
+    `<prefix>locks:<имя в JSON>` с истечением средствами Redis.
+
+    Аргументы:
+        url (str): адрес Redis (`redis://host:6379/0`)
+        prefix (str): префикс ключей (чтобы делить Redis с другими приложениями)
+        client (redis.Redis | None): готовый клиент вместо подключения по `url`
+    """
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "bgtu:", client=None) -> None:
+        if client is None:
+            if redis is None:
+                raise RuntimeError("Для хранилища в Redis нужен пакет redis")
+            client = redis.Redis.from_url(url)
+
+        self.url = url
+        self.prefix = prefix
+        self._client = client
+
+    def _result(self, key: Hashable) -> str:
+        return f"{self.prefix}results:{self._key(key)}"
+
+    def _lock_name(self, name: Hashable) -> str:
+        return f"{self.prefix}locks:{self._key(name)}"
+
+    def _scan(self, prefix: Hashable = ()):
+        start = self._result(prefix)[:-1] if prefix else f"{self.prefix}results:"
+        # Спецсимволы шаблона в ключах (скобки списков JSON) экранируются
+        pattern = "".join("\\" + char if char in "*?[]\\" else char for char in start)
+        return self._client.scan_iter(match=pattern + "*", count=1000)
+
+    def _read(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        raw = self._client.get(self._result(key))
+        if raw is None:
+            return None
+
+        value, updated = json.loads(raw)
+        return value, updated
+
+    def _write(self, key: Hashable, value: Any, updated: float = None) -> None:
+        self._client.set(
+            self._result(key),
+            json.dumps(
+                [value, updated if updated is not None else time()],
+                ensure_ascii=False,
+                default=str,
+            ),
+        )
+
+    def _remove(self, prefix: Hashable = ()) -> int:
+        keys = list(self._scan(prefix))
+        for i in range(0, len(keys), 500):
+            self._client.delete(*keys[i:i + 500])
+        return len(keys)
+
+    def _acquire(self, name: Hashable, owner: str, ttl: float) -> bool:
+        name = self._lock_name(name)
+        milliseconds = max(int(ttl * 1000), 1)
+
+        if self._client.set(name, owner, nx=True, px=milliseconds):
+            return True
+
+        holder = self._client.get(name)
+        if holder is not None and holder.decode() == owner:
+            self._client.pexpire(name, milliseconds)
+            return True
+
+        return False
+
+    def _release(self, name: Hashable, owner: str) -> None:
+        self._client.eval(_UNLOCK_SCRIPT, 1, self._lock_name(name), owner)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._scan())
+
+    def close(self) -> None:
+        """Закрывает соединения с Redis."""
+        self._client.close()
+
+
+def open_store(url: str) -> Store:
+    """Открывает хранилище по адресу.
+
+    Аргументы:
+        url (str): `redis://...` (`rediss://`, `unix://`) — Redis, `memory:` —
+            память процесса, всё остальное — путь к файлу SQLite
+
+    Возвращает:
+        Store: хранилище
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url)
+
+    if url == "memory:":
+        return MemoryStore()
+
+    return ScheduleStore(url)
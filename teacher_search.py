@@ -0,0 +1,215 @@
+"""teacher_search.py
+
+Поиск преподавателей по неполному или неточному имени (для автодополнения).
+
+Индекс строится один раз по списку преподавателей: отсортированный словарь
+слов имён с номерами имён для поиска по префиксу и триграммы фамилий для
+поиска с опечатками.
+Запрос может быть полным именем, его началом (`Трубаков Ев`), фамилией
+с инициалами (`Трубаков Е.О.`) или фамилией с опечаткой (`Трубоков`).
+
+`TeacherSearch` ищет по текущему списку преподавателей и перестраивает
+индекс, только когда список изменился.
+"""
+
+import heapq
+import math
+import re
+from bisect import bisect_left
+from typing import AbstractSet, Dict, List, Sequence, Set, Tuple
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+# Оценки совпадений разного вида (от лучшего к худшему)
+EXACT_SCORE = 1.0
+INITIALS_SCORE = 0.9
+PREFIX_SCORE = 0.7
+FUZZY_SCORE = 0.5
+
+# Наименьшее сходство фамилий по триграммам (коэффициент Дайса) для поиска
+# с опечатками
+FUZZY_THRESHOLD = 0.5
+
+
+def words(text: str) -> List[str]:
+    """Разбивает текст на слова в нижнем регистре (`ё` заменяется на `е`)."""
+    return _SEPARATORS.sub(" ", text.lower().replace("ё", "е")).split()
+
+
+def trigrams(word: str) -> Set[str]:
+    """Возвращает триграммы слова, дополненного пробелами с обеих сторон."""
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TeacherIndex:
+    """Индекс имён преподавателей для поиска.
+
+    Аргументы:
+        names (Sequence[str]): имена преподавателей (`Parser.teacher_list`);
+            список не копируется, по нему проверяется, нужно ли перестроить индекс
+    """
+
+    # pylint: disable=R0902
+    # Словари индекса — отдельные атрибуты ради скорости поиска
+
+    def __init__(self, names: Sequence[str] = ()) -> None:
+        self.names = names
+        self._words: List[Tuple[str, ...]] = []
+        self._initials: List[str] = []
+        self._postings: Dict[str, Set[int]] = {}
+        self._by_surname: Dict[str, Set[int]] = {}
+        self._trigrams: Dict[str, List[int]] = {}
+        self._surnames: List[Set[str]] = []
+
+        for i, name in enumerate(self.names):
+            parts = tuple(words(name))
+            self._words.append(parts)
+            self._initials.append("".join(part[0] for part in parts[1:]))
+
+            for part in parts:
+                self._postings.setdefault(part, set()).add(i)
+
+            if parts:
+                self._by_surname.setdefault(parts[0], set()).add(i)
+
+            surname = trigrams(parts[0]) if parts else set()
+            self._surnames.append(surname)
+            for trigram in surname:
+                self._trigrams.setdefault(trigram, []).append(i)
+
+        self._vocabulary = sorted(self._postings)
+        self._surname_vocabulary = sorted(self._by_surname)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _with_prefix(self, prefix: str, surname: bool = False) -> AbstractSet[int]:
+        """Номера имён, в которых есть слово (или фамилия) с заданным началом.
+
+        Возвращаемое множество может быть общим с индексом — его нельзя изменять.
+        """
+        vocabulary = self._surname_vocabulary if surname else self._vocabulary
+        postings = self._by_surname if surname else self._postings
+        start = bisect_left(vocabulary, prefix)
+        end = bisect_left(vocabulary, prefix + "\uffff", start)
+
+        if end - start == 1:
+            return postings[vocabulary[start]]
+        return set().union(*(postings[word] for word in vocabulary[start:end]))
+
+    def _similar(self, surname: str) -> Dict[int, float]:
+        """Номера имён и сходство их фамилий с заданной по триграммам."""
+        query = trigrams(surname)
+
+        # Фамилия со сходством не ниже порога делит с запросом хотя бы `least`
+        # триграмм, поэтому кандидатов достаточно искать по самым редким
+        # `len(query) - least + 1` триграммам, пропуская частые (`ов `, `ков`)
+        least = math.ceil(FUZZY_THRESHOLD * len(query) / (2 - FUZZY_THRESHOLD))
+        rare = sorted(query, key=lambda trigram: len(self._trigrams.get(trigram, ())))
+        candidates = set().union(
+            *(self._trigrams.get(trigram, ()) for trigram in rare[:len(query) - least + 1])
+        )
+
+        similar = {}
+        for i in candidates:
+            other = self._surnames[i]
+            similarity = 2 * len(query & other) / (len(query) + len(other))
+            if similarity >= FUZZY_THRESHOLD:
+                similar[i] = similarity
+        return similar
+
+    def _prefix_match(self, i: int, tokens: List[str]) -> bool:
+        """Каждое слово запроса — начало своего слова имени (по порядку)."""
+        parts = iter(self._words[i])
+        return all(any(part.startswith(token) for part in parts) for token in tokens)
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Ищет преподавателей по запросу.
+
+        Слова запроса из одной-двух букв считаются инициалами. Лучше всего
+        оценивается точное совпадение, затем фамилия с инициалами, затем
+        начала слов имени, затем фамилия с опечаткой.
+
+        Аргументы:
+            query (str): запрос
+            limit (int): максимум результатов
+
+        Возвращает:
+            list[dict]: `{"name", "score"}` по убыванию оценки
+        """
+        tokens = words(query)
+        if not tokens:
+            return []
+
+        if len(tokens) == 1:
+            # Начало одного слова — частый запрос автодополнения. Если фамилий
+            # с таким началом не меньше `limit`, остальные совпадения оцениваются
+            # ниже и в ответ не попадут
+            found = self._with_prefix(tokens[0], surname=True)
+            if len(found) >= limit:
+                return [
+                    {"name": name, "score": PREFIX_SCORE}
+                    for name in heapq.nsmallest(limit, (self.names[i] for i in found))
+                ]
+
+        long_tokens = [token for token in tokens if len(token) > 2]
+        initials = "".join(token for token in tokens if len(token) <= 2)
+        scores: Dict[int, float] = {}
+
+        # Кандидаты по префиксу: имена, где есть слова с началом каждого слова запроса
+        found = sorted((self._with_prefix(token) for token in long_tokens or tokens), key=len)
+        candidates = found[0].intersection(*found[1:])
+
+        for i in candidates:
+            parts = self._words[i]
+            if list(parts) == tokens:
+                scores[i] = EXACT_SCORE
+            elif (len(long_tokens) == 1 and initials and parts[0].startswith(long_tokens[0])
+                    and self._initials[i].startswith(initials)):
+                scores[i] = INITIALS_SCORE - (0 if parts[0] == long_tokens[0] else 0.05)
+            elif self._prefix_match(i, tokens):
+                scores[i] = PREFIX_SCORE - (0 if parts[0].startswith(tokens[0]) else 0.1)
+
+        # Фамилии с опечатками: первое длинное слово запроса считается фамилией
+        if long_tokens:
+            for i, similarity in self._similar(long_tokens[0]).items():
+                if i in scores:
+                    continue
+                bonus = 0.1 if initials and self._initials[i].startswith(initials) else 0
+                scores[i] = FUZZY_SCORE * similarity + bonus
+
+        ranked = heapq.nsmallest(
+            limit, scores.items(), key=lambda item: (-item[1], self.names[item[0]])
+        )
+        return [{"name": self.names[i], "score": round(score, 3)} for i, score in ranked]
+
+
+class TeacherSearch:
+    """Поиск по списку преподавателей, который обновляется вместе с кэшем парсера.
+
+    Индекс строится при первом поиске и перестраивается, только когда
+    список преподавателей изменился.
+    """
+
+    def __init__(self) -> None:
+        self.current = TeacherIndex()
+
+    def index(self, names: Sequence[str]) -> TeacherIndex:
+        """Возвращает индекс для списка `names` (прежний, если список тот же)."""
+        if names is not self.current.names and names != self.current.names:
+            self.current = TeacherIndex(names)
+        return self.current
+
+    def search(self, names: Sequence[str], query: str, limit: int = 10) -> List[dict]:
+        """Ищет преподавателей из списка `names` (см. `TeacherIndex.search`).
+
+        Аргументы:
+            names (Sequence[str]): имена преподавателей (`AsyncParser.teacher_list`)
+            query (str): запрос (`Трубаков Е.О.`, `труб`, `Трубоков`)
+            limit (int): максимум результатов
+
+        Возвращает:
+            list[dict]: `{"name", "score"}` по убыванию оценки
+        """
+        return self.index(names).search(query, limit)
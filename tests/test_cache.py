@@ -0,0 +1,171 @@
+"""Тесты кэша результатов парсера (`cache.ResultCache`) и объединения
+одновременных запросов (`cache.SingleFlight`, `cache.coalesced`)."""
+
+import asyncio
+
+import pytest
+
+from cache import ResultCache, SingleFlight, coalesced
+
+KEY = ("schedule", "О-20-ИВТ-1-по-Б")
+
+
+class Source:
+    """Загрузка значения с подсчётом вызовов; `error` делает её неудачной."""
+
+    # pylint: disable=R0903
+    # Заменяет только загрузку с сайта
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.error = None
+
+    async def fetch(self) -> int:
+        """Возвращает номер вызова или бросает `error`."""
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.calls
+
+
+def age(cache: ResultCache, seconds: float) -> None:
+    """Состаривает запись `KEY` на `seconds` секунд."""
+    cache.get(KEY).created -= seconds
+
+
+def test_fresh_entry_is_reused():
+    """Пока запись свежая, сайт повторно не запрашивается."""
+    async def run():
+        cache, source = ResultCache(ttl=60), Source()
+        assert await cache.get_or_fetch(KEY, source.fetch) == 1
+        assert await cache.get_or_fetch(KEY, source.fetch) == 1
+        return cache, source
+
+    cache, source = asyncio.run(run())
+    assert source.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_stale_entry_is_refreshed_in_background():
+    """Устаревшая запись отдаётся сразу, а новое значение загружается в фоне."""
+    async def run():
+        cache, source = ResultCache(ttl=60, stale_ttl=600), Source()
+        await cache.get_or_fetch(KEY, source.fetch)
+        age(cache, 61)
+
+        assert await cache.get_or_fetch(KEY, source.fetch) == 1
+        # Фоновое обновление завершается на следующих итерациях цикла
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert await cache.get_or_fetch(KEY, source.fetch) == 2
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.stale == 1
+
+
+def test_expired_entry_is_fallback_on_error():
+    """Если сайт недоступен, отдаётся даже слишком старая запись."""
+    async def run():
+        cache, source = ResultCache(ttl=60, stale_ttl=600), Source()
+        await cache.get_or_fetch(KEY, source.fetch)
+        age(cache, 700)
+
+        source.error = ConnectionError("сайт недоступен")
+        assert await cache.get_or_fetch(KEY, source.fetch) == 1
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.fallback == 1
+
+
+def test_error_without_entry_is_raised():
+    """Без сохранённой записи ошибка загрузки доходит до вызывающего."""
+    async def run():
+        cache, source = ResultCache(ttl=60), Source()
+        source.error = ConnectionError("сайт недоступен")
+        await cache.get_or_fetch(KEY, source.fetch)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(run())
+
+
+def test_lru_eviction():
+    """Сверх `maxsize` вытесняются давно не запрашивавшиеся записи."""
+    async def run():
+        cache, source = ResultCache(ttl=60, maxsize=2), Source()
+        for name in ("a", "b", "c"):
+            await cache.get_or_fetch(("schedule", name), source.fetch)
+        return cache
+
+    cache = asyncio.run(run())
+    assert len(cache) == 2
+    assert cache.get(("schedule", "a")) is None
+
+
+class SlowParser:
+    """Парсер, у которого загрузка ждёт сигнала `release`."""
+
+    # pylint: disable=R0903
+    # Нужен только один метод с `coalesced`
+
+    def __init__(self) -> None:
+        self.flights = SingleFlight()
+        self.period = "2022-2023"
+        self.release = asyncio.Event()
+        self.calls = []
+
+    @coalesced
+    async def schedule(self, group: str) -> str:
+        """Возвращает имя группы после сигнала `release`."""
+        self.calls.append(group)
+        await self.release.wait()
+        return group
+
+
+def test_concurrent_calls_are_coalesced():
+    """Одновременные одинаковые вызовы выполняют одну загрузку."""
+    async def run():
+        parser = SlowParser()
+        tasks = [asyncio.ensure_future(parser.schedule("А")) for _ in range(3)]
+        tasks.append(asyncio.ensure_future(parser.schedule("Б")))
+        await asyncio.sleep(0)
+        parser.release.set()
+        return parser, await asyncio.gather(*tasks)
+
+    parser, results = asyncio.run(run())
+    assert results == ["А", "А", "А", "Б"]
+    assert sorted(parser.calls) == ["А", "Б"]
+    assert parser.flights.stats() == {"calls": 4, "coalesced": 2, "in_flight": 0}
+
+
+def test_error_reaches_every_caller():
+    """Исключение загрузки получают все объединённые вызовы."""
+    async def fail():
+        await asyncio.sleep(0)
+        raise ConnectionError("сайт недоступен")
+
+    async def run():
+        flights = SingleFlight()
+        return flights, await asyncio.gather(
+            flights.do("key", fail), flights.do("key", fail), return_exceptions=True
+        )
+
+    flights, results = asyncio.run(run())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert flights.coalesced == 1
+    assert len(flights) == 0
+
+
+def test_cancelled_caller_keeps_flight():
+    """Отмена одного ожидающего не отменяет загрузку для остальных."""
+    async def run():
+        parser = SlowParser()
+        first = asyncio.ensure_future(parser.schedule("А"))
+        second = asyncio.ensure_future(parser.schedule("А"))
+        await asyncio.sleep(0)
+        first.cancel()
+        parser.release.set()
+        return await second
+
+    assert asyncio.run(run()) == "А"
@@ -0,0 +1,82 @@
+"""Тесты ленты изменений расписаний (`changes`)."""
+
+from changes import ChangeFeed, diff
+from timetable import Entry, Timetable
+
+GROUP = "О-20-ИВТ-1-по-Б"
+PHYSICS = Entry("[Л] Физика", "А-101", "Иванов И.И.")
+
+
+def make_schedule(*lessons) -> Timetable:
+    """Расписание группы из пар `(day, week_type, index, entry)`."""
+    return Timetable.build(GROUP, lessons)
+
+
+def test_diff_finds_moved_and_changed():
+    """Пара с другим номером — перенесённая, с другой аудиторией — изменённая."""
+    old = make_schedule(("monday", "even", 0, PHYSICS), ("tuesday", "odd", 1, PHYSICS))
+    new = make_schedule(
+        ("monday", "even", 2, PHYSICS),
+        ("tuesday", "odd", 1, PHYSICS._replace(room="Б-202")),
+    )
+
+    changes = diff(old, new)
+
+    # Номера пар в событиях — с единицы, как на сайте
+    assert changes["monday"]["even"]["moved"] == [{"from": 1, "to": 3, **PHYSICS._asdict()}]
+    assert changes["tuesday"]["odd"]["changed"][0]["new"]["room"] == "Б-202"
+    assert set(changes) == {"monday", "tuesday"}
+    assert not diff(old, make_schedule(*[
+        ("monday", "even", 0, PHYSICS), ("tuesday", "odd", 1, PHYSICS),
+    ]))
+
+
+def test_cursor_pages_through_events():
+    """События читаются по курсору страницами по `limit`."""
+    feed = ChangeFeed()
+    versions = [make_schedule(("monday", "even", i, PHYSICS)) for i in range(4)]
+    for old, new in zip(versions, versions[1:]):
+        feed.publish("schedule", old, new)
+
+    page = feed.since(0, limit=2)
+    assert [event["id"] for event in page["events"]] == [1, 2]
+    page = feed.since(page["cursor"], limit=2)
+    assert [event["id"] for event in page["events"]] == [3]
+    assert page["cursor"] == 3 and not page["missed"]
+    assert not feed.since(page["cursor"])["events"]
+
+
+def test_unchanged_schedule_is_not_published():
+    """Новая версия с теми же парами не даёт события."""
+    feed = ChangeFeed()
+    schedule = make_schedule(("monday", "even", 0, PHYSICS))
+
+    assert feed.publish("schedule", schedule, make_schedule(("monday", "even", 0, PHYSICS))) is None
+    assert feed.cursor == 0
+
+
+def test_missed_events_are_reported():
+    """Если события вытеснены из ленты или курсор из прошлого запуска, `missed`."""
+    feed = ChangeFeed(maxlen=2)
+    versions = [make_schedule(("monday", "even", i, PHYSICS)) for i in range(4)]
+    for old, new in zip(versions, versions[1:]):
+        feed.publish("schedule", old, new)
+
+    assert feed.since(0)["missed"]
+    assert not feed.since(1)["missed"]
+
+    restarted = feed.since(100)
+    assert restarted["missed"]
+    assert [event["id"] for event in restarted["events"]] == [2, 3]
+
+
+def test_owner_filter():
+    """Фильтр по владельцам оставляет только их события."""
+    feed = ChangeFeed()
+    other = Timetable.build("О-20-ИВТ-2-по-Б", [])
+    feed.publish("schedule", make_schedule(), make_schedule(("monday", "even", 0, PHYSICS)))
+    feed.publish("schedule", other, other._replace(cells=make_schedule(
+        ("monday", "odd", 0, PHYSICS)).cells))
+
+    events = feed.since(0, owners=[GROUP])["events"]
+    assert [event["owner"] for event in events] == [GROUP]
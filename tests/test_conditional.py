@@ -0,0 +1,73 @@
+"""Тесты условных ответов `/api/v2/schedule` (ETag и 304)."""
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+from timetable import Entry, Timetable
+
+GROUP = "О-20-ИВТ-1-по-Б"
+
+
+def make_client(monkeypatch, schedule: Timetable) -> TestClient:
+    """Клиент API, у которого парсер вместо сайта отдаёт `schedule`."""
+    async def fake_schedule(group):
+        assert group == GROUP
+        return schedule
+
+    monkeypatch.setattr(app_module.parser, "schedule", fake_schedule)
+    return TestClient(app_module.app)
+
+
+def make_schedule(room: str) -> Timetable:
+    """Расписание группы из одной пары в аудитории `room`."""
+    return Timetable.build(GROUP, [
+        ("monday", "both", 0, Entry("[Л] Физика", room, "Иванов И.И.")),
+    ])
+
+
+def test_etag_is_weak_and_shared_by_encodings(monkeypatch):
+    """Сжатый и несжатый ответы получают один и тот же слабый ETag."""
+    client = make_client(monkeypatch, make_schedule("А-101"))
+
+    plain = client.get("/api/v2/schedule", params={"group": GROUP},
+                       headers={"Accept-Encoding": "identity"})
+    packed = client.get("/api/v2/schedule", params={"group": GROUP},
+                        headers={"Accept-Encoding": "gzip"})
+
+    assert plain.status_code == packed.status_code == 200
+    assert plain.headers["etag"].startswith('W/"')
+    assert plain.headers["etag"] == packed.headers["etag"]
+
+
+def test_not_modified(monkeypatch):
+    """Пока расписание то же, ответ — пустой 304 с `Vary: Accept-Encoding`."""
+    client = make_client(monkeypatch, make_schedule("А-101"))
+    etag = client.get("/api/v2/schedule", params={"group": GROUP}).headers["etag"]
+
+    response = client.get("/api/v2/schedule", params={"group": GROUP},
+                          headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    # Сильный ETag с тем же хэшем тоже совпадает при слабом сравнении
+    strong = etag[2:]
+    response = client.get("/api/v2/schedule", params={"group": GROUP},
+                          headers={"If-None-Match": strong})
+    assert response.status_code == 304
+
+
+def test_changed_schedule(monkeypatch):
+    """После изменения пар старый ETag не подходит и отдаётся новое тело."""
+    client = make_client(monkeypatch, make_schedule("А-101"))
+    etag = client.get("/api/v2/schedule", params={"group": GROUP}).headers["etag"]
+
+    client = make_client(monkeypatch, make_schedule("Б-202"))
+    response = client.get("/api/v2/schedule", params={"group": GROUP},
+                          headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert "Б-202" in response.text
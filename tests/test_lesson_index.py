@@ -0,0 +1,57 @@
+"""Тесты индекса пар по преподавателям (`lesson_index.LessonIndex`)."""
+
+from lesson_index import LessonIndex, teacher_key
+from timetable import Entry, Timetable
+
+TEACHERS = [
+    "Иванов Иван Игоревич",
+    "Иванов Игорь Иванович",
+    "Трубаков Евгений Олегович",
+]
+
+
+def make_schedules() -> dict:
+    """Расписания двух групп: у каждой своя пара у «Иванов И.И.»."""
+    return {
+        "О-20-ИВТ-1-по-Б": Timetable.build("О-20-ИВТ-1-по-Б", [
+            ("monday", "both", 0, Entry("[Л] Физика", "А-101", "Иванов И.И.")),
+            ("monday", "odd", 1, Entry("[Л] Базы данных", "Б-201", "Трубаков Е.О.")),
+        ]),
+        "О-20-ИВТ-2-по-Б": Timetable.build("О-20-ИВТ-2-по-Б", [
+            ("tuesday", "even", 2, Entry("[ПР] Химия", "В-301", "Иванов И.И.")),
+        ]),
+    }
+
+
+def test_namesakes_are_ambiguous():
+    """Однофамильцы с одинаковыми инициалами не собираются из индекса."""
+    index = LessonIndex(make_schedules(), TEACHERS)
+
+    assert teacher_key(TEACHERS[0]) == teacher_key(TEACHERS[1])
+    assert index.ambiguous == {"Иванов ИИ"}
+    # Пары однофамильцев неразличимы — расписание нужно брать с сайта
+    assert index.teacher(TEACHERS[0]) is None
+    assert index.teacher(TEACHERS[1]) is None
+    assert index.stats()["ambiguous"] == 1
+
+
+def test_unique_teacher_is_indexed():
+    """Расписание преподавателя без однофамильцев собирается из индекса."""
+    index = LessonIndex(make_schedules(), TEACHERS)
+    schedule = index.teacher(TEACHERS[2])
+
+    assert schedule is not None
+    assert [(number, entry.party) for number, entry in schedule.lessons("monday", "odd")] == [
+        (2, "О-20-ИВТ-1-по-Б"),
+    ]
+
+
+def test_without_teacher_list():
+    """Без списка преподавателей однофамильцы не отмечаются."""
+    index = LessonIndex(make_schedules())
+    schedule = index.teacher(TEACHERS[0])
+
+    assert not index.ambiguous
+    assert schedule is not None
+    assert len(list(schedule.lessons("monday", "odd"))) == 1
+    assert len(list(schedule.lessons("tuesday", "even"))) == 1
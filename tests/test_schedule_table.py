@@ -0,0 +1,38 @@
+"""Тесты бэкендов разбора таблиц расписания (`schedule_table.BACKENDS`).
+
+Каждый доступный бэкенд разбирает сохранённые страницы сайта
+(`benchmarks/fixtures`), а сетка пар сравнивается с эталоном в `tests/expected`.
+"""
+
+# pylint: disable=W0212
+
+import json
+from pathlib import Path
+
+import pytest
+
+from bgtu_parser import Parser
+from schedule_table import BACKENDS
+
+FIXTURES = Path(__file__).parent.parent / "benchmarks" / "fixtures"
+EXPECTED = Path(__file__).parent / "expected"
+
+PAGES = [
+    ("schedule_group", "О-20-ИВТ-1-по-Б", "_parse_schedule"),
+    ("schedule_teacher", "Трубаков Евгений Олегович", "_parse_teacher_schedule"),
+]
+
+
+@pytest.mark.parametrize("backend", ["selectolax", "lxml", "html.parser"])
+@pytest.mark.parametrize("page, owner, method", PAGES)
+def test_backend_matches_expected(backend, page, owner, method):
+    """Все бэкенды собирают из страницы одну и ту же сетку пар."""
+    if backend not in BACKENDS:
+        pytest.skip(f"бэкенд {backend} не установлен")
+
+    html = (FIXTURES / f"{page}.html").read_text("utf-8")
+    timetable = getattr(Parser(html_backend=backend), method)(html, owner)
+    expected = json.loads((EXPECTED / f"{page}.json").read_text("utf-8"))
+
+    assert timetable.owner == owner
+    assert [[list(entry) for entry in cell] for cell in timetable.cells] == expected
@@ -0,0 +1,126 @@
+"""Тесты хранилищ результатов парсера (`storage`) и их блокировок."""
+
+import asyncio
+
+import pytest
+
+from cache import ResultCache
+from storage import MemoryStore, ScheduleStore
+
+
+@pytest.fixture(name="store", params=["memory", "sqlite"])
+def store_fixture(request, tmp_path):
+    """Хранилище в памяти и в файле SQLite."""
+    if request.param == "memory":
+        store = MemoryStore()
+    else:
+        store = ScheduleStore(str(tmp_path / "store.db"))
+    yield store
+    store.close()
+
+
+def test_value_round_trip(store):
+    """Значение возвращается вместе с временем обновления."""
+    async def run():
+        await store.set(("schedule", "О-20-ИВТ-1-по-Б"), [["А-101"]], 100.0)
+        return await store.get(("schedule", "О-20-ИВТ-1-по-Б"))
+
+    assert asyncio.run(run()) == ([["А-101"]], 100.0)
+    assert asyncio.run(store.get(("schedule", "нет такой"))) is None
+
+
+def test_delete_by_prefix(store):
+    """Удаляются только записи, ключ которых начинается с префикса."""
+    async def run():
+        for key in [("schedule", "G"), ("schedule", "G2"), ("groups", "F")]:
+            await store.set(key, 1)
+        return await store.delete(("schedule", "G"))
+
+    assert asyncio.run(run()) == 1
+    assert len(store) == 2
+    assert asyncio.run(store.get(("schedule", "G2"))) is not None
+
+
+def test_sqlite_survives_reopen(tmp_path):
+    """Записи SQLite видны после повторного открытия файла."""
+    path = str(tmp_path / "store.db")
+    store = ScheduleStore(path)
+    asyncio.run(store.set(("meta",), {"period": "2022-2023"}))
+    store.close()
+
+    store = ScheduleStore(path)
+    value, _updated = asyncio.run(store.get(("meta",)))
+    store.close()
+    assert value == {"period": "2022-2023"}
+
+
+def test_lock_is_exclusive(store):
+    """Блокировку держит один владелец, пока не отпустит её или она не истечёт."""
+    async def run():
+        name = ("fetch", "schedule", "G")
+        assert await store.lock(name, "a", 60)
+        assert not await store.lock(name, "b", 60)
+        # Свою блокировку владелец продлевает
+        assert await store.lock(name, "a", 60)
+
+        # Чужая разблокировка ничего не снимает
+        await store.unlock(name, "b")
+        assert not await store.lock(name, "b", 60)
+
+        await store.unlock(name, "a")
+        return await store.lock(name, "b", 60)
+
+    assert asyncio.run(run())
+
+
+def test_expired_lock_is_taken_over(store):
+    """Истёкшую блокировку (например, завис процесс) забирает другой владелец."""
+    async def run():
+        assert await store.lock(("prefetch",), "a", 0.01)
+        await asyncio.sleep(0.02)
+        return await store.lock(("prefetch",), "b", 60)
+
+    assert asyncio.run(run())
+
+
+def test_processes_share_sqlite_locks(tmp_path):
+    """Два подключения к одному файлу SQLite видят блокировки друг друга."""
+    path = str(tmp_path / "store.db")
+    first, second = ScheduleStore(path), ScheduleStore(path)
+
+    async def run():
+        assert await first.lock(("fetch", "meta"), "a", 60)
+        assert not await second.lock(("fetch", "meta"), "b", 60)
+        await first.unlock(("fetch", "meta"), "a")
+        return await second.lock(("fetch", "meta"), "b", 60)
+
+    try:
+        assert asyncio.run(run())
+    finally:
+        first.close()
+        second.close()
+
+
+def test_shared_store_fetches_once(tmp_path):
+    """Кэши двух процессов с общим хранилищем загружают значение один раз."""
+    path = str(tmp_path / "store.db")
+    caches = [ResultCache(ttl=60, store=ScheduleStore(path)) for _ in range(2)]
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "расписание"
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_fetch(("meta",), fetch) for cache in caches)
+        )
+
+    try:
+        assert asyncio.run(run()) == ["расписание", "расписание"]
+    finally:
+        for cache in caches:
+            cache.store.close()
+    assert len(calls) == 1
+    assert caches[0].shared + caches[1].shared == 1
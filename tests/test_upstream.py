@@ -0,0 +1,89 @@
+"""Тесты защиты сайта БГТУ от перегрузки (`upstream`)."""
+
+import asyncio
+from time import monotonic
+
+import httpx
+import pytest
+
+from upstream import AdaptiveTimeout, CircuitBreaker, CircuitOpen, TokenBucket, UpstreamGuard
+
+
+def test_circuit_opens_after_failures():
+    """После `failures` ошибок подряд запросы сразу получают `CircuitOpen`."""
+    breaker = CircuitBreaker(failures=2, reset_timeout=30)
+    breaker.failure()
+    breaker.check()
+    breaker.failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen) as error:
+        breaker.check()
+    assert 0 < error.value.retry_after <= 30
+
+
+def test_half_open_lets_one_trial_through():
+    """После `reset_timeout` пропускается один пробный запрос."""
+    breaker = CircuitBreaker(failures=1, reset_timeout=30)
+    breaker.failure()
+    breaker.opened -= 31
+
+    assert breaker.state == "half_open"
+    breaker.check()
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    # Неудачная проба снова размыкает цепь, удачная — замыкает
+    breaker.failure()
+    assert breaker.state == "open"
+    breaker.opened -= 31
+    breaker.check()
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.trips == 2
+
+
+def test_token_bucket_limits_rate():
+    """Сверх `burst` запросы ждут пополнения ведра."""
+    async def run():
+        bucket = TokenBucket(rate=50, burst=2)
+        start = monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return monotonic() - start
+
+    # Два запроса сразу, ещё два — через 1/50 секунды каждый
+    assert asyncio.run(run()) >= 0.035
+
+
+def test_adaptive_timeout_bounds():
+    """Таймаут следует за временем ответов, но не выходит за границы."""
+    timeout = AdaptiveTimeout(initial=15, minimum=2, maximum=15)
+    for _ in range(20):
+        timeout.observe(0.1)
+    assert timeout.value == 2
+
+    for _ in range(10):
+        timeout.expired()
+    assert timeout.value == 15
+
+
+def test_guard_retries_server_errors():
+    """Ответы 5xx повторяются, а после всех повторов ошибка доходит до вызывающего."""
+    request = httpx.Request("GET", "https://www.tu-bryansk.ru/")
+    statuses = [503, 200, 503, 503, 503]
+
+    async def send(_timeout):
+        return httpx.Response(statuses.pop(0), request=request)
+
+    async def run():
+        guard = UpstreamGuard(retries=2, backoff=0, failures=10)
+        page = await guard.request("schedule", send)
+        assert page.status_code == 200
+        with pytest.raises(httpx.HTTPStatusError):
+            await guard.request("schedule", send)
+        return guard
+
+    guard = asyncio.run(run())
+    assert guard.retried == 3
+    assert guard.breaker.errors == 3
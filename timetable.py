@@ -0,0 +1,208 @@
+"""timetable.py
+
+Компактное внутреннее представление расписания.
+
+Вместо вложенных словарей расписание хранится как сетка из 96 ячеек
+(6 дней × 2 недели × 8 пар), а пара — как кортеж `Entry`. Одинаковые
+строки (предметы, аудитории, преподаватели) интернируются и не дублируются
+между расписаниями. В словари публичного формата API расписание
+превращается только при отдаче ответа.
+"""
+
+import hashlib
+import sys
+from datetime import datetime
+from typing import Iterable, Iterator, NamedTuple, Tuple
+
+from schedule_table import DAYS
+
+# Дни недели в порядке столбцов сетки
+DAY_NAMES = tuple(DAYS.values())
+DAY_INDEX = {day: i for i, day in enumerate(DAY_NAMES)}
+
+# Недели в порядке сетки: первая строка пары с rowspan — `odd`, вторая — `even`
+WEEKS = ("odd", "even")
+WEEK_INDEX = {week: i for i, week in enumerate(WEEKS)}
+
+# Количество пар в день
+SLOTS = 8
+
+# Количество ячеек сетки
+CELLS = len(DAY_NAMES) * len(WEEKS) * SLOTS
+
+# Время пар, встречающееся на сайте, и номера этих пар
+LESSON_TIMES = {
+    "08:00 - 09:35": 1,
+    "09:45 - 11:20": 2,
+    "11:30 - 13:05": 3,
+    "13:20 - 14:55": 4,
+    "13:20 - 16:40": 4,
+    "15:05 - 16:40": 5,
+    "16:50 - 18:25": 6,
+    "18:40 - 20:15": 7,
+    "18:40 - 20:25": 7,
+    "20:25 - 22:00": 8,
+}
+
+# Начало и конец пары по её номеру (с 1): из нескольких вариантов
+# берётся первый, поэтому таблица перебирается с конца
+SLOT_TIMES = {
+    number: tuple(lesson_time.split(" - "))
+    for lesson_time, number in reversed(list(LESSON_TIMES.items()))
+}
+
+_EMPTY = ()
+
+
+def cell_index(day: int, week: int, slot: int) -> int:
+    """Возвращает номер ячейки сетки по индексам дня, недели и пары."""
+    return (day * len(WEEKS) + week) * SLOTS + slot
+
+
+def content_hash(owner: str, cells: tuple) -> str:
+    """Возвращает хэш пар расписания (без времени разбора)."""
+    return hashlib.blake2b(repr((owner, cells)).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class Entry(NamedTuple):
+    """Пара в ячейке сетки.
+
+    #### Поля
+
+    - `subject` (str): предмет с типом занятия (`[Л] Физика`)
+    - `room` (str): аудитория
+    - `party` (str): преподаватели (в расписании группы) или группы
+      (в расписании преподавателя) через запятую
+    """
+
+    subject: str
+    room: str
+    party: str
+
+
+class Timetable(NamedTuple):
+    """Расписание группы или преподавателя в виде сетки.
+
+    #### Поля
+
+    - `owner` (str): группа или преподаватель
+    - `updated` (datetime): дата и время разбора
+    - `cells` (tuple[tuple[Entry, ...], ...]): 96 ячеек, в каждой — пары
+      в этом слоте по порядку таблицы (обычно одна или ни одной)
+    - `version` (str): хэш содержимого, вычисленный при сборке (см. `digest`)
+    """
+
+    owner: str
+    updated: datetime
+    cells: Tuple[Tuple[Entry, ...], ...]
+    version: str = ""
+
+    @classmethod
+    def build(
+        cls,
+        owner: str,
+        lessons: Iterable[Tuple[str, str, int, Entry]],
+        replace: bool = False,
+    ) -> "Timetable":
+        """Собирает сетку из пар, найденных в таблице расписания.
+
+        Аргументы:
+            owner (str): группа или преподаватель
+            lessons (Iterable): кортежи `(day, week_type, index, entry)`, где
+                `week_type` — `odd`, `even` или `both`
+            replace (bool): оставлять в ячейке только последнюю пару
+                (так устроено расписание преподавателя)
+
+        Возвращает:
+            Timetable: расписание
+        """
+        cells = [_EMPTY] * CELLS
+
+        for day, week_type, index, entry in lessons:
+            entry = Entry(*map(sys.intern, entry))
+            weeks = WEEKS if week_type == "both" else (week_type,)
+
+            for week in weeks:
+                i = cell_index(DAY_INDEX[day], WEEK_INDEX[week], index)
+                cells[i] = (entry,) if replace else cells[i] + (entry,)
+
+        cells = tuple(cells)
+        return cls(owner, datetime.now(), cells, content_hash(owner, cells))
+
+    @classmethod
+    def from_json(cls, value: list) -> "Timetable":
+        """Восстанавливает расписание, сохранённое в JSON (`[owner, updated, cells, ...]`)."""
+        owner, updated, cells, *_ = value
+        if isinstance(updated, str):
+            updated = datetime.fromisoformat(updated)
+
+        cells = tuple(
+            tuple(Entry(*map(sys.intern, entry)) for entry in cell)
+            for cell in cells
+        )
+        return cls(owner, updated, cells, content_hash(owner, cells))
+
+    def digest(self) -> str:
+        """Возвращает хэш содержимого расписания.
+
+        Учитываются только пары, а не время разбора: у одинаковых
+        расписаний, разобранных в разное время, хэш совпадает. Хэш
+        вычисляется один раз при сборке и хранится в поле `version`.
+        """
+        return self.version or content_hash(self.owner, self.cells)
+
+    def lessons(self, day: str, week: str) -> Iterator[Tuple[int, Entry]]:
+        """Выдаёт пары дня на заданной неделе.
+
+        Возвращает:
+            Iterator[tuple[int, Entry]]: номера пар (с 1) и пары по порядку
+        """
+        start = cell_index(DAY_INDEX[day], WEEK_INDEX[week], 0)
+        for slot, cell in enumerate(self.cells[start:start + SLOTS]):
+            for entry in cell:
+                yield slot + 1, entry
+
+    def to_schedule(self) -> dict:
+        """Возвращает расписание группы в формате модели `Schedule`."""
+        schedule = {"group": self.owner, "last_updated": str(self.updated)}
+
+        for day in DAY_NAMES:
+            schedule[day] = {
+                week: [
+                    {
+                        "number": number,
+                        "subject": entry.subject,
+                        "room": entry.room,
+                        "teacher": entry.party,
+                    }
+                    for number, entry in self.lessons(day, week)
+                ]
+                for week in ("even", "odd")
+            }
+
+        return schedule
+
+    def to_teacher_schedule(self) -> dict:
+        """Возвращает расписание преподавателя в формате модели `TeacherSchedule`.
+
+        Пустые пары заполняются заглушками `-`, как на сайте.
+        """
+        schedule = {"last_updated": self.updated}
+
+        for day in DAY_NAMES:
+            schedule[day] = {}
+            for week in ("even", "odd"):
+                lessons = [
+                    {"number": i, "subject": "-", "room": "-", "group": "-"}
+                    for i in range(1, SLOTS + 1)
+                ]
+                for number, entry in self.lessons(day, week):
+                    lessons[number - 1] = {
+                        "number": number,
+                        "subject": entry.subject,
+                        "room": entry.room,
+                        "group": entry.party,
+                    }
+                schedule[day][week] = lessons
+
+        return schedule
@@ -0,0 +1,319 @@
+"""upstream.py
+
+Защита приложения от медленного или недоступного сайта БГТУ.
+
+Все запросы к сайту проходят через `UpstreamGuard`, который:
+
+- ограничивает частоту запросов (token bucket) и их количество одновременно;
+- подбирает таймаут по времени недавних ответов каждого типа страниц;
+- повторяет неудавшиеся запросы с экспоненциальной задержкой и джиттером;
+- после серии ошибок размыкает цепь (circuit breaker) и какое-то время
+  сразу отказывает, не дожидаясь таймаута, а затем пропускает пробный запрос.
+"""
+
+import asyncio
+import math
+import random
+from time import monotonic
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+import metrics
+
+
+class CircuitOpen(Exception):
+    """Цепь разомкнута: сайт недавно не отвечал, запрос не отправляется.
+
+    Атрибуты:
+        retry_after (float): через сколько секунд будет пробный запрос
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Сайт БГТУ недоступен, повтор через {math.ceil(retry_after)} с")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Ограничение частоты запросов.
+
+    В ведре помещается `burst` жетонов, и оно пополняется со скоростью
+    `rate` жетонов в секунду. Каждый запрос забирает жетон, а если жетонов
+    нет, ждёт его появления (запросы обслуживаются по очереди).
+
+    Аргументы:
+        rate (float): запросов в секунду (0 — без ограничения)
+        burst (int): сколько запросов можно отправить подряд без ожидания
+    """
+
+    # pylint: disable=R0903
+    # У ведра одна операция — забрать жетон
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self._updated = monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _fill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.tokens + (now - self._updated) * self.rate, self.burst)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Забирает жетон, дожидаясь его при необходимости."""
+        if self.rate <= 0:
+            return
+
+        # Блокировка создаётся лениво, уже внутри работающего цикла событий
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            self._fill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._fill()
+            self.tokens -= 1
+
+
+class AdaptiveTimeout:
+    """Таймаут по времени недавних ответов (как RTO в TCP).
+
+    Хранит сглаженное время ответа и его разброс; таймаут — среднее плюс
+    четыре разброса, но в пределах `[minimum, maximum]`. После таймаута
+    значение удваивается, чтобы медленный сайт всё же успевал ответить.
+
+    Аргументы:
+        initial (float): таймаут до первого ответа, в секундах
+        minimum (float): нижняя граница таймаута
+        maximum (float): верхняя граница таймаута
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.value = min(max(initial, minimum), maximum)
+        self.average: Optional[float] = None
+        self.deviation = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Учитывает время успешного ответа."""
+        if self.average is None:
+            self.average, self.deviation = seconds, seconds / 2
+        else:
+            self.deviation = 0.75 * self.deviation + 0.25 * abs(self.average - seconds)
+            self.average = 0.875 * self.average + 0.125 * seconds
+
+        self.value = min(max(self.average + 4 * self.deviation, self.minimum), self.maximum)
+
+    def expired(self) -> None:
+        """Учитывает таймаут запроса."""
+        self.value = min(self.value * 2, self.maximum)
+
+
+class CircuitBreaker:
+    """Размыкатель цепи.
+
+    После `failures` ошибок подряд цепь размыкается на `reset_timeout`
+    секунд: все запросы сразу получают `CircuitOpen`. Затем пропускается
+    один пробный запрос — при успехе цепь замыкается, при ошибке снова
+    размыкается.
+
+    Аргументы:
+        failures (int): сколько ошибок подряд размыкают цепь
+        reset_timeout (float): на сколько секунд размыкается цепь
+    """
+
+    def __init__(self, failures: int = 5, reset_timeout: float = 30) -> None:
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.errors = 0
+        self.opened: Optional[float] = None
+        self.trips = 0
+        self._trial: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        """Состояние цепи: `closed`, `open` или `half_open`."""
+        if self.opened is None:
+            return "closed"
+        return "open" if self.retry_after() > 0 else "half_open"
+
+    def retry_after(self) -> float:
+        """Через сколько секунд цепь пропустит пробный запрос."""
+        if self.opened is None:
+            return 0.0
+        return max(self.opened + self.reset_timeout - monotonic(), 0.0)
+
+    def check(self) -> None:
+        """Пропускает запрос или бросает `CircuitOpen`."""
+        state = self.state
+        if state == "closed":
+            return
+
+        # Пробный запрос, не завершившийся за `reset_timeout` (например,
+        # отменённый), считается потерянным
+        if state == "half_open" and (
+            self._trial is None or monotonic() - self._trial > self.reset_timeout
+        ):
+            self._trial = monotonic()
+            return
+
+        # Пока идёт пробный запрос, остальные не ждут его, а сразу отказывают
+        raise CircuitOpen(self.retry_after() or self.reset_timeout)
+
+    def success(self) -> None:
+        """Учитывает успешный ответ."""
+        self.errors = 0
+        self.opened = None
+        self._trial = None
+
+    def failure(self) -> None:
+        """Учитывает ошибку запроса."""
+        self.errors += 1
+        if self._trial is not None or self.errors >= self.failures:
+            if self.opened is None or self._trial is not None:
+                self.trips += 1
+            self.opened = monotonic()
+            self._trial = None
+
+
+class UpstreamGuard:
+    """Ограничения, таймауты, повторы и размыкатель цепи для запросов к сайту.
+
+    Ошибками считаются таймауты, ошибки соединения и ответы 429 и 5xx;
+    ответы с остальными кодами возвращаются как есть.
+
+    Аргументы:
+        rate (float): максимум запросов в секунду (0 — без ограничения)
+        burst (int): сколько запросов можно отправить подряд без ожидания
+        max_concurrency (int): максимум одновременных запросов
+        timeout (float): начальный и максимальный таймаут, в секундах
+        min_timeout (float): минимальный таймаут, в секундах
+        retries (int): сколько раз повторять неудавшийся запрос
+        backoff (float): задержка перед первым повтором (удваивается
+            с каждым следующим, фактическая — случайная от нуля до неё)
+        failures (int): сколько ошибок подряд размыкают цепь
+        reset_timeout (float): на сколько секунд размыкается цепь
+    """
+
+    # pylint: disable=R0902,R0913
+    # Настроек у защиты действительно много
+
+    def __init__(
+        self,
+        *,
+        rate: float = 0,
+        burst: int = 1,
+        max_concurrency: int = 8,
+        timeout: float = 15,
+        min_timeout: float = 2,
+        retries: int = 2,
+        backoff: float = 0.5,
+        failures: int = 5,
+        reset_timeout: float = 30,
+    ) -> None:
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failures, reset_timeout)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.min_timeout = min_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.timeouts: Dict[str, AdaptiveTimeout] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.retried = 0
+        self.rejected = 0
+
+    def _timeout(self, endpoint: str) -> AdaptiveTimeout:
+        timeout = self.timeouts.get(endpoint)
+        if timeout is None:
+            timeout = self.timeouts[endpoint] = AdaptiveTimeout(
+                self.timeout, self.min_timeout, self.timeout
+            )
+        return timeout
+
+    def _delay(self, attempt: int) -> float:
+        # «Полный джиттер»: повторы разных запросов не приходят на сайт разом
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    async def request(
+        self, endpoint: str, send: Callable[[float], Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        """Отправляет запрос с ограничениями и повторами.
+
+        Аргументы:
+            endpoint (str): тип страницы (для таймаутов и метрик)
+            send (Callable): корутинная функция, отправляющая запрос
+                с заданным таймаутом
+
+        Возвращает:
+            httpx.Response: ответ сайта
+
+        Исключения:
+            CircuitOpen: цепь разомкнута
+            httpx.HTTPError: запрос не удался и после всех повторов
+        """
+        # Семафор создаётся лениво, уже внутри работающего цикла событий
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        timeout = self._timeout(endpoint)
+        attempt = 0
+
+        while True:
+            try:
+                self.breaker.check()
+            except CircuitOpen:
+                self.rejected += 1
+                metrics.UPSTREAM_REJECTED.inc(endpoint=endpoint)
+                raise
+
+            await self.bucket.acquire()
+
+            async with self._semaphore:
+                start = monotonic()
+                try:
+                    page = await send(timeout.value)
+                except httpx.TimeoutException as exc:
+                    timeout.expired()
+                    error = exc
+                except httpx.TransportError as exc:
+                    error = exc
+                else:
+                    if page.status_code != 429 and page.status_code < 500:
+                        timeout.observe(monotonic() - start)
+                        self.breaker.success()
+                        return page
+                    error = httpx.HTTPStatusError(
+                        f"Сайт БГТУ ответил {page.status_code}",
+                        request=page.request,
+                        response=page,
+                    )
+
+            self.breaker.failure()
+            if attempt >= self.retries:
+                raise error
+
+            self.retried += 1
+            metrics.UPSTREAM_RETRIES.inc(endpoint=endpoint)
+            await asyncio.sleep(self._delay(attempt))
+            attempt += 1
+
+    def stats(self) -> dict:
+        """Возвращает состояние цепи, текущие таймауты и количество повторов."""
+        return {
+            "circuit": self.breaker.state,
+            "retry_after": round(self.breaker.retry_after(), 1),
+            "consecutive_errors": self.breaker.errors,
+            "trips": self.breaker.trips,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "rate": self.bucket.rate,
+            "max_concurrency": self.max_concurrency,
+            "timeouts": {
+                endpoint: round(timeout.value, 2) for endpoint, timeout in self.timeouts.items()
+            },
+        }